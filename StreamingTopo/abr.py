@@ -0,0 +1,189 @@
+import math
+
+class PlaybackBuffer:
+    """Simulated player buffer, measured in seconds of media
+
+    Each segment drains the buffer by the wall-clock time since the previous
+    buffer update while playback is running, then adds its media duration.
+    Prefetched segments download in parallel, so callers pass the elapsed
+    time rather than each download's own duration, which would count the
+    same interval once per overlapping fetch. When the buffer runs dry
+    before a segment arrives the shortfall is counted as rebuffering.
+    Playback (re)starts once startup_level seconds are buffered. The player
+    never holds more than max_level seconds: a download that would overfill
+    it is assumed to wait until there is room, which only advances the model.
+    """
+
+    def __init__(self, max_level=30.0, startup_level=2.0):
+        self.max_level = max_level
+        self.startup_level = startup_level
+        self.level = 0.0
+        self.playing = False
+        self.started = False
+        self.played_time = 0.0
+        self.startup_delay = 0.0
+        self.rebuffer_time = 0.0
+        self.rebuffer_count = 0
+
+    def wait_for_room(self, segment_duration):
+        """Play out enough media for the next segment to fit; return the wait"""
+        wait = max(0.0, self.level + segment_duration - self.max_level)
+        if self.playing and wait:
+            self.level -= wait
+            self.played_time += wait
+            return wait
+        return 0.0
+
+    def on_download(self, elapsed, segment_duration):
+        """Append a segment that arrived `elapsed` seconds after the last update"""
+        if self.playing:
+            played = min(self.level, elapsed)
+            self.level -= played
+            self.played_time += played
+            if elapsed > played:
+                # Ran dry while waiting for this segment
+                self.rebuffer_time += elapsed - played
+                self.rebuffer_count += 1
+                self.playing = False
+        elif not self.started:
+            self.startup_delay += elapsed
+        else:
+            self.rebuffer_time += elapsed
+        self.level += segment_duration
+        if not self.playing and self.level >= self.startup_level:
+            self.playing = True
+            self.started = True
+
+class ThroughputEstimator:
+    """Throughput samples (bits per second) with EWMA and harmonic-mean views"""
+
+    def __init__(self, fast_half_life=3.0, slow_half_life=8.0, window=5):
+        self.fast_half_life = fast_half_life
+        self.slow_half_life = slow_half_life
+        self.window = window
+        self.samples = []
+        self._fast = self._slow = 0.0
+        self._weight = 0.0  # total sample duration, for bias correction
+
+    def add_sample(self, bitrate, duration):
+        """Record a throughput sample measured over `duration` seconds"""
+        if bitrate <= 0 or duration <= 0:
+            return
+        self.samples.append(bitrate)
+        del self.samples[:-self.window]
+        fast = 0.5 ** (duration / self.fast_half_life)
+        slow = 0.5 ** (duration / self.slow_half_life)
+        self._fast = fast * self._fast + (1 - fast) * bitrate
+        self._slow = slow * self._slow + (1 - slow) * bitrate
+        self._weight += duration
+
+    def ewma(self):
+        """Conservative EWMA estimate: the lower of a fast and a slow average"""
+        if not self._weight:
+            return 0.0
+        fast = self._fast / (1 - 0.5 ** (self._weight / self.fast_half_life))
+        slow = self._slow / (1 - 0.5 ** (self._weight / self.slow_half_life))
+        return min(fast, slow)
+
+    def harmonic_mean(self):
+        if not self.samples:
+            return 0.0
+        return len(self.samples) / sum(1 / s for s in self.samples)
+
+class AbrRule:
+    """Base class for bitrate selection rules
+
+    select() gets the representation bitrates sorted from lowest to highest,
+    the PlaybackBuffer and the ThroughputEstimator, and returns an index into
+    the bitrates.
+    """
+    name = "base"
+
+    def select(self, bitrates, buffer, throughput, segment_duration):
+        raise NotImplementedError
+
+class ThroughputRule(AbrRule):
+    """Highest bitrate below a safety fraction of the estimated throughput"""
+    name = "throughput"
+
+    def __init__(self, estimate="harmonic", safety=0.9, start_index=0):
+        self.estimate = estimate
+        self.safety = safety
+        self.start_index = start_index
+
+    def select(self, bitrates, buffer, throughput, segment_duration):
+        estimate = throughput.ewma() if self.estimate == "ewma" else throughput.harmonic_mean()
+        if not estimate:
+            return min(self.start_index, len(bitrates) - 1)
+        budget = estimate * self.safety
+        index = 0
+        for i, bitrate in enumerate(bitrates):
+            if bitrate <= budget:
+                index = i
+        return index
+
+class BolaRule(AbrRule):
+    """BOLA-BASIC buffer-based selection (Spiteri et al., as in dash.js)
+
+    Picks the representation maximising (V * (utility + gp) - Q) / bitrate,
+    where Q is the buffer level and utilities are logarithmic in bitrate.
+    V and gp are derived so the lowest bitrate is chosen at min_buffer and
+    the highest at buffer_target.
+    """
+    name = "bola"
+
+    def __init__(self, min_buffer=10.0, buffer_target=30.0):
+        self.min_buffer = min_buffer
+        self.buffer_target = buffer_target
+
+    def select(self, bitrates, buffer, throughput, segment_duration):
+        if len(bitrates) == 1:
+            return 0
+        utilities = [math.log(b / bitrates[0]) + 1 for b in bitrates]
+        target = max(self.buffer_target, self.min_buffer + segment_duration)
+        gp = (utilities[-1] - 1) / (target / self.min_buffer - 1)
+        vp = self.min_buffer / gp
+        scores = [(vp * (u + gp) - buffer.level) / b for u, b in zip(utilities, bitrates)]
+        return max(range(len(bitrates)), key=scores.__getitem__)
+
+class HybridRule(AbrRule):
+    """Throughput rule while the buffer is low, BOLA once it is healthy
+
+    Switches to BOLA when the buffer reaches bola_threshold seconds and back
+    to throughput below throughput_threshold (hysteresis, as in dash.js
+    DYNAMIC). In BOLA mode the throughput choice acts as a floor, and BOLA
+    may go at most one step above it, so a full buffer cannot push the
+    bitrate far past what the link carries.
+    """
+    name = "hybrid"
+
+    def __init__(self, bola_threshold=10.0, throughput_threshold=6.0, **bola_options):
+        self.bola_threshold = bola_threshold
+        self.throughput_threshold = throughput_threshold
+        self.throughput_rule = ThroughputRule()
+        self.bola_rule = BolaRule(**bola_options)
+        self.using_bola = False
+
+    def select(self, bitrates, buffer, throughput, segment_duration):
+        if self.using_bola and buffer.level < self.throughput_threshold:
+            self.using_bola = False
+        elif not self.using_bola and buffer.level >= self.bola_threshold:
+            self.using_bola = True
+        by_throughput = self.throughput_rule.select(bitrates, buffer, throughput, segment_duration)
+        if not self.using_bola:
+            return by_throughput
+        by_bola = self.bola_rule.select(bitrates, buffer, throughput, segment_duration)
+        return min(max(by_bola, by_throughput), by_throughput + 1, len(bitrates) - 1)
+
+ABR_RULES = {
+    ThroughputRule.name: ThroughputRule,
+    BolaRule.name: BolaRule,
+    HybridRule.name: HybridRule,
+}
+
+def create_abr_rule(name, **options):
+    """Build an ABR rule by name ("throughput", "bola" or "hybrid")"""
+    try:
+        return ABR_RULES[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown ABR rule {name!r}; choose from {sorted(ABR_RULES)}")
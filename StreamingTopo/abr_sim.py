@@ -0,0 +1,331 @@
+import argparse
+import bisect
+import csv
+import json
+import math
+import os
+import time
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import urljoin
+from abr import ABR_RULES, create_abr_rule
+from dash_client import DashVideoDownloader
+from mp4_index import find_box, parse_sidx
+from mpd import fill_template, local_path, parse_mpd
+
+# Real media of one representation: bytes fetched before its first segment
+# (init segment, plus the sidx for SegmentBase), then each segment's size
+# in bytes and duration in seconds
+RepresentationMedia = namedtuple('RepresentationMedia', 'startup_bytes sizes durations')
+
+def load_trace(path):
+    """Read a throughput trace as a list of (seconds, Mbit/s)
+
+    Accepts two-column '<seconds> <Mbit/s>' traces (the cooked FCC and
+    Norway HSDPA sets, comma or whitespace separated) and raw Norway HSDPA
+    logs, whose 5th and 6th columns are bytes received and milliseconds
+    taken. Header lines and '#' comments are skipped.
+    """
+    points = []
+    elapsed = 0.0
+    with open(path) as f:
+        for line in f:
+            fields = line.split('#', 1)[0].replace(',', ' ').split()
+            try:
+                values = [float(field) for field in fields]
+            except ValueError:
+                continue  # header
+            if len(values) == 2:
+                points.append((values[0], values[1]))
+            elif len(values) >= 6 and values[5] > 0:
+                points.append((elapsed, values[4] * 8 / (values[5] / 1000) / 1e6))
+                elapsed += values[5] / 1000
+    if not points:
+        raise ValueError(f"Empty throughput trace {path}")
+    return sorted(points)
+
+class ThroughputTrace:
+    """Piecewise-constant link capacity that loops over its trace
+
+    Each sample holds until the next one; the last holds for the trace's
+    final sample interval before the trace starts over.
+    """
+    def __init__(self, points):
+        start = points[0][0]
+        self.times = [t - start for t, _ in points]
+        self.rates = [mbps * 1e6 / 8 for _, mbps in points]  # bytes per second
+        if not any(self.rates):
+            raise ValueError("Throughput trace has no capacity")
+        last_gap = self.times[-1] - self.times[-2] if len(points) > 1 else 1.0
+        self.period = self.times[-1] + last_gap
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_trace(path))
+
+    def rate(self, now):
+        """(bytes per second at `now`, time of the next capacity change)"""
+        loops, offset = divmod(now, self.period)
+        i = bisect.bisect_right(self.times, offset) - 1
+        next_start = self.times[i + 1] if i + 1 < len(self.times) else self.period
+        return self.rates[i], loops * self.period + next_start
+
+class Transfer:
+    __slots__ = ('size', 'remaining', 'started', 'ready')
+
+    def __init__(self, size, started, ready):
+        self.size = size
+        self.remaining = float(size)
+        self.started = started
+        self.ready = ready
+
+class SimulatedLink:
+    """Fluid bottleneck: transfers share the trace capacity equally
+
+    Every request spends one RTT before its first byte, like an HTTP GET on
+    a warm connection; after that all active transfers progress at
+    capacity / n. on_complete(key, size, elapsed) is called for every
+    transfer as it finishes, in completion order.
+    """
+    def __init__(self, trace, rtt=0.05, on_complete=None):
+        self.trace = trace
+        self.rtt = rtt
+        self.on_complete = on_complete
+        self.now = 0.0
+        self.bytes_delivered = 0
+        self._transfers = {}
+        self._completed = {}
+        self._keys = 0
+
+    def start(self, size):
+        """Begin a transfer at the current time and return its key"""
+        self._keys += 1
+        self._transfers[self._keys] = Transfer(size, self.now, self.now + self.rtt)
+        return self._keys
+
+    def cancel(self, key):
+        """Abandon a transfer, running or already complete"""
+        self._transfers.pop(key, None)
+        self._completed.pop(key, None)
+
+    def done(self, key):
+        return key in self._completed
+
+    def wait(self, key):
+        """Advance until transfer `key` is complete; returns its elapsed time"""
+        while key not in self._completed:
+            self._step(math.inf)
+        return self._completed.pop(key)
+
+    def advance(self, until):
+        """Let time pass (transfers keep progressing) up to `until`"""
+        while self.now < until:
+            self._step(until)
+
+    def _step(self, limit):
+        rate, change = self.trace.rate(self.now)
+        active = [(key, t) for key, t in self._transfers.items() if t.ready <= self.now]
+        event = min(change, limit, min((t.ready for t in self._transfers.values() if t.ready > self.now),
+                                      default=math.inf))
+        share = rate / len(active) if active else 0.0
+        if share:
+            event = min(event, self.now + min(t.remaining for _, t in active) / share)
+        if event == math.inf:
+            raise RuntimeError("Nothing in flight to wait for")
+        progress = share * (event - self.now)
+        self.now = event
+        for key, transfer in active:
+            transfer.remaining -= progress
+            if transfer.remaining <= 1e-6:
+                del self._transfers[key]
+                self.bytes_delivered += transfer.size
+                self._completed[key] = self.now - transfer.started
+                if self.on_complete is not None:
+                    self.on_complete(key, transfer.size, self.now - transfer.started)
+
+def representation_media(representation, directory):
+    """RepresentationMedia of one representation, from the files on disk
+
+    SegmentTemplate representations use segment_index.json when the
+    packager wrote one, and otherwise the size of each segment file.
+    SegmentBase ones read the sidx of the single media file.
+    """
+    template = representation.segment_template
+    if template is None:
+        segment_base = representation.segment_base
+        path = local_path(representation.url)
+        with open(path, 'rb') as f:
+            last = max(segment_base.index_range[1],
+                       segment_base.initialization[1] if segment_base.initialization else 0)
+            head = f.read(last + 1)
+        sidx_offset = find_box(head, b'sidx', segment_base.index_range[0])
+        if sidx_offset < 0:
+            raise ValueError(f"No sidx box in index range of {path}")
+        index = parse_sidx(memoryview(head)[sidx_offset:], sidx_offset)
+        return RepresentationMedia(last + 1, list(index.sizes), [index.duration(n) for n in range(len(index))])
+
+    sidecar = os.path.join(directory, 'segment_index.json')
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            entry = json.load(f)['representations'].get(representation.id)
+        if entry is not None:
+            return RepresentationMedia(entry['init']['size'], [s['size'] for s in entry['segments']],
+                                       [s['duration'] for s in entry['segments']])
+
+    startup = 0
+    if template.initialization:
+        startup = os.path.getsize(local_path(urljoin(representation.url, fill_template(
+            template.initialization, representation.id, bandwidth=representation.bandwidth))))
+    sizes, durations = [], []
+    k = 0
+    while template.count() is None or k < template.count():
+        start, duration = template.segment(k)
+        path = local_path(urljoin(representation.url, fill_template(
+            template.media, representation.id, number=template.start_number + k,
+            bandwidth=representation.bandwidth, time=start)))
+        if not os.path.exists(path):
+            break
+        sizes.append(os.path.getsize(path))
+        durations.append(duration / template.timescale)
+        k += 1
+    return RepresentationMedia(startup, sizes, durations)
+
+class AbrSimulator:
+    """Trace-driven, discrete-event replay of DashVideoDownloader
+
+    The manifest is parsed once and every representation's real segment
+    sizes are read from disk. Each run() builds a fresh downloader, so the
+    ABR rule, PlaybackBuffer and ThroughputEstimator are the ones the real
+    client uses, and replays download_video's pipeline (prefetch, target
+    buffer, cancel-and-upgrade) over a SimulatedLink instead of sockets.
+    """
+    def __init__(self, manifest_path):
+        self.manifest_path = Path(manifest_path).resolve()
+        self.manifest_url = self.manifest_path.as_uri()
+        self.manifest = parse_mpd(self.manifest_path.read_bytes(), self.manifest_url)
+        directory = str(self.manifest_path.parent)
+        self.media = [representation_media(rep, directory) for rep in self.manifest.ladder]
+        self.segment_count = min(len(media.sizes) for media in self.media)
+
+    def run(self, trace, abr='hybrid', abr_options=None, rtt=0.05, max_buffer=30.0, prefetch=3,
+            target_buffer=None, rebuffer_penalty=4.3, max_segments=None):
+        """Play the presentation over `trace` and return QoE metrics"""
+        rule = create_abr_rule(abr, **(abr_options or {}))
+        downloader = DashVideoDownloader(self.manifest_url, abr=rule, max_buffer=max_buffer,
+                                         prefetch=prefetch, target_buffer=target_buffer)
+        downloader.manifest = self.manifest
+
+        segment_keys = set()
+
+        def completed(key, size, elapsed):
+            # Only segment downloads feed the estimator, as in download_segment()
+            if key not in segment_keys:
+                return
+            segment_keys.discard(key)
+            downloader._add_throughput_sample(size, elapsed)
+            downloader.download_history.append((downloader.calculate_current_bitrate(size, elapsed), elapsed))
+
+        link = SimulatedLink(trace, rtt, completed)
+        buffer = downloader.buffer
+        segment_duration = downloader.segment_duration()
+        count = min(self.segment_count, max_segments or self.segment_count)
+        started = set()
+        in_flight = {}  # segment index -> (quality index, transfer key)
+
+        def submit(n, quality):
+            if quality not in started:
+                # Init segment (and sidx) fetched on the main thread before the first segment
+                started.add(quality)
+                link.wait(link.start(self.media[quality].startup_bytes))
+            key = link.start(self.media[quality].sizes[n])
+            segment_keys.add(key)
+            in_flight[n] = (quality, key)
+
+        wall_start = time.perf_counter()
+        next_request = next_write = 0
+        buffer_clock = 0.0  # simulated time of the last buffer update
+        previous = None
+        bitrates = []
+        while next_write < count:
+            while (len(in_flight) < prefetch and next_request < count
+                   and (not in_flight or buffer.level + len(in_flight) * segment_duration
+                        < downloader.target_buffer)):
+                submit(next_request, downloader.select_quality_index())
+                next_request += 1
+
+            quality, key = in_flight.pop(next_write)
+            link.wait(key)
+            elapsed = link.now - buffer_clock
+            duration = self.media[quality].durations[next_write]
+            # The player waits for room before appending, so playback time passes on the link too
+            link.advance(link.now + buffer.wait_for_room(duration))
+            buffer.on_download(elapsed, duration)
+            buffer_clock = link.now
+            bitrates.append(self.manifest.bitrates[quality])
+            if previous is not None and quality != previous:
+                downloader.switch_count += 1
+            previous = quality
+            next_write += 1
+
+            quality = downloader.select_quality_index()
+            for n, (other, other_key) in list(in_flight.items()):
+                if other < quality:
+                    link.cancel(other_key)
+                    segment_keys.discard(other_key)
+                    del in_flight[n]
+                    submit(n, quality)
+
+        wall_time = time.perf_counter() - wall_start
+        downloader.played_bitrates = bitrates
+        stats = downloader.session_stats()
+        del stats['transport']
+        mbps = [b / 1e6 for b in bitrates]
+        smoothness = sum(abs(b - a) for a, b in zip(mbps, mbps[1:]))
+        stats.update({
+            'simulated_time': link.now,
+            'bytes': link.bytes_delivered,
+            # Linear QoE (Mbit/s of bitrate, minus stalls and bitrate changes), per segment
+            'qoe': (sum(mbps) - rebuffer_penalty * (buffer.rebuffer_time + buffer.startup_delay)
+                    - smoothness) / max(len(mbps), 1),
+            'speedup': link.now / wall_time if wall_time else math.inf,
+        })
+        return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline trace-driven ABR simulation over dash_content")
+    parser.add_argument('traces', nargs='+', help="throughput traces (see load_trace)")
+    parser.add_argument('--manifest', default='../dash_content/manifest.mpd')
+    parser.add_argument('--abr', nargs='+', default=['throughput', 'bola', 'hybrid'])
+    parser.add_argument('--abr-options', type=json.loads, default={},
+                        help='JSON keyword arguments per ABR rule, e.g. \'{"bola": {"min_buffer": 5}}\'')
+    parser.add_argument('--rtt', type=float, default=0.05, help="request round-trip time, seconds")
+    parser.add_argument('--max-buffer', type=float, default=30.0)
+    parser.add_argument('--prefetch', type=int, default=3)
+    parser.add_argument('--csv', help="write one row per (trace, ABR) run")
+    options = parser.parse_args(argv)
+    unknown = set(options.abr_options) - set(ABR_RULES)
+    if unknown or not all(isinstance(v, dict) for v in options.abr_options.values()):
+        parser.error(f"--abr-options must map rule names ({', '.join(sorted(ABR_RULES))}) "
+                     f"to keyword arguments, got {sorted(unknown) or options.abr_options}")
+
+    simulator = AbrSimulator(options.manifest)
+    rows = []
+    for path in options.traces:
+        trace = ThroughputTrace.from_file(path)
+        for abr in options.abr:
+            stats = simulator.run(trace, abr, options.abr_options.get(abr), options.rtt, options.max_buffer,
+                                  options.prefetch)
+            rows.append({'trace': path, **stats})
+            print(f"{os.path.basename(path)} {abr}: bitrate {stats['average_bitrate'] / 1000:.0f} kbps, "
+                  f"{stats['switches']} switches, stalls {stats['rebuffer_time']:.2f}s, "
+                  f"startup {stats['startup_delay']:.2f}s, QoE {stats['qoe']:.3f} "
+                  f"({stats['speedup']:.0f}x real time)")
+    if options.csv:
+        with open(options.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+if __name__ == "__main__":
+    main()
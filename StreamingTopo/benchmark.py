@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from mininet.net import Mininet
+from mininet.node import OVSController
+from mininet.link import TCLink
+from mininet.log import setLogLevel
+from abr_sim import load_trace
+from topo import StreamingTopo, client_link_params
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROTOCOLS = ('quic', 'dash', 'dash-h3')
+METRICS = ('ttfb', 'throughput_mbps', 'elapsed', 'bytes', 'startup_delay',
+           'rebuffer_time', 'rebuffer_count', 'average_bitrate_kbps', 'switches')
+
+# One cell of the sweep; bw is in Mbit/s, delay/jitter as tc strings ('20ms'),
+# loss in percent. With a trace, bw is replaced over time by the trace.
+Scenario = namedtuple('Scenario', ['name', 'bw', 'delay', 'jitter', 'loss', 'trace'])
+
+class TraceReplayer(threading.Thread):
+    """Reapply the client link's tc settings as a bandwidth trace advances
+
+    TCIntf.config() rebuilds the whole qdisc, so the scenario's delay,
+    jitter and loss are passed again with every bandwidth change. The last
+    trace value holds until stop() is called.
+    """
+    def __init__(self, link, trace, scenario):
+        super().__init__(daemon=True)
+        self.link = link
+        self.trace = trace
+        self.scenario = scenario
+        self._stop_event = threading.Event()
+
+    def run(self):
+        start = time.monotonic() - self.trace[0][0]
+        for offset, bw in self.trace:
+            if self._stop_event.wait(max(0.0, start + offset - time.monotonic())):
+                return
+            params = client_link_params(bw, self.scenario.delay, self.scenario.jitter, self.scenario.loss)
+            for intf in (self.link.intf1, self.link.intf2):
+                intf.config(**params)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def build_scenarios(bws, delays, jitters, losses, traces):
+    """Cartesian product of the link parameters, in a fixed order"""
+    scenarios = []
+    shaping = list(itertools.product(delays, jitters, losses))
+    for bw, (delay, jitter, loss) in itertools.product(bws, shaping):
+        name = f"bw{bw:g}_d{delay or 0}_j{jitter or 0}_l{loss or 0:g}"
+        scenarios.append(Scenario(name, bw, delay, jitter, loss, None))
+    for trace, (delay, jitter, loss) in itertools.product(traces, shaping):
+        stem = os.path.splitext(os.path.basename(trace))[0]
+        name = f"trace-{stem}_d{delay or 0}_j{jitter or 0}_l{loss or 0:g}"
+        scenarios.append(Scenario(name, load_trace(trace)[0][1], delay, jitter, loss, trace))
+    return scenarios
+
+def start_server(node, args, log_path):
+    log = open(log_path, 'w')
+    process = node.popen([sys.executable, '-u'] + args, cwd=HERE, stdout=log, stderr=subprocess.STDOUT)
+    process.log = log
+    return process
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    process.log.close()
+
+def run_client(node, protocol, run_dir, options):
+    """Run one client session on `node` and return its result dict"""
+    os.makedirs(run_dir, exist_ok=True)
+    cmd = [sys.executable, os.path.join(HERE, 'benchmark.py'), 'client', protocol,
+           '--video', options.video, '--duration', str(options.duration)]
+    output = node.cmd(f"cd {shlex.quote(run_dir)} && timeout {options.timeout} "
+                      f"{shlex.join(cmd)} > client.log 2>&1; tail -n 1 client.log")
+    try:
+        return json.loads(output.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {'error': 'client produced no result (see client.log)'}
+
+def run_scenario(scenario, options, out_dir):
+    """Start a fresh network for one scenario and run every protocol/repetition"""
+    topology = StreamingTopo(bw=scenario.bw, delay=scenario.delay, jitter=scenario.jitter,
+                             loss=scenario.loss)
+    net = Mininet(topo=topology, link=TCLink, controller=OVSController)
+    net.start()
+    servers = []
+    rows = []
+    try:
+        s1, s2, c1 = net.get('s1', 's2', 'c1')
+        c1.cmd('ip route add 10.0.0.0/24 dev c1-eth0')
+        client_link = net.linksBetween(c1, net.get('r1'))[0]
+        scenario_dir = os.path.join(out_dir, scenario.name)
+        os.makedirs(scenario_dir, exist_ok=True)
+
+        if 'quic' in options.protocols:
+            servers.append(start_server(
+                s1, ['-c', 'import asyncio, quic_server; asyncio.run(quic_server.run_quic_server())'],
+                os.path.join(scenario_dir, 'quic_server.log')))
+        if 'dash' in options.protocols:
+            servers.append(start_server(s2, ['dash_server.py'], os.path.join(scenario_dir, 'dash_server.log')))
+        if 'dash-h3' in options.protocols:
+            servers.append(start_server(s2, ['h3_server.py'], os.path.join(scenario_dir, 'h3_server.log')))
+        time.sleep(options.server_startup)
+
+        for repetition in range(options.repetitions):
+            for protocol in options.protocols:
+                # Each run replays the trace from its start, so runs see the same conditions
+                replayer = None
+                if scenario.trace:
+                    replayer = TraceReplayer(client_link, load_trace(scenario.trace), scenario)
+                    replayer.start()
+                try:
+                    print(f"[{scenario.name}] {protocol} run {repetition + 1}/{options.repetitions}")
+                    run_dir = os.path.join(scenario_dir, f"{protocol}_{repetition}")
+                    result = run_client(c1, protocol, run_dir, options)
+                finally:
+                    if replayer is not None:
+                        replayer.stop()
+                rows.append({'scenario': scenario.name, 'bw': scenario.bw, 'delay': scenario.delay or '',
+                             'jitter': scenario.jitter or '', 'loss': scenario.loss or 0,
+                             'trace': scenario.trace or '', 'protocol': protocol,
+                             'repetition': repetition, **result})
+    finally:
+        for process in servers:
+            stop_server(process)
+        net.stop()
+    return rows
+
+def summarize(rows):
+    """Median of every metric per (scenario, protocol), over successful runs"""
+    summary = []
+    key = lambda row: (row['scenario'], row['protocol'])
+    for (scenario, protocol), group in itertools.groupby(sorted(rows, key=key), key=key):
+        group = list(group)
+        ok = [row for row in group if not row.get('error')]
+        entry = {'scenario': scenario, 'protocol': protocol, 'runs': len(group), 'failed': len(group) - len(ok)}
+        for metric in METRICS:
+            values = [row[metric] for row in ok if row.get(metric) is not None]
+            entry[metric] = round(statistics.median(values), 4) if values else ''
+        summary.append(entry)
+    return summary
+
+def write_csv(path, rows, fields):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+def print_table(summary):
+    columns = ['scenario', 'protocol', 'runs', 'ttfb', 'throughput_mbps', 'rebuffer_time',
+               'average_bitrate_kbps']
+    widths = [max(len(column), *(len(str(entry[column])) for entry in summary)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for entry in summary:
+        print('  '.join(str(entry[column]).ljust(width) for column, width in zip(columns, widths)))
+
+def run_benchmark(options):
+    out_dir = os.path.abspath(options.out or os.path.join(
+        HERE, '..', 'Results', datetime.now().strftime('bench_%Y%m%d_%H%M%S')))
+    os.makedirs(out_dir, exist_ok=True)
+    scenarios = build_scenarios(options.bw, options.delay, options.jitter, options.loss, options.trace)
+    revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True).stdout.strip()
+    # Everything needed to rerun the same sweep
+    with open(os.path.join(out_dir, 'config.json'), 'w') as f:
+        json.dump({'argv': sys.argv[1:], 'revision': revision, 'kernel': os.uname().release,
+                   'started': datetime.now().isoformat(timespec='seconds'),
+                   'scenarios': [scenario._asdict() for scenario in scenarios]}, f, indent=2)
+
+    rows = []
+    fields = ['scenario', 'bw', 'delay', 'jitter', 'loss', 'trace', 'protocol', 'repetition',
+              *METRICS, 'error']
+    for scenario in scenarios:
+        rows += run_scenario(scenario, options, out_dir)
+        # Rewritten after every scenario so an interrupted sweep keeps its results
+        write_csv(os.path.join(out_dir, 'runs.csv'), rows, fields)
+    summary = summarize(rows)
+    write_csv(os.path.join(out_dir, 'summary.csv'), summary,
+              ['scenario', 'protocol', 'runs', 'failed', *METRICS])
+    print_table(summary)
+    print(f"Results written to {out_dir}")
+    return summary
+
+def quic_session(video, duration):
+    """Fetch one video over the QUIC stream protocol; runs on c1
+
+    An error reply, a dropped connection or a body shorter than the size
+    the server announced fails the run instead of counting as a sample.
+    """
+    from quic_client import TransferError, VideoStreamClient
+    start = time.time()
+    try:
+        transfer = asyncio.run(VideoStreamClient().run('10.0.0.1', 4433, video.encode()))
+    except TransferError as e:
+        transfer = e.transfers[0]
+    elapsed = time.time() - start
+    if transfer.filename and os.path.exists(transfer.filename):
+        os.remove(transfer.filename)
+    error = transfer.error
+    if error is None and transfer.bytes_received != transfer.expected_size:
+        error = f"received {transfer.bytes_received} of {transfer.expected_size} bytes"
+    if error is not None:
+        return {'error': error, 'elapsed': elapsed, 'bytes': transfer.bytes_received}
+    return {
+        'ttfb': transfer.start_time + transfer.first_chunk_time - start,
+        'elapsed': elapsed,
+        'bytes': transfer.bytes_received,
+        'throughput_mbps': transfer.bytes_received * 8 / elapsed / 1e6,
+    }
+
+def dash_session(video, duration, transport):
+    """Play the DASH presentation through DashVideoDownloader; runs on c1"""
+    from dash_client import DashVideoDownloader
+    if transport == 'h3':
+        url = 'https://10.0.0.2:8443/manifest.mpd'
+    else:
+        url = 'http://10.0.0.2:8080/manifest.mpd'
+    downloader = DashVideoDownloader(url, transport=transport)
+    start = time.time()
+    downloader.fetch_manifest()
+    ttfb = time.time() - start
+    downloader.download_video('dash_output.mp4', duration=duration)
+    elapsed = time.time() - start
+    size = os.path.getsize('dash_output.mp4')
+    os.remove('dash_output.mp4')
+    stats = downloader.session_stats()
+    return {
+        'ttfb': ttfb,
+        'elapsed': elapsed,
+        'bytes': size,
+        'throughput_mbps': size * 8 / elapsed / 1e6,
+        'startup_delay': stats['startup_delay'],
+        'rebuffer_time': stats['rebuffer_time'],
+        'rebuffer_count': stats['rebuffer_count'],
+        'average_bitrate_kbps': stats['average_bitrate'] / 1000,
+        'switches': stats['switches'],
+    }
+
+def client_main(options):
+    """Client side of one run: print the result as the last output line"""
+    try:
+        if options.protocol == 'quic':
+            result = quic_session(options.video, options.duration)
+        else:
+            result = dash_session(options.video, options.duration,
+                                  'h3' if options.protocol == 'dash-h3' else 'http')
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    print(json.dumps(result), flush=True)
+    # Background connection threads must not keep the process alive
+    os._exit(0)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Mininet benchmark for the QUIC and DASH paths")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sweep = commands.add_parser('sweep', help="run the parameter sweep (as root)")
+    sweep.add_argument('--bw', type=float, nargs='+', default=[10.0], help="link bandwidths, Mbit/s")
+    sweep.add_argument('--delay', nargs='+', default=[None], help="one-way delays on the client link, e.g. 20ms")
+    sweep.add_argument('--jitter', nargs='+', default=[None], help="delay jitter, e.g. 5ms")
+    sweep.add_argument('--loss', type=float, nargs='+', default=[None], help="loss on the client link, percent")
+    sweep.add_argument('--trace', nargs='*', default=[], help="bandwidth traces (see abr_sim.load_trace)")
+    sweep.add_argument('--protocols', nargs='+', choices=PROTOCOLS, default=list(PROTOCOLS))
+    sweep.add_argument('--repetitions', type=int, default=3)
+    sweep.add_argument('--video', default='sample_high.mp4', help="file requested by the QUIC client")
+    sweep.add_argument('--duration', type=int, default=30, help="DASH download budget (see download_video)")
+    sweep.add_argument('--timeout', type=int, default=300, help="seconds before a client run is killed")
+    sweep.add_argument('--server-startup', type=float, default=2.0, help="seconds to wait for the servers")
+    sweep.add_argument('--out', help="results directory (default: Results/bench_<timestamp>)")
+
+    client = commands.add_parser('client', help="one client run (used by sweep inside c1)")
+    client.add_argument('protocol', choices=PROTOCOLS)
+    client.add_argument('--video', default='sample_high.mp4')
+    client.add_argument('--duration', type=int, default=30)
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    options = parse_args()
+    if options.command == 'client':
+        client_main(options)
+    else:
+        setLogLevel('warning')
+        run_benchmark(options)
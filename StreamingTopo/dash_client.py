@@ -1,37 +1,137 @@
 import requests
-import xml.etree.ElementTree as ET
+import requests.adapters
 import time
 import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from abr import AbrRule, PlaybackBuffer, ThroughputEstimator, create_abr_rule
+from h3_client import H3Session
+from mp4_index import find_box, parse_sidx
+from mpd import fill_template, parse_mpd
+
+class SegmentCancelled(Exception):
+    """A segment download was abandoned in favour of another quality"""
+
+class SegmentMissing(Exception):
+    """The segment number lies past the end of the representation"""
+
+# A segment fetch queued or running in the prefetch pipeline
+PendingSegment = namedtuple('PendingSegment', 'segment_num quality_index attempt future cancel_event')
+
+# Where to fetch one segment: URL, inclusive (first, last) byte range or
+# None for the whole resource, media duration in seconds, and for live
+# streams the epoch time at which the segment becomes available
+SegmentRequest = namedtuple('SegmentRequest', 'url byte_range duration available_at')
 
 class DashVideoDownloader:
-    def __init__(self, manifest_url):
+    def __init__(self, manifest_url, abr="hybrid", max_buffer=30.0, prefetch=3,
+                 target_buffer=None, max_retries=3, retry_backoff=0.5, live_delay=None,
+                 transport="http"):
         self.manifest_url = manifest_url
         self.manifest = None
+        # Validators of the last manifest response, for conditional refresh
+        self.manifest_etag = None
+        self.manifest_last_modified = None
+        self.manifest_fetched_at = 0.0
+        # Live streams: seconds behind the live edge to start playback
+        # (default: the MPD's suggestedPresentationDelay)
+        self.live_delay = live_delay
         self.current_quality = 0
         self.download_history = []
+        self.played_bitrates = []  # bandwidth of each segment written, in order
+        # Pluggable ABR rule (an AbrRule or one of "throughput", "bola", "hybrid")
+        self.abr = abr if isinstance(abr, AbrRule) else create_abr_rule(abr)
+        self.buffer = PlaybackBuffer(max_level=max_buffer)
+        self.throughput = ThroughputEstimator()
+        self.switch_count = 0
+        # Prefetch pipeline: requests in flight, buffer level to fill up to,
+        # and retries (at a lower quality, with exponential back-off)
+        self.prefetch = prefetch
+        self.target_buffer = target_buffer if target_buffer is not None else max_buffer
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        # One keep-alive session for the manifest and all segments: HTTP/1.1
+        # with a connection per prefetch worker, or HTTP/3 ("h3") with every
+        # fetch multiplexed on one QUIC connection
+        self.transport = transport
+        if transport == "h3":
+            self.session = H3Session()
+        elif transport == "http":
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(prefetch, 1))
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+        else:
+            raise ValueError(f"Unknown transport {transport!r}; choose 'http' or 'h3'")
+        self.chunk_size = 64 * 1024
+        self.sample_interval = 0.05  # seconds per throughput sample
+        # SegmentBase representations: media URL -> (init segment, SegmentIndex),
+        # fetched once per representation
+        self._indexes = {}
+        # SegmentTemplate representations: initialization URL -> bytes
+        self._init_segments = {}
         
     def fetch_manifest(self):
-        """Download and parse the DASH manifest"""
-        response = requests.get(self.manifest_url)
+        """Download and parse the DASH manifest; return False if it was unchanged
+
+        Once a manifest is loaded the request is conditional (If-None-Match /
+        If-Modified-Since), so refreshing an unchanged MPD costs a 304 and
+        no parsing.
+        """
+        headers = {}
+        if self.manifest is not None:
+            if self.manifest_etag:
+                headers['If-None-Match'] = self.manifest_etag
+            if self.manifest_last_modified:
+                headers['If-Modified-Since'] = self.manifest_last_modified
+        response = self.session.get(self.manifest_url, headers=headers)
+        self.manifest_fetched_at = time.time()
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+        self.manifest_etag = response.headers.get('ETag')
+        self.manifest_last_modified = response.headers.get('Last-Modified')
         self.manifest = self.parse_mpd(response.content)
+        return True
+
+    def is_live(self):
+        return self.manifest is not None and self.manifest.type == 'dynamic'
+
+    def manifest_refresh_due(self):
+        """Time at which a dynamic manifest should be fetched again"""
+        period = self.manifest.minimum_update_period or self.segment_duration()
+        return self.manifest_fetched_at + period
+
+    def refresh_manifest(self, wait=False):
+        """Refetch a dynamic manifest once minimumUpdatePeriod has passed
+
+        With wait=True, sleep until the refresh is due instead of returning.
+        Returns True if a new manifest was loaded.
+        """
+        if not self.is_live():
+            return False
+        delay = self.manifest_refresh_due() - time.time()
+        if delay > 0:
+            if not wait:
+                return False
+            time.sleep(delay)
+        try:
+            changed = self.fetch_manifest()
+        except requests.RequestException as e:
+            print(f"Manifest refresh failed: {e}")
+            return False
+        if changed:
+            print(f"Manifest updated ({self.manifest.type})")
+        return changed
         
     def get_available_bitrates(self):
-        """Return available bitrates sorted from lowest to highest"""
+        """Return the video representations sorted from lowest to highest bandwidth"""
         if not self.manifest:
             self.fetch_manifest()
-            
-        # Extract video representations from the dictionary structure
-        video_reps = []
-        for period in self.manifest['periods']:
-            for adapt_set in period['adaptation_sets']:
-                content_types = [comp.get('content_type', '') 
-                               for comp in adapt_set.get('content_components', [])]
-                if any('video' in ct.lower() for ct in content_types):
-                    for rep in adapt_set.get('representations', []):
-                        video_reps.append((rep.get('bandwidth', 0), rep.get('id', ''), rep))
-        
-        # Sort by bandwidth
-        return sorted(video_reps, key=lambda x: x[0])
+        return self.manifest.ladder
     
     def calculate_current_bitrate(self, segment_size, download_time):
         """Calculate current network bitrate in bits per second"""
@@ -55,54 +155,307 @@ class DashVideoDownloader:
         else:
             return "good"
     
+    def segment_duration(self):
+        """Media duration of one download unit in seconds"""
+        if not self.manifest:
+            self.fetch_manifest()
+        if self.manifest.ladder:
+            template = self.manifest.ladder[0].segment_template
+            if template is not None and template.duration:
+                return template.duration / template.timescale
+        return self.manifest.max_segment_duration or self.manifest.duration or 4.0
+
     def select_quality_index(self):
-        """Select appropriate quality index based on network conditions"""
-        available_qualities = self.get_available_bitrates()
-        if not available_qualities:
+        """Select quality index with the ABR rule, from manifest bandwidths and buffer level"""
+        if not self.manifest:
+            self.fetch_manifest()
+        bitrates = self.manifest.bitrates
+        if not bitrates:
             return 0
-            
-        condition = self.get_network_condition()
-        
-        if condition == "poor":
-            return 0  # lowest quality
-        elif condition == "moderate":
-            return len(available_qualities) // 2  # middle quality
-        else:
-            return len(available_qualities) - 1  # highest quality
+        return self.abr.select(bitrates, self.buffer, self.throughput, self.segment_duration())
+
+    def session_stats(self):
+        """Per-session QoE counters"""
+        return {
+            "abr": self.abr.name,
+            "transport": self.transport,
+            "segments": len(self.download_history),
+            "switches": self.switch_count,
+            "rebuffer_count": self.buffer.rebuffer_count,
+            "rebuffer_time": self.buffer.rebuffer_time,
+            "startup_delay": self.buffer.startup_delay,
+            "buffer_level": self.buffer.level,
+            "average_bitrate": (sum(self.played_bitrates) / len(self.played_bitrates)
+                                if self.played_bitrates else 0),
+        }
     
     def get_representation_by_index(self, quality_index):
         """Get representation by quality index"""
-        available_qualities = self.get_available_bitrates()
-        if 0 <= quality_index < len(available_qualities):
-            return available_qualities[quality_index][2]  # Return the rep dict
-        return available_qualities[-1][2] if available_qualities else None
+        ladder = self.get_available_bitrates()
+        if 0 <= quality_index < len(ladder):
+            return ladder[quality_index]
+        return ladder[-1] if ladder else None
+
+    def download_segment(self, segment_url, cancel_event=None, byte_range=None):
+        """Download a single segment and measure performance
 
-    def download_segment(self, segment_url):
-        """Download a single segment and measure performance"""
+        The body is streamed into a buffer preallocated from Content-Length
+        (or joined once from its chunks when the length is unknown), and
+        throughput samples are taken every sample_interval seconds while it
+        arrives. If cancel_event is set while the body is streaming, the
+        download is abandoned and SegmentCancelled is raised. byte_range
+        (first, last) fetches only those bytes with an HTTP Range request.
+        """
         start_time = time.time()
-        response = requests.get(segment_url, stream=True)
+        headers = {'Range': 'bytes=%d-%d' % byte_range} if byte_range else None
+        response = self.session.get(segment_url, stream=True, headers=headers)
         response.raise_for_status()
+        if byte_range and response.status_code != 206:
+            response.close()
+            raise requests.HTTPError(
+                f"Server ignored Range request for {segment_url} (status {response.status_code})",
+                response=response,
+            )
         
-        # Read the content to measure download
-        content = b''
-        for chunk in response.iter_content(chunk_size=8192):
-            content += chunk
+        length = response.headers.get('Content-Length')
+        content = bytearray(int(length)) if length else None
+        view = memoryview(content) if content is not None else None
+        chunks = []
+        received = 0
+        sample_start, sample_bytes = start_time, 0
+        with response:
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise SegmentCancelled(segment_url)
+                size = len(chunk)
+                if view is not None and received + size <= len(view):
+                    view[received:received + size] = chunk
+                else:
+                    chunks.append(chunk)
+                received += size
+                
+                # Per-chunk throughput samples for the bandwidth estimator
+                sample_bytes += size
+                now = time.time()
+                if now - sample_start >= self.sample_interval:
+                    self._add_throughput_sample(sample_bytes, now - sample_start)
+                    sample_start, sample_bytes = now, 0
+        
+        if content is None:
+            content = b''.join(chunks)
+        elif chunks or received < len(content):
+            # Content-Length was wrong; fall back to what actually arrived
+            content = bytes(view[:min(received, len(content))]) + b''.join(chunks)
         
         download_time = time.time() - start_time
+        if sample_bytes:
+            self._add_throughput_sample(sample_bytes, time.time() - sample_start)
         segment_size = len(content)
         bitrate = self.calculate_current_bitrate(segment_size, download_time)
         
         # Store this download's metrics
-        self.download_history.append((bitrate, download_time))
+        with self._lock:
+            self.download_history.append((bitrate, download_time))
         
         return content
 
-    def download_video(self, output_file, duration=60):
-        """Download video segments with adaptive quality"""
+    def _add_throughput_sample(self, size, elapsed):
+        if elapsed > 0:
+            with self._lock:
+                self.throughput.add_sample(self.calculate_current_bitrate(size, elapsed), elapsed)
+
+    def representation_index(self, quality_index):
+        """(init segment, SegmentIndex) of a SegmentBase representation, or None
+
+        The initialization range and the sidx box are fetched together in a
+        single Range request the first time a representation is used.
+        """
+        representation = self.get_representation_by_index(quality_index)
+        if not representation or not representation.segment_base:
+            return None
+        url = representation.url
+        cached = self._indexes.get(url)
+        if cached is not None:
+            return cached
+        
+        index_range = representation.segment_base.index_range
+        init_range = representation.segment_base.initialization
+        if index_range is None:
+            return None
+        last = max(index_range[1], init_range[1] if init_range else 0)
+        response = self.session.get(url, headers={'Range': f'bytes=0-{last}'})
+        response.raise_for_status()
+        data = response.content
+        
+        # Without indexRangeExact the range may only contain the sidx box
+        sidx_offset = find_box(data, b'sidx', index_range[0])
+        if sidx_offset < 0:
+            raise ValueError(f"No sidx box in index range of {url}")
+        index = parse_sidx(memoryview(data)[sidx_offset:], sidx_offset)
+        init = data[init_range[0]:init_range[1] + 1] if init_range else b''
+        print(f"Indexed representation {representation.id}: {len(index)} subsegments")
+        self._indexes[url] = (init, index)
+        return self._indexes[url]
+
+    def init_segment(self, quality_index):
+        """Initialization segment bytes for a quality, or b'' if it has none"""
+        representation = self.get_representation_by_index(quality_index)
+        template = representation.segment_template if representation else None
+        if template is None or not template.initialization:
+            indexed = self.representation_index(quality_index)
+            return indexed[0] if indexed else b''
+        url = urljoin(representation.url, fill_template(
+            template.initialization, representation.id, bandwidth=representation.bandwidth))
+        init = self._init_segments.get(url)
+        if init is None:
+            response = self.session.get(url)
+            response.raise_for_status()
+            init = self._init_segments[url] = response.content
+        return init
+
+    def first_segment_number(self):
+        """Number of the first segment to play
+
+        For live SegmentTemplate streams this is the segment live_delay
+        seconds behind the live edge, clamped to the time-shift window.
+        """
+        representation = self.get_representation_by_index(0)
+        template = representation.segment_template if representation else None
+        if template is None:
+            return 1
+        if not self.is_live() or self.manifest.availability_start_time is None:
+            return template.start_number
+        delay = self.live_delay
+        if delay is None:
+            delay = self.manifest.suggested_presentation_delay
+        if delay is None:
+            delay = 3 * self.segment_duration()
+        period_time = time.time() - self.manifest.availability_start_time - template.period_start
+        index = template.index_at(max(period_time - delay, 0))
+        depth = self.manifest.time_shift_buffer_depth
+        if depth is not None:
+            index = max(index, template.index_at(max(period_time - depth, 0)) + 1)
+        count = template.count()
+        if count is not None:
+            index = min(index, count - 1)
+        return template.start_number + max(index, 0)
+
+    def _template_request(self, representation, segment_num):
+        template = representation.segment_template
+        segment = template.segment(segment_num - template.start_number)
+        if segment is None:
+            return None
+        start, duration = segment
+        url = urljoin(representation.url, fill_template(
+            template.media, representation.id, number=segment_num,
+            bandwidth=representation.bandwidth, time=start))
+        available_at = None
+        if self.is_live() and self.manifest.availability_start_time is not None:
+            available_at = (self.manifest.availability_start_time + template.period_start
+                            + template.end_time(start, duration))
+        return SegmentRequest(url, None, duration / template.timescale, available_at)
+
+    def segment_request(self, quality_index, segment_num):
+        """SegmentRequest for a segment at the given quality, or None
+
+        SegmentTemplate representations are addressed by segment number
+        ($Number$, honouring startNumber) and timeline; SegmentBase ones by
+        subsegment through the sidx index (segment_num 1 is the first
+        subsegment). None is returned past the last segment.
+        """
+        representation = self.get_representation_by_index(quality_index)
+        if representation is not None and representation.segment_template is not None:
+            return self._template_request(representation, segment_num)
+        indexed = self.representation_index(quality_index)
+        if indexed is None:
+            url = self.segment_url(quality_index, segment_num)
+            return SegmentRequest(url, None, self.segment_duration(), None) if url else None
+        index = indexed[1]
+        if not 1 <= segment_num <= len(index):
+            return None
+        n = segment_num - 1
+        return SegmentRequest(representation.url, index.byte_range(n), index.duration(n), None)
+
+    def segment_url(self, quality_index, segment_num):
+        """Absolute URL of a segment at the given quality, or None"""
+        representation = self.get_representation_by_index(quality_index)
+        if not representation:
+            print("No representation found for selected quality")
+            return None
+        
+        base_url = representation.url
+        if not base_url:
+            print("No base URL found")
+            return None
+        
+        # Generate segment URL
+        return self.generate_segment_url(base_url, segment_num)
+
+    def _index_pending(self, quality_index):
+        """True if resolving a segment of this quality still needs its sidx fetched"""
+        representation = self.get_representation_by_index(quality_index)
+        return (representation is not None and representation.segment_template is None
+                and representation.segment_base is not None and representation.url not in self._indexes)
+
+    def _fetch(self, quality_index, segment_num, request, cancel_event, delay):
+        """Worker: wait for retry back-off and live availability, then download
+
+        request is None when the representation's sidx has not been loaded
+        yet. The index and the initialization segment are fetched here,
+        not on the download loop, so their failures take the same
+        retry-at-lower-quality path as segment downloads.
+        Returns (data, seconds, media duration).
+        """
+        if delay > 0 and cancel_event.wait(delay):
+            raise SegmentCancelled(f"segment {segment_num}")
+        if request is None:
+            request = self.segment_request(quality_index, segment_num)
+            if request is None:
+                raise SegmentMissing(f"No segment {segment_num} at quality {quality_index}")
+        self.init_segment(quality_index)  # cached for when the segment is written
+        if request.available_at is not None:
+            delay = request.available_at - time.time()
+            if delay > 0 and cancel_event.wait(delay):
+                raise SegmentCancelled(request.url)
+        start_time = time.time()
+        data = self.download_segment(request.url, cancel_event, request.byte_range)
+        return data, time.time() - start_time, request.duration
+
+    def _submit(self, executor, segment_num, quality_index, attempt=0):
+        """Queue a segment fetch; None if the segment is known not to exist"""
+        request = None
+        if not self._index_pending(quality_index):
+            request = self.segment_request(quality_index, segment_num)
+            if request is None:
+                return None
+        representation = self.get_representation_by_index(quality_index)
+        print(f"Requesting segment {segment_num} at quality {quality_index} "
+              f"({representation.bandwidth} bps)")
+        cancel_event = threading.Event()
+        delay = self.retry_backoff * (2 ** (attempt - 1)) if attempt else 0
+        future = executor.submit(self._fetch, quality_index, segment_num, request, cancel_event, delay)
+        return PendingSegment(segment_num, quality_index, attempt, future, cancel_event)
+
+    def download_video(self, output_file, duration=60, max_segments=99):
+        """Download video segments with adaptive quality
+
+        Up to self.prefetch segment requests are kept in flight while the
+        simulated buffer plus the in-flight segments stay below
+        self.target_buffer. Segments are written to output_file in order,
+        each preceded by its representation's initialization segment when the
+        quality changes. When the ABR decision rises above the quality of a
+        queued, running or finished but not yet written fetch, that fetch is
+        dropped and re-requested at the new quality, so a stale low-quality
+        prefetch never lands between higher-quality segments.
+        
+        Live (dynamic) manifests start near the live edge, fetch each segment
+        once it is available, and are refreshed every minimumUpdatePeriod;
+        running out of listed segments waits for the next manifest update.
+        """
         if not self.manifest:
             self.fetch_manifest()
         
-        if not self.manifest or 'periods' not in self.manifest or not self.manifest['periods']:
+        if not self.manifest or not self.manifest.periods:
             print("No manifest or periods found")
             return False
         
@@ -112,178 +465,138 @@ class DashVideoDownloader:
             print("No video representations found")
             return False
         
-        print(f"Available qualities: {[(q[0], q[1]) for q in available_qualities]}")
+        print(f"Available qualities: {[(rep.bandwidth, rep.id) for rep in available_qualities]}")
         
-        # Start with middle quality
-        current_quality_index = len(available_qualities) // 2
+        previous_quality_index = None
+        segment_duration = self.segment_duration()
         segment_count = 0
         total_downloaded = 0
+        in_flight = {}  # segment_num -> PendingSegment
+        next_request = next_write = self.first_segment_number()
+        last_segment = next_write + max_segments - 1
+        buffer_clock = time.time()  # when the playback buffer was last updated
         
-        with open(output_file, 'wb') as output_f:
-            # Download segments with adaptive quality
-            for segment_num in range(1, 100):  # Limit to 100 segments for safety
-                # Select quality based on current network conditions
-                current_quality_index = self.select_quality_index()
-                representation = self.get_representation_by_index(current_quality_index)
+        with open(output_file, 'wb') as output_f, \
+                ThreadPoolExecutor(max_workers=self.prefetch) as executor:
+            while next_write <= last_segment:
+                self.refresh_manifest()
+                # Keep the pipeline full up to the target buffer level
+                while (len(in_flight) < self.prefetch and next_request <= last_segment
+                       and (not in_flight or self.buffer.level + len(in_flight) * segment_duration
+                            < self.target_buffer)):
+                    pending = self._submit(executor, next_request, self.select_quality_index())
+                    if pending is None:
+                        if not self.is_live():
+                            last_segment = next_request - 1
+                        break
+                    in_flight[next_request] = pending
+                    next_request += 1
                 
-                if not representation:
-                    print("No representation found for selected quality")
+                pending = in_flight.pop(next_write, None)
+                if pending is None:
+                    # A live manifest may list more segments after its next update
+                    if self.is_live():
+                        self.refresh_manifest(wait=True)
+                        continue
                     break
                 
-                base_url = representation.get('base_url', '')
-                if not base_url:
-                    print("No base URL found")
+                try:
+                    segment_data, _, media_duration = pending.future.result()
+                except SegmentMissing as e:
+                    # Only known once the representation's index is loaded
+                    print(f"{e}, stopping")
+                    last_segment = next_write - 1
                     break
+                except SegmentCancelled:
+                    # Replaced by another fetch that was not registered; request again
+                    pending = self._submit(executor, next_write, self.select_quality_index())
+                    if pending is None:
+                        break
+                    in_flight[next_write] = pending
+                    continue
+                except requests.RequestException as e:
+                    status = getattr(e.response, 'status_code', None)
+                    if status == 404 and not self.is_live():
+                        # No such segment: the presentation ends here
+                        print(f"Segment {next_write} not found, stopping")
+                        last_segment = next_write - 1
+                        break
+                    print(f"Error downloading segment {next_write}: {e}")
+                    if pending.attempt >= self.max_retries:
+                        break
+                    # Retry at a lower quality after an exponential back-off
+                    pending = self._submit(
+                        executor, next_write, max(0, pending.quality_index - 1), pending.attempt + 1
+                    )
+                    if pending is None:
+                        break
+                    in_flight[next_write] = pending
+                    continue
                 
-                # Make URL absolute if relative
-                if not base_url.startswith(('http://', 'https://')):
-                    base_dir = '/'.join(self.manifest_url.split('/')[:-1]) + '/'
-                    base_url = base_dir + base_url
+                self.buffer.wait_for_room(media_duration)
+                if pending.quality_index != previous_quality_index:
+                    output_f.write(self.init_segment(pending.quality_index))
+                output_f.write(segment_data)
+                now = time.time()
+                self.buffer.on_download(now - buffer_clock, media_duration)
+                buffer_clock = now
+                self.played_bitrates.append(self.manifest.bitrates[pending.quality_index])
                 
-                # Generate segment URL
-                segment_url = self.generate_segment_url(base_url, segment_num)
+                if previous_quality_index is not None and pending.quality_index != previous_quality_index:
+                    self.switch_count += 1
+                previous_quality_index = pending.quality_index
+                segment_count += 1
+                total_downloaded += len(segment_data)
+                next_write += 1
                 
-                print(f"Downloading segment {segment_num} at quality {current_quality_index} "
-                      f"({representation.get('bandwidth', 0)} bps)")
+                # Print network status
+                if self.download_history:
+                    recent_bitrate = self.download_history[-1][0]
+                    print(f"  Segment {pending.segment_num} done. Network: {recent_bitrate/1000000:.2f} Mbps, "
+                          f"Condition: {self.get_network_condition()}, "
+                          f"Buffer: {self.buffer.level:.1f}s")
                 
-                try:
-                    # Download segment and measure performance
-                    segment_data = self.download_segment(segment_url)
-                    output_f.write(segment_data)
-                    
-                    segment_count += 1
-                    total_downloaded += len(segment_data)
-                    
-                    # Print network status
-                    if self.download_history:
-                        recent_bitrate = self.download_history[-1][0]
-                        print(f"  Network: {recent_bitrate/1000000:.2f} Mbps, "
-                              f"Condition: {self.get_network_condition()}")
-                    
-                    # Check if we've reached the desired duration
-                    if total_downloaded > duration * 1024 * 1024:  # Approximate based on MB
-                        break
-                        
-                except requests.RequestException as e:
-                    print(f"Error downloading segment {segment_num}: {e}")
-                    # Lower quality on error
-                    current_quality_index = max(0, current_quality_index - 1)
-                    time.sleep(1)  # Wait before retry
-                    continue
+                # Check if we've reached the desired duration
+                if total_downloaded > duration * 1024 * 1024:  # Approximate based on MB
+                    break
+                
+                # Upgrade outstanding fetches that the ABR now considers too low,
+                # including finished ones that have not been written yet
+                quality_index = self.select_quality_index()
+                for num, other in list(in_flight.items()):
+                    if other.quality_index < quality_index:
+                        # Keep the old fetch unless a replacement was actually queued
+                        replacement = self._submit(executor, num, quality_index)
+                        if replacement is None:
+                            continue
+                        other.cancel_event.set()
+                        other.future.cancel()
+                        print(f"Replaced segment {num} fetch: quality {other.quality_index} -> {quality_index}")
+                        in_flight[num] = replacement
+            
+            for other in in_flight.values():
+                other.cancel_event.set()
+                other.future.cancel()
         
         print(f"Download completed: {segment_count} segments, {total_downloaded/1024/1024:.2f} MB")
+        stats = self.session_stats()
+        print(f"ABR {stats['abr']}: {stats['switches']} switches, "
+              f"{stats['rebuffer_count']} rebuffers ({stats['rebuffer_time']:.2f}s), "
+              f"startup {stats['startup_delay']:.2f}s")
         return True
 
     def generate_segment_url(self, base_url, segment_num):
         """Generate segment URL based on pattern"""
-        if 'segment_' in base_url and '_.' in base_url:
-            # Pattern like "segment_1_.mp4" -> "segment_X_.mp4"
-            return base_url.replace('1_', f'{segment_num}_').replace('2_', f'{segment_num}_')
-        elif '$Number$' in base_url:
+        if '$Number' in base_url:
             # Template pattern
-            return base_url.replace('$Number$', str(segment_num))
+            return fill_template(base_url, '', number=segment_num)
         else:
             # Default: append segment number
             return f"{base_url}.{segment_num}"
 
     def parse_mpd(self, content):
-        """Parse MPD manifest using built-in XML parser"""
-        
-        # Parse XML
-        root = ET.fromstring(content)
-        
-        # Define namespace (MPD uses namespaces)
-        ns = {'mpd': 'urn:mpeg:dash:schema:mpd:2011'}
-        
-        # Extract basic info
-        info = {
-            'duration': root.get('mediaPresentationDuration'),
-            'min_buffer_time': root.get('minBufferTime'),
-            'type': root.get('type', 'static'),
-            'profiles': root.get('profiles', ''),
-            'periods': []
-        }
-        
-        # Parse periods
-        for period in root.findall('.//mpd:Period', ns):
-            period_info = {
-                'id': period.get('id', '1'),  # default id if not present
-                'start': period.get('start', ''),
-                'duration': period.get('duration', ''),
-                'adaptation_sets': []
-            }
-            
-            # Parse adaptation sets
-            for adapt_set in period.findall('.//mpd:AdaptationSet', ns):
-                adapt_info = {
-                    'id': adapt_set.get('id', ''),
-                    'segment_alignment': adapt_set.get('segmentAlignment', ''),
-                    'max_width': adapt_set.get('maxWidth', ''),
-                    'max_height': adapt_set.get('maxHeight', ''),
-                    'max_frame_rate': adapt_set.get('maxFrameRate', ''),
-                    'par': adapt_set.get('par', ''),
-                    'lang': adapt_set.get('lang', ''),
-                    'content_components': [],  # Store content components separately
-                    'representations': []
-                }
-                
-                # Parse content components to determine content type
-                for comp in adapt_set.findall('.//mpd:ContentComponent', ns):
-                    comp_info = {
-                        'id': comp.get('id', ''),
-                        'content_type': comp.get('contentType', '')
-                    }
-                    adapt_info['content_components'].append(comp_info)
-                
-                # Determine main content type from components
-                content_types = [comp.get('contentType', '') for comp in adapt_set.findall('.//mpd:ContentComponent', ns)]
-                if content_types:
-                    adapt_info['content_type'] = content_types[0]  # Use first content type
-                else:
-                    adapt_info['content_type'] = ''  # Fallback
-                
-                # Parse representations
-                for rep in adapt_set.findall('.//mpd:Representation', ns):
-                    rep_info = {
-                        'id': rep.get('id', ''),
-                        'mime_type': rep.get('mimeType', ''),
-                        'codecs': rep.get('codecs', ''),
-                        'bandwidth': int(rep.get('bandwidth', 0)) if rep.get('bandwidth') else 0,
-                        'width': int(rep.get('width', 0)) if rep.get('width') else 0,
-                        'height': int(rep.get('height', 0)) if rep.get('height') else 0,
-                        'frame_rate': rep.get('frameRate', ''),
-                        'sar': rep.get('sar', '')
-                    }
-                    
-                    # Get base URL
-                    base_url_elem = rep.find('.//mpd:BaseURL', ns)
-                    if base_url_elem is not None and base_url_elem.text:
-                        rep_info['base_url'] = base_url_elem.text.strip()
-                    else:
-                        rep_info['base_url'] = ''
-                    
-                    # Get segment base info
-                    segment_base = rep.find('.//mpd:SegmentBase', ns)
-                    if segment_base is not None:
-                        rep_info['segment_base'] = {
-                            'index_range': segment_base.get('indexRange', ''),
-                            'index_range_exact': segment_base.get('indexRangeExact', '')
-                        }
-                        
-                        # Get initialization info
-                        initialization = segment_base.find('.//mpd:Initialization', ns)
-                        if initialization is not None:
-                            rep_info['initialization'] = {
-                                'range': initialization.get('range', '')
-                            }
-                    
-                    adapt_info['representations'].append(rep_info)
-                
-                period_info['adaptation_sets'].append(adapt_info)
-            
-            info['periods'].append(period_info)
-        
-        return info
+        """Parse an MPD manifest into an immutable Manifest (see mpd.py)"""
+        return parse_mpd(content, self.manifest_url)
     
 # Usage example
 if __name__ == "__main__":
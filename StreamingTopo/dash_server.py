@@ -1,11 +1,185 @@
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote, urlsplit
+import asyncio
+import json
 import os
+import threading
+from media_store import MediaCatalog, SegmentCache, parse_byte_range
 
-def run_server(port=8080, directory='../dash_content'):
-    os.chdir(directory)
-    server_address = ('10.0.0.2', port)
-    httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
-    print(f'Serving DASH content on port {port}')
+# Manifests may be rewritten (live streams); media files do not change once published
+CACHE_CONTROL = {
+    'application/dash+xml': 'no-cache',
+}
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+
+def entity_tag(mtime_ns, size):
+    """Strong validator from a file's mtime and size"""
+    return f'"{mtime_ns:x}-{size:x}"'
+
+def cache_control(content_type):
+    return CACHE_CONTROL.get(content_type, DEFAULT_CACHE_CONTROL)
+
+def is_not_modified(if_none_match, if_modified_since, etag, mtime):
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against a file"""
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in (t.strip() for t in if_none_match.split(','))
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def requested_range(header, size):
+    """Half-open range for a single-range Range header, None to ignore it, False if unsatisfiable"""
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        # Multipart ranges are not supported; send the whole file
+        return None
+    try:
+        byte_range = parse_byte_range(spec, size)
+    except ValueError:
+        return None
+    return False if byte_range is None else byte_range
+
+class DashRequestHandler(BaseHTTPRequestHandler):
+    """Serves the files of a MediaCatalog with Range, conditional requests and keep-alive
+
+    Ranges small enough for the server's SegmentCache are served from it;
+    everything else goes out with socket.sendfile (os.sendfile where
+    available), so file data never passes through Python buffers.
+    GET /_stats returns the cache counters as JSON.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'DashOrigin/1.0'
+    timeout = 30  # drop idle keep-alive connections
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except ConnectionError:
+            # The client went away mid-request, e.g. a cancelled prefetch
+            self.close_connection = True
+
+    def finish(self):
+        try:
+            super().finish()
+        except ConnectionError:
+            pass
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def serve(self, send_body):
+        path = unquote(urlsplit(self.path).path).lstrip('/')
+        if path == '_stats':
+            self.send_stats(send_body)
+            return
+        entry = self.server.catalog.lookup(path.encode())
+        if entry is None:
+            self.send_error(404, "File not found")
+            return
+        try:
+            f = open(entry.path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            etag = entity_tag(st.st_mtime_ns, size)
+            last_modified = formatdate(st.st_mtime, usegmt=True)
+
+            if is_not_modified(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since'),
+                               etag, st.st_mtime):
+                self.send_response(304)
+                self.send_validators(entry, etag, last_modified)
+                self.end_headers()
+                return
+
+            start, stop = 0, size
+            status = 200
+            range_header = self.headers.get('Range')
+            if_range = self.headers.get('If-Range')
+            if range_header and (if_range is None or if_range == etag):
+                byte_range = requested_range(range_header, size)
+                if byte_range is False:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if byte_range is not None:
+                    start, stop = byte_range
+                    status = 206
+
+            self.send_response(status)
+            self.send_validators(entry, etag, last_modified)
+            self.send_header('Content-Type', entry.content_type)
+            self.send_header('Content-Length', str(stop - start))
+            self.send_header('Accept-Ranges', 'bytes')
+            if status == 206:
+                self.send_header('Content-Range', f'bytes {start}-{stop - 1}/{size}')
+            self.end_headers()
+            if send_body and stop > start:
+                try:
+                    cache = self.server.cache
+                    if cache is not None and stop - start <= cache.max_item_bytes:
+                        fd = f.fileno()
+                        self.wfile.write(cache.get(
+                            entry.path, st.st_mtime_ns, start, stop,
+                            lambda a, b: os.pread(fd, b - a, a)))
+                    else:
+                        self.connection.sendfile(f, start, stop - start)
+                except ConnectionError:
+                    self.close_connection = True
+
+    def send_stats(self, send_body):
+        stats = {"media_files": len(self.server.catalog)}
+        if self.server.cache is not None:
+            stats["cache"] = self.server.cache.stats()
+        body = json.dumps(stats).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_validators(self, entry, etag, last_modified):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Cache-Control', cache_control(entry.content_type))
+
+class DashOriginServer(ThreadingHTTPServer):
+    """Thread-per-connection origin over a MediaCatalog of `directory`
+
+    The catalog is refreshed every reload_interval seconds on a background
+    thread, never from a request thread.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, directory, patterns=('*',), cache_bytes=64 * 1024 * 1024,
+                 reload_interval=5.0):
+        self.catalog = MediaCatalog(directory, patterns)
+        self.cache = SegmentCache(cache_bytes) if cache_bytes else None
+        super().__init__(server_address, DashRequestHandler)
+        if reload_interval:
+            threading.Thread(target=asyncio.run, args=(self.catalog.watch(reload_interval),),
+                             daemon=True).start()
+
+def run_server(port=8080, directory='../dash_content', host='10.0.0.2', cache_bytes=64 * 1024 * 1024,
+               reload_interval=5.0):
+    server_address = (host, port)
+    httpd = DashOriginServer(server_address, directory, cache_bytes=cache_bytes, reload_interval=reload_interval)
+    print(f'Serving DASH content on port {port} ({len(httpd.catalog)} files)')
     httpd.serve_forever()
 
-run_server()
\ No newline at end of file
+if __name__ == "__main__":
+    run_server()
@@ -0,0 +1,178 @@
+import struct
+
+# transfer id (request stream id), sequence number, flags, send time (ms)
+HEADER = struct.Struct('!IIBI')
+FLAG_DATA = 0
+FLAG_PARITY = 1
+FLAG_RETRANSMIT = 2
+
+# Payload bytes per DATAGRAM frame; header + payload must fit one QUIC packet
+PAYLOAD_SIZE = 1024
+
+def pack_datagram(transfer_id, seq, flags, send_time_ms, payload):
+    return HEADER.pack(transfer_id, seq, flags, send_time_ms & 0xFFFFFFFF) + payload
+
+def unpack_datagram(data):
+    """Return (transfer_id, seq, flags, send_time_ms, payload)"""
+    transfer_id, seq, flags, send_time_ms = HEADER.unpack_from(data)
+    return transfer_id, seq, flags, send_time_ms, data[HEADER.size:]
+
+def xor_payloads(payloads, size):
+    """XOR a group of payloads (shorter ones zero-padded) into one parity block"""
+    acc = 0
+    for payload in payloads:
+        acc ^= int.from_bytes(payload, 'little')
+    return acc.to_bytes(size, 'little')
+
+class DatagramStats:
+    """Loss and latency counters for one datagram transfer"""
+    def __init__(self):
+        self.received = 0
+        self.duplicates = 0
+        self.recovered_fec = 0
+        self.retransmit_requested = 0
+        self.recovered_retransmit = 0
+        self.lost = 0
+        self.delays = []  # arrival minus send time, seconds (clock offset included)
+        self.jitter = 0.0  # RFC 3550 interarrival jitter, seconds
+        self._last_delay = None
+
+    def record_arrival(self, arrival, send_time_ms):
+        delay = arrival - send_time_ms / 1000
+        self.delays.append(delay)
+        if self._last_delay is not None:
+            self.jitter += (abs(delay - self._last_delay) - self.jitter) / 16
+        self._last_delay = delay
+
+    def summary(self, packets):
+        # Sender and receiver clocks are not synchronised, so delays are
+        # reported relative to the fastest packet of the transfer
+        base = min(self.delays) if self.delays else 0
+        relative = sorted(d - base for d in self.delays)
+        return {
+            "packets": packets,
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "recovered_fec": self.recovered_fec,
+            "retransmit_requested": self.retransmit_requested,
+            "recovered_retransmit": self.recovered_retransmit,
+            "lost": self.lost,
+            "loss_rate": self.lost / packets if packets else 0,
+            "delay_mean_ms": 1000 * sum(relative) / len(relative) if relative else 0,
+            "delay_p95_ms": 1000 * relative[int(0.95 * (len(relative) - 1))] if relative else 0,
+            "jitter_ms": 1000 * self.jitter,
+        }
+
+class JitterBuffer:
+    """Reorders datagram payloads and releases them in sequence
+
+    A missing packet is waited for `delay` seconds after a later packet (or
+    the end-of-transfer notice) shows it is overdue. Before giving up the
+    buffer tries FEC recovery from the group parity and, if enabled, asks for
+    a selective retransmission once. Packets that are still missing are
+    delivered as zero-filled gaps so later data keeps its byte offsets.
+    """
+
+    def __init__(self, packets, total_size, payload_size, fec_group, delay,
+                 deliver, request_retransmit=None):
+        self.packets = packets
+        self.total_size = total_size
+        self.payload_size = payload_size
+        self.fec_group = fec_group
+        self.delay = delay
+        self.deliver = deliver
+        self.request_retransmit = request_retransmit
+        self.stats = DatagramStats()
+        self.next_seq = 0
+        self.highest_seen = -1
+        self.ended = False
+        self._pending = {}
+        self._parity = {}
+        self._group_payloads = {}  # group -> {seq: payload}, kept for FEC
+        self._nacked = set()
+        self._gap_since = None
+
+    @property
+    def finished(self):
+        return self.next_seq >= self.packets
+
+    def expected_length(self, seq):
+        return min(self.payload_size, self.total_size - seq * self.payload_size)
+
+    def add(self, seq, flags, payload, send_time_ms, now):
+        if flags & FLAG_PARITY:
+            self._parity[seq] = payload
+            return
+        if seq < self.next_seq or seq in self._pending or seq >= self.packets:
+            self.stats.duplicates += 1
+            return
+        self.stats.received += 1
+        self.stats.record_arrival(now, send_time_ms)
+        if seq in self._nacked:
+            self.stats.recovered_retransmit += 1
+        self._pending[seq] = payload
+        if self.fec_group:
+            self._group_payloads.setdefault(seq // self.fec_group, {})[seq] = payload
+        self.highest_seen = max(self.highest_seen, seq)
+
+    def end(self):
+        """The sender has finished sending the original packets"""
+        self.ended = True
+
+    def poll(self, now):
+        """Release what can be released; return the next deadline, if any"""
+        while self.next_seq < self.packets:
+            seq = self.next_seq
+            payload = self._pending.pop(seq, None)
+            if payload is None and self._recover(seq):
+                payload = self._pending.pop(seq)
+            if payload is not None:
+                self._release(seq, payload)
+                continue
+            if self.highest_seen <= seq and not self.ended:
+                return None  # nothing shows this packet is late yet
+            if self._gap_since is None:
+                self._gap_since = now
+            if now - self._gap_since < self.delay:
+                return self._gap_since + self.delay
+            if self.request_retransmit is not None and seq not in self._nacked:
+                self._request_missing()
+                self._gap_since = now
+                return now + self.delay
+            self.stats.lost += 1
+            self._release(seq, bytes(self.expected_length(seq)))
+        return None
+
+    def _release(self, seq, payload):
+        self.deliver(payload)
+        self.next_seq = seq + 1
+        self._gap_since = None
+        if self.fec_group and (seq + 1) % self.fec_group == 0:
+            group = seq // self.fec_group
+            self._group_payloads.pop(group, None)
+            self._parity.pop(group, None)
+
+    def _recover(self, seq):
+        if not self.fec_group:
+            return False
+        group = seq // self.fec_group
+        parity = self._parity.get(group)
+        if parity is None:
+            return False
+        first = group * self.fec_group
+        members = range(first, min(first + self.fec_group, self.packets))
+        have = self._group_payloads.get(group, {})
+        if len(have) != len(members) - 1:
+            return False
+        payload = xor_payloads([parity, *have.values()], self.payload_size)
+        self._pending[seq] = payload[:self.expected_length(seq)]
+        self.stats.recovered_fec += 1
+        return True
+
+    def _request_missing(self):
+        last = self.packets - 1 if self.ended else self.highest_seen
+        missing = [s for s in range(self.next_seq, last + 1)
+                   if s not in self._pending and s not in self._nacked]
+        self._nacked.update(missing)
+        self.stats.retransmit_requested += len(missing)
+        self.request_retransmit(missing)
@@ -0,0 +1,221 @@
+import asyncio
+import queue
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from aioquic.asyncio import connect
+from aioquic.asyncio.protocol import QuicConnectionProtocol
+from aioquic.h3.connection import H3_ALPN, ErrorCode, H3Connection
+from aioquic.h3.events import DataReceived, HeadersReceived
+from aioquic.quic.configuration import QuicConfiguration
+from aioquic.quic.events import ConnectionTerminated, StreamReset
+
+class H3Response:
+    """The subset of requests.Response used by DashVideoDownloader
+
+    Body chunks are handed from the event loop thread to the caller's
+    thread through a queue, so iter_content() streams while data arrives.
+    """
+    _END = object()
+
+    def __init__(self, url, protocol, stream_id, timeout=30.0):
+        self.url = url
+        self.timeout = timeout  # longest wait for the next body chunk
+        self.status_code = None
+        self.reason = ''
+        self.headers = CaseInsensitiveDict()
+        self._protocol = protocol
+        self._stream_id = stream_id
+        self._headers_ready = threading.Event()
+        self._chunks = queue.Queue()
+        self._content = None
+        self._finished = False
+        self._error = None
+
+    # Called on the event loop thread
+    def _on_headers(self, headers):
+        for name, value in headers:
+            if name == b':status':
+                self.status_code = int(value)
+            else:
+                self.headers[name.decode()] = value.decode()
+        self._headers_ready.set()
+
+    def _on_data(self, data):
+        if data:
+            self._chunks.put(data)
+
+    def _on_end(self, error=None):
+        self._error = error
+        self._headers_ready.set()
+        self._chunks.put(self._END)
+
+    # Called on the caller's thread
+    def wait_headers(self, timeout):
+        if not self._headers_ready.wait(timeout):
+            self.close()
+            raise requests.Timeout(f"No response headers for {self.url}")
+        if self.status_code is None:
+            raise self._error or requests.ConnectionError(f"Stream closed before headers for {self.url}")
+
+    def iter_content(self, chunk_size=None):
+        if self._content is not None:
+            yield self._content
+            return
+        while not self._finished:
+            try:
+                chunk = self._chunks.get(timeout=self.timeout)
+            except queue.Empty:
+                self.close()
+                raise requests.Timeout(f"Body stalled for {self.url}")
+            if chunk is self._END:
+                self._finished = True
+                if self._error is not None:
+                    raise self._error
+                return
+            yield chunk
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b''.join(self.iter_content())
+        return self._content
+
+    def raise_for_status(self):
+        if self.status_code is not None and self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        """Abandon the rest of the body (STOP_SENDING on the request stream)"""
+        if not self._finished:
+            self._finished = True
+            self._protocol.cancel_request(self._stream_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class H3ClientProtocol(QuicConnectionProtocol):
+    """HTTP/3 client connection; request() may be called from any thread"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._http = H3Connection(self._quic)
+        self._responses = {}  # stream_id -> H3Response
+
+    def request(self, url, headers, timeout=30.0):
+        """Send a GET; runs on the event loop thread"""
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        stream_id = self._quic.get_next_available_stream_id()
+        self._http.send_headers(
+            stream_id,
+            [(b':method', b'GET'), (b':scheme', b'https'), (b':authority', parts.netloc.encode()),
+             (b':path', path.encode()), (b'user-agent', b'dash-client/h3')]
+            + [(k.lower().encode(), str(v).encode()) for k, v in (headers or {}).items()],
+            end_stream=True,
+        )
+        response = self._responses[stream_id] = H3Response(url, self, stream_id, timeout)
+        self.transmit()
+        return response
+
+    def cancel_request(self, stream_id):
+        self._loop.call_soon_threadsafe(self._cancel, stream_id)
+
+    def _cancel(self, stream_id):
+        if self._responses.pop(stream_id, None) is not None and not self._closed.is_set():
+            try:
+                self._quic.stop_stream(stream_id, ErrorCode.H3_REQUEST_CANCELLED)
+            except ValueError:
+                return  # the stream already finished
+            self.transmit()
+
+    def quic_event_received(self, event):
+        if isinstance(event, StreamReset):
+            response = self._responses.pop(event.stream_id, None)
+            if response is not None:
+                response._on_end(requests.ConnectionError(f"Stream reset by server for {response.url}"))
+        elif isinstance(event, ConnectionTerminated):
+            for response in self._responses.values():
+                response._on_end(requests.ConnectionError(f"Connection closed: {event.reason_phrase}"))
+            self._responses.clear()
+        for http_event in self._http.handle_event(event):
+            response = self._responses.get(http_event.stream_id)
+            if response is None:
+                continue
+            if isinstance(http_event, HeadersReceived):
+                response._on_headers(http_event.headers)
+            elif isinstance(http_event, DataReceived):
+                response._on_data(http_event.data)
+            if getattr(http_event, 'stream_ended', False):
+                del self._responses[http_event.stream_id]
+                response._on_end()
+
+class H3Session:
+    """Synchronous, requests.Session-like HTTP/3 client
+
+    Runs an asyncio loop on a background thread and keeps one QUIC
+    connection per (host, port); concurrent requests from any thread are
+    multiplexed on it as separate streams.
+    """
+
+    def __init__(self, timeout=30.0, verify=False):
+        self.timeout = timeout
+        self.configuration = QuicConfiguration(
+            is_client=True,
+            alpn_protocols=H3_ALPN,
+            verify_mode=None if verify else False,
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='h3-session', daemon=True)
+        self._thread.start()
+        self._connections = {}  # (host, port) -> (context manager, protocol)
+        self._lock = threading.Lock()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(self.timeout)
+
+    async def _open(self, host, port):
+        context = connect(host, port, configuration=self.configuration, create_protocol=H3ClientProtocol)
+        protocol = await context.__aenter__()
+        return context, protocol
+
+    def _protocol(self, host, port):
+        with self._lock:
+            entry = self._connections.get((host, port))
+            if entry is None or entry[1]._closed.is_set():
+                try:
+                    entry = self._run(self._open(host, port))
+                except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                    raise requests.ConnectionError(f"HTTP/3 connection to {host}:{port} failed: {e}")
+                self._connections[(host, port)] = entry
+            return entry[1]
+
+    def get(self, url, headers=None, stream=False):
+        parts = urlsplit(url)
+        protocol = self._protocol(parts.hostname, parts.port or 443)
+
+        async def send():
+            return protocol.request(url, headers, self.timeout)
+
+        response = self._run(send())
+        response.wait_headers(self.timeout)
+        if not stream:
+            response.content  # read the whole body now, like requests
+        return response
+
+    def close(self):
+        with self._lock:
+            for context, _ in self._connections.values():
+                try:
+                    self._run(context.__aexit__(None, None, None))
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
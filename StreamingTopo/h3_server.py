@@ -0,0 +1,153 @@
+import asyncio
+import json
+from email.utils import formatdate
+from functools import partial
+from urllib.parse import unquote, urlsplit
+from aioquic.asyncio import serve
+from aioquic.h3.connection import H3_ALPN, H3Connection
+from aioquic.h3.events import HeadersReceived
+from aioquic.quic.configuration import QuicConfiguration
+from aioquic.quic.events import ConnectionTerminated, StopSendingReceived, StreamReset
+from dash_server import cache_control, entity_tag, is_not_modified, requested_range
+from media_store import MediaCatalog, SegmentCache, media_store
+from quic_server import PacedStreamProtocol
+
+class H3OriginProtocol(PacedStreamProtocol):
+    """HTTP/3 origin for DASH content, with the same semantics as dash_server
+
+    Supports GET and HEAD, single byte ranges, ETag/Last-Modified
+    validators and Cache-Control. Bodies are slices of the process-wide
+    media_store mappings (or SegmentCache entries), copied only a chunk at
+    a time into DATA frames as QUIC flow and congestion control allow.
+    GET /_stats returns the cache counters as JSON.
+    """
+    # Shared by all connections; set by run_h3_server before serving
+    catalog = None
+    cache = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._http = H3Connection(self._quic)
+
+    def quic_event_received(self, event):
+        for http_event in self._http.handle_event(event):
+            if isinstance(http_event, HeadersReceived):
+                asyncio.ensure_future(self.handle_request(http_event.stream_id, dict(http_event.headers)))
+        if isinstance(event, (StopSendingReceived, StreamReset)):
+            # H3Connection has already forgotten the stream; any further
+            # frame on it would raise FrameUnexpected
+            self.cancel_stream(event.stream_id)
+        elif isinstance(event, ConnectionTerminated):
+            self._send_window_open.set()
+
+    def send_data(self, stream_id, data, end_stream=False):
+        # H3 frame encoding needs bytes, not memoryview slices
+        self._http.send_data(stream_id, bytes(data), end_stream=end_stream)
+
+    def send_response(self, stream_id, status, headers=(), body=b'', end_stream=True):
+        if self.is_cancelled(stream_id):
+            return
+        self._http.send_headers(
+            stream_id,
+            [(b':status', str(status).encode()), (b'server', b'DashOrigin/1.0')]
+            + [(k.encode(), str(v).encode()) for k, v in headers],
+            end_stream=end_stream and not body,
+        )
+        if body:
+            self._http.send_data(stream_id, body, end_stream=True)
+        self.transmit()
+
+    async def handle_request(self, stream_id, headers):
+        method = headers.get(b':method', b'GET')
+        if method not in (b'GET', b'HEAD'):
+            self.send_response(stream_id, 405, [('allow', 'GET, HEAD')])
+            return
+        send_body = method == b'GET'
+        path = unquote(urlsplit(headers.get(b':path', b'/').decode()).path).lstrip('/')
+        if path == '_stats':
+            stats = {"media_files": len(self.catalog)}
+            if self.cache is not None:
+                stats["cache"] = self.cache.stats()
+            body = json.dumps(stats).encode()
+            self.send_response(stream_id, 200, [('content-type', 'application/json'),
+                                                ('content-length', len(body)),
+                                                ('cache-control', 'no-store')],
+                               body if send_body else b'')
+            return
+
+        entry = self.catalog.lookup(path.encode())
+        try:
+            view = media_store.view(entry.path) if entry is not None else None
+        except OSError:
+            view = None
+        if view is None:
+            self.send_response(stream_id, 404, [('content-type', 'text/plain')], b'File not found')
+            return
+        # Validators come from the catalog entry, which matches the mapping being served
+        etag = entity_tag(entry.mtime, entry.size)
+        mtime = entry.mtime / 1e9
+        validators = [('etag', etag), ('last-modified', formatdate(mtime, usegmt=True)),
+                      ('cache-control', cache_control(entry.content_type))]
+
+        def header(name):
+            value = headers.get(name)
+            return value.decode() if value is not None else None
+
+        if is_not_modified(header(b'if-none-match'), header(b'if-modified-since'), etag, mtime):
+            self.send_response(stream_id, 304, validators)
+            return
+
+        size = len(view)
+        start, stop = 0, size
+        status = 200
+        range_header = header(b'range')
+        if_range = header(b'if-range')
+        if range_header and (if_range is None or if_range == etag):
+            byte_range = requested_range(range_header, size)
+            if byte_range is False:
+                self.send_response(stream_id, 416, [('content-range', f'bytes */{size}')])
+                return
+            if byte_range is not None:
+                start, stop = byte_range
+                status = 206
+
+        response_headers = validators + [('content-type', entry.content_type),
+                                         ('content-length', stop - start),
+                                         ('accept-ranges', 'bytes')]
+        if status == 206:
+            response_headers.append(('content-range', f'bytes {start}-{stop - 1}/{size}'))
+        if not send_body or stop == start:
+            self.send_response(stream_id, status, response_headers)
+            return
+        self.send_response(stream_id, status, response_headers, end_stream=False)
+        if self.cache is not None and stop - start <= self.cache.max_item_bytes:
+            body = memoryview(self.cache.get(entry.path, entry.mtime, start, stop,
+                                             lambda a, b: bytes(view[a:b])))
+        else:
+            body = view[start:stop]
+        await self.send_paced(stream_id, body, send=self.send_data)
+
+async def run_h3_server(host='10.0.0.2', port=8443, directory='../dash_content',
+                        cache_bytes=64 * 1024 * 1024, chunk_size=None, reload_interval=5.0):
+    H3OriginProtocol.catalog = MediaCatalog(directory, ('*',))
+    H3OriginProtocol.cache = SegmentCache(cache_bytes) if cache_bytes else None
+
+    configuration = QuicConfiguration(
+        is_client=False,
+        alpn_protocols=H3_ALPN,
+    )
+    configuration.load_cert_chain("../cert.pem", "../key.pem")
+
+    await serve(
+        host=host,
+        port=port,
+        configuration=configuration,
+        create_protocol=partial(H3OriginProtocol, chunk_size=chunk_size),
+    )
+    print(f"Serving DASH content over HTTP/3 on {host}:{port} ({len(H3OriginProtocol.catalog)} files)")
+    if reload_interval:
+        asyncio.ensure_future(H3OriginProtocol.catalog.watch(reload_interval))
+    await asyncio.Future()
+
+if __name__ == "__main__":
+    asyncio.run(run_h3_server())
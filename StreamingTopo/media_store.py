@@ -0,0 +1,291 @@
+import asyncio
+import fnmatch
+import mimetypes
+import mmap
+import os
+import stat
+import threading
+from collections import OrderedDict, namedtuple
+
+class MediaStore:
+    """Process-wide store of memory-mapped media files.
+
+    Each file is opened and mapped once; callers get read-only memoryview
+    slices of the mapping, so serving a chunk never copies it into a new
+    bytes object and no connection keeps its own file handle. Evicting a
+    file only drops the store's own view: slices still held by in-flight
+    sends stay valid, and the mapping is closed when the last one is freed.
+    """
+
+    def __init__(self):
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def view(self, path):
+        """Return a new memoryview over the whole file at `path`"""
+        path = os.path.abspath(path)
+        entry = self._maps.get(path)
+        if entry is None:
+            with self._lock:
+                entry = self._maps.get(path)
+                if entry is None:
+                    entry = self._map_file(path)
+                    self._maps[path] = entry
+        # A slice, never the store's own view, which evict() releases
+        return entry[1][:]
+
+    def chunks(self, path, chunk_size, start=0, end=None):
+        """Yield zero-copy memoryview slices of `path` between start and end"""
+        view = self.view(path)
+        end = len(view) if end is None else min(end, len(view))
+        for offset in range(start, end, chunk_size):
+            yield view[offset:min(offset + chunk_size, end)]
+
+    def evict(self, path):
+        """Drop the mapping for `path` so the next view() remaps it"""
+        with self._lock:
+            entry = self._maps.pop(os.path.abspath(path), None)
+        if entry is not None:
+            self._release(entry)
+
+    def close(self):
+        """Unmap every file held by the store"""
+        with self._lock:
+            entries = list(self._maps.values())
+            self._maps.clear()
+        for entry in entries:
+            self._release(entry)
+
+    def _map_file(self, path):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # mmap cannot map empty files
+                return None, memoryview(b'')
+            # The mapping stays valid after the descriptor is closed
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped, memoryview(mapped)
+
+    def _release(self, entry):
+        mapped, view = entry
+        # Only the store's own view is released; callers hold slices of it,
+        # which stay usable on their own
+        view.release()
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # Slices handed out earlier are still alive; the mapping is
+                # freed when the last of them is garbage collected.
+                pass
+
+# Shared by every connection in this process
+media_store = MediaStore()
+
+class SegmentCache:
+    """Byte-budgeted LRU cache of file ranges, keyed by (path, version, start, stop)
+
+    Keeps the hot ranges (under a flash crowd, the opening segments of
+    every rendition) as bytes in process memory. version is the file's
+    mtime, so a rewritten file never serves stale data; its old ranges just
+    age out. Callers serve ranges above max_item_bytes some other way, so a
+    single large file cannot flush the hot set.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_item_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes if max_item_bytes is not None else max_bytes // 8
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, version, start, stop, load):
+        """Return bytes [start, stop) of path, calling load(start, stop) on a miss"""
+        key = (path, version, start, stop)
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = load(start, stop)
+        if len(data) > self.max_item_bytes:
+            return data
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = data
+                self.size += len(data)
+                while self.size > self.max_bytes:
+                    _, evicted = self._items.popitem(last=False)
+                    self.size -= len(evicted)
+                    self.evictions += 1
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+            "items": len(self._items),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+        }
+
+CONTENT_TYPES = {
+    '.mp4': 'video/mp4',
+    '.m4s': 'video/iso.segment',
+    '.mpd': 'application/dash+xml',
+    '.json': 'application/json',
+}
+
+# Files published by default, relative to the media root
+DEFAULT_PATTERNS = ('sample*.mp4', 'dash_content/*.mp4', 'dash_content/manifest.mpd')
+
+class MediaEntry(namedtuple('MediaEntry', 'path size mtime content_type')):
+    """Precomputed metadata for one published file"""
+    __slots__ = ()
+
+class MediaCatalog:
+    """Index of the files under a media root, keyed by request name.
+
+    The index is built once at startup and shared by every connection;
+    lookups are a single dict access. refresh() rescans the root and only
+    touches entries whose size or mtime changed.
+    """
+
+    def __init__(self, root, patterns=DEFAULT_PATTERNS, store=None):
+        self.root = os.path.abspath(root)
+        self.patterns = tuple(patterns)
+        self.store = store if store is not None else media_store
+        self._entries = {}
+        self.refresh()
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name):
+        """Return the MediaEntry for a request name (bytes), or None"""
+        return self._entries.get(name)
+
+    def names(self):
+        return list(self._entries)
+
+    def lookup(self, name):
+        """Like get(), but index the file when the name is unknown and it now exists
+
+        Lets an origin serve files written since the last scan, such as new
+        live segments, without waiting for watch(). A miss costs one stat()
+        of the requested path, and only if the name matches the catalog's
+        patterns, so 404 probes never rescan the media root; changed and
+        removed files are picked up by watch().
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            entry = self._index_file(name)
+        return entry
+
+    def _index_file(self, name):
+        try:
+            relative = name.decode()
+        except UnicodeDecodeError:
+            return None
+        directory, _, filename = relative.rpartition('/')
+        if not any(directory == pattern_dir and fnmatch.fnmatch(filename, file_pattern)
+                   for pattern_dir, _, file_pattern in (p.rpartition('/') for p in self.patterns)):
+            return None
+        path = os.path.join(self.root, relative)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        entry = self._entries[name] = self._entry(path, st)
+        return entry
+
+    @staticmethod
+    def _entry(path, st):
+        extension = os.path.splitext(path)[1].lower()
+        return MediaEntry(
+            path, st.st_size, st.st_mtime_ns,
+            CONTENT_TYPES.get(extension) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+
+    def refresh(self):
+        """Rescan the media root; return the names that were added, changed or removed"""
+        found = {}
+        for pattern in self.patterns:
+            directory, _, file_pattern = pattern.rpartition('/')
+            try:
+                scan = os.scandir(os.path.join(self.root, directory))
+            except FileNotFoundError:
+                continue
+            with scan:
+                for dir_entry in scan:
+                    if dir_entry.is_file() and fnmatch.fnmatch(dir_entry.name, file_pattern):
+                        name = f'{directory}/{dir_entry.name}' if directory else dir_entry.name
+                        found[name.encode()] = dir_entry
+
+        changed = []
+        entries = dict(self._entries)
+        for name in set(entries) - set(found):
+            self.store.evict(entries.pop(name).path)
+            changed.append(name)
+        for name, dir_entry in found.items():
+            st = dir_entry.stat()
+            old = entries.get(name)
+            if old is not None and old.size == st.st_size and old.mtime == st.st_mtime_ns:
+                continue
+            if old is not None:
+                self.store.evict(old.path)
+            entries[name] = self._entry(dir_entry.path, st)
+            changed.append(name)
+        # Swap in the new index in one step so lookups never see a partial scan
+        self._entries = entries
+        return changed
+
+    async def watch(self, interval=5.0):
+        """Refresh the index every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            changed = self.refresh()
+            if changed:
+                print(f"Media catalog reloaded: {len(changed)} file(s) changed")
+
+def parse_byte_range(spec, size):
+    """Resolve a `start-end` byte range (end inclusive) against a file size.
+
+    Accepts `start-end`, `start-` (to end of file) and `-suffix` (last
+    `suffix` bytes), as in HTTP Range. Returns a half-open (start, stop)
+    tuple, or None if the range is not satisfiable. Raises ValueError for
+    malformed specs.
+    """
+    if isinstance(spec, bytes):
+        spec = spec.decode('ascii')
+    first, sep, last = spec.strip().partition('-')
+    if not sep or not (first or last):
+        raise ValueError(f"Malformed byte range: {spec!r}")
+    if not first:
+        suffix = int(last)
+        if suffix <= 0:
+            return None
+        return max(0, size - suffix), size
+    start = int(first)
+    stop = size if not last else min(int(last) + 1, size)
+    if start < 0 or start >= size or stop <= start:
+        return None
+    return start, stop
@@ -0,0 +1,109 @@
+import struct
+from array import array
+
+BOX_HEADER = struct.Struct('>I4s')
+
+class SegmentIndex:
+    """Subsegment byte ranges and durations of one representation, from its sidx box
+
+    Offsets and sizes are kept in compact arrays; subsegment n (0-based)
+    occupies bytes offsets[n] .. offsets[n] + sizes[n] - 1 of the file.
+    """
+    __slots__ = ('timescale', 'earliest_time', 'offsets', 'sizes', 'durations')
+
+    def __init__(self, timescale, earliest_time, offsets, sizes, durations):
+        self.timescale = timescale
+        self.earliest_time = earliest_time
+        self.offsets = offsets
+        self.sizes = sizes
+        self.durations = durations
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def byte_range(self, n):
+        """Inclusive (first, last) byte positions of subsegment n"""
+        return self.offsets[n], self.offsets[n] + self.sizes[n] - 1
+
+    def duration(self, n):
+        """Media duration of subsegment n in seconds"""
+        return self.durations[n] / self.timescale
+
+    def start_time(self, n):
+        return (self.earliest_time + sum(self.durations[:n])) / self.timescale
+
+def iter_boxes(data, start=0, end=None):
+    """Yield (type, box start, payload start, box end) for the boxes in data[start:end]
+
+    A size-0 box runs to `end`. When data is only the head of a file the
+    last box may end past `end`; it is still yielded, and iteration stops
+    after it.
+    """
+    end = len(data) if end is None else end
+    offset = start
+    while offset + BOX_HEADER.size <= end:
+        size, kind = BOX_HEADER.unpack_from(data, offset)
+        payload = offset + BOX_HEADER.size
+        if size == 1:
+            if payload + 8 > end:
+                return
+            size = struct.unpack_from('>Q', data, payload)[0]
+            payload += 8
+        elif size == 0:
+            size = end - offset
+        if size < payload - offset:
+            raise ValueError(f"Invalid {kind!r} box size {size} at offset {offset}")
+        yield kind, offset, payload, offset + size
+        offset += size
+
+def child_box(data, start, end, box_type):
+    """(payload start, box end) of the first box of `box_type` in data[start:end], or None"""
+    for kind, _, payload, box_end in iter_boxes(data, start, end):
+        if kind == box_type:
+            return payload, box_end
+    return None
+
+def find_box(data, box_type, offset=0):
+    """Return the offset of the first top-level box of `box_type` in data, or -1"""
+    for kind, start, _, _ in iter_boxes(data, offset):
+        if kind == box_type:
+            return start
+    return -1
+
+def parse_sidx(data, file_offset=0):
+    """Parse a sidx box at the start of data into a SegmentIndex
+
+    file_offset is the position of the box in the media file, so the
+    returned offsets are absolute. Only media references (not references to
+    other sidx boxes) are supported.
+    """
+    size, kind = BOX_HEADER.unpack_from(data, 0)
+    if kind != b'sidx':
+        raise ValueError(f"Expected a sidx box, found {kind!r}")
+    if size > len(data):
+        raise ValueError(f"Truncated sidx box: {len(data)} of {size} bytes")
+    version = data[8]
+    timescale = struct.unpack_from('>I', data, 16)[0]
+    if version == 0:
+        earliest_time, first_offset = struct.unpack_from('>II', data, 20)
+        pos = 28
+    else:
+        earliest_time, first_offset = struct.unpack_from('>QQ', data, 20)
+        pos = 36
+    reference_count = struct.unpack_from('>H', data, pos + 2)[0]
+    pos += 4
+
+    offsets, sizes, durations = array('Q'), array('I'), array('I')
+    # Offsets are relative to the first byte after the sidx box
+    offset = file_offset + size + first_offset
+    for _ in range(reference_count):
+        reference, duration, _sap = struct.unpack_from('>III', data, pos)
+        pos += 12
+        if reference >> 31:
+            raise ValueError("Hierarchical sidx (references to other sidx boxes) is not supported")
+        referenced_size = reference & 0x7FFFFFFF
+        offsets.append(offset)
+        sizes.append(referenced_size)
+        durations.append(duration)
+        offset += referenced_size
+    return SegmentIndex(timescale, earliest_time, offsets, sizes, durations)
@@ -0,0 +1,324 @@
+import math
+import re
+import xml.etree.ElementTree as ET
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import unquote, urljoin, urlsplit
+
+NS = {'mpd': 'urn:mpeg:dash:schema:mpd:2011'}
+
+ISO_DURATION = re.compile(
+    r'^P(?:(?P<days>\d+(?:\.\d+)?)D)?'
+    r'(?:T(?:(?P<hours>\d+(?:\.\d+)?)H)?(?:(?P<minutes>\d+(?:\.\d+)?)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$'
+)
+
+def parse_iso_duration(value):
+    """Convert an ISO 8601 duration such as PT0H0M30.528S to seconds"""
+    match = ISO_DURATION.match(value or '')
+    if not match:
+        return None
+    parts = {k: float(v) for k, v in match.groupdict().items() if v}
+    return (parts.get('days', 0) * 86400 + parts.get('hours', 0) * 3600
+            + parts.get('minutes', 0) * 60 + parts.get('seconds', 0))
+
+def parse_datetime(value):
+    """Convert an xs:dateTime such as 2025-08-16T10:30:02Z to epoch seconds"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.strip())
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+TEMPLATE_IDENTIFIER = re.compile(r'\$(RepresentationID|Number|Bandwidth|Time)(?:%0(\d+)d)?\$|\$\$')
+
+def fill_template(template, representation_id, number=None, bandwidth=None, time=None):
+    """Substitute $RepresentationID$, $Number$, $Bandwidth$ and $Time$ (with optional %0Nd widths)"""
+    values = {'RepresentationID': representation_id, 'Number': number,
+              'Bandwidth': bandwidth, 'Time': time}
+
+    def substitute(match):
+        name, width = match.groups()
+        if name is None:
+            return '$'
+        value = values[name]
+        if value is None:
+            raise ValueError(f"No value for ${name}$ in template {template!r}")
+        return str(value).zfill(int(width)) if width else str(value)
+
+    return TEMPLATE_IDENTIFIER.sub(substitute, template)
+
+def local_path(url):
+    """Filesystem path of a file:// URL, e.g. a representation of a manifest parsed from disk"""
+    return unquote(urlsplit(url).path)
+
+def parse_range_attribute(value):
+    """Parse an MPD byte range attribute such as "1576-1655" into (first, last)"""
+    first, sep, last = (value or '').partition('-')
+    if not sep or not first or not last:
+        return None
+    return int(first), int(last)
+
+class SegmentBase(namedtuple('SegmentBase', 'index_range index_range_exact initialization')):
+    """Byte ranges (first, last) of the sidx box and the initialization segment"""
+    __slots__ = ()
+
+class SegmentTemplate(namedtuple('SegmentTemplate',
+        'media initialization timescale duration start_number presentation_time_offset '
+        'times durations open_ended period_start period_duration')):
+    """Number- or timeline-addressed segments of one representation
+
+    Segment k (0-based, number start_number + k) starts at media time
+    times[k] with length durations[k] in timescale units when a
+    SegmentTimeline is present, or at presentation_time_offset + k * duration
+    otherwise. open_ended marks a timeline whose last entry repeats until
+    the next manifest update (r="-1" in a live stream).
+    """
+    __slots__ = ()
+
+    def count(self):
+        """Number of segments, or None if it is unbounded (live)"""
+        if self.times:
+            return None if self.open_ended else len(self.times)
+        if self.period_duration and self.duration:
+            return math.ceil(self.period_duration * self.timescale / self.duration - 1e-9)
+        return None
+
+    def segment(self, k):
+        """(start, duration) of segment k in timescale units, or None"""
+        if k < 0:
+            return None
+        if self.times:
+            if k < len(self.times):
+                return self.times[k], self.durations[k]
+            if not self.open_ended:
+                return None
+            last = len(self.times) - 1
+            return self.times[last] + (k - last) * self.durations[last], self.durations[last]
+        if not self.duration:
+            return None
+        count = self.count()
+        if count is not None and k >= count:
+            return None
+        return self.presentation_time_offset + k * self.duration, self.duration
+
+    def index_at(self, period_time):
+        """Index of the segment playing `period_time` seconds into the period"""
+        media_time = self.presentation_time_offset + period_time * self.timescale
+        if self.times:
+            k = max(bisect_right(self.times, media_time) - 1, 0)
+            if self.open_ended and k == len(self.times) - 1:
+                k += int((media_time - self.times[k]) // self.durations[k])
+            return k
+        if not self.duration:
+            return 0
+        return max(int(period_time * self.timescale // self.duration), 0)
+
+    def end_time(self, start, duration):
+        """Seconds from the period start to the end of a segment"""
+        return (start + duration - self.presentation_time_offset) / self.timescale
+
+class Representation(namedtuple('Representation',
+        'id bandwidth mime_type codecs width height frame_rate sar base_url url '
+        'segment_base segment_template')):
+    """One encoding; url is the absolute media URL resolved against every BaseURL level"""
+    __slots__ = ()
+
+class AdaptationSet(namedtuple('AdaptationSet',
+        'id content_type content_types mime_type segment_alignment max_width max_height '
+        'max_frame_rate par lang representations')):
+    __slots__ = ()
+
+    @property
+    def is_video(self):
+        # mimeType may be given on the Representations instead of the set
+        return ('video' in self.content_type.lower() or self.mime_type.startswith('video/')
+                or any('video' in ct.lower() for ct in self.content_types)
+                or any(rep.mime_type.startswith('video/') for rep in self.representations))
+
+class Period(namedtuple('Period', 'id start duration adaptation_sets')):
+    __slots__ = ()
+
+class Manifest(namedtuple('Manifest',
+        'url type profiles duration min_buffer_time max_segment_duration '
+        'minimum_update_period availability_start_time time_shift_buffer_depth '
+        'suggested_presentation_delay periods ladder bitrates')):
+    """Parsed MPD. Durations are in seconds (None when absent), and
+    availability_start_time is in epoch seconds.
+
+    ladder holds the video representations of every period sorted from
+    lowest to highest bandwidth, and bitrates their bandwidths, so ABR
+    decisions never walk the period tree.
+    """
+    __slots__ = ()
+
+def _base_url(element, parent_url):
+    base = element.find('mpd:BaseURL', NS)
+    if base is not None and base.text:
+        return urljoin(parent_url, base.text.strip())
+    return parent_url
+
+def _segment_base(element, inherited):
+    segment_base = element.find('mpd:SegmentBase', NS)
+    if segment_base is None:
+        return inherited
+    initialization = segment_base.find('mpd:Initialization', NS)
+    return SegmentBase(
+        parse_range_attribute(segment_base.get('indexRange')),
+        segment_base.get('indexRangeExact', '') == 'true',
+        parse_range_attribute(initialization.get('range')) if initialization is not None else None,
+    )
+
+def _template_attributes(element, inherited):
+    """SegmentTemplate attributes and timeline, with element's overriding the inherited ones"""
+    template = element.find('mpd:SegmentTemplate', NS)
+    if template is None:
+        return inherited
+    attributes, timeline = inherited or ({}, None)
+    attributes = {**attributes, **template.attrib}
+    own_timeline = template.find('mpd:SegmentTimeline', NS)
+    return attributes, own_timeline if own_timeline is not None else timeline
+
+def _expand_timeline(timeline, timescale, period_duration):
+    """Expand S elements into start/duration arrays; return (times, durations, open_ended)"""
+    times, durations = array('Q'), array('Q')
+    entries = timeline.findall('mpd:S', NS)
+    open_ended = False
+    t = 0
+    for i, entry in enumerate(entries):
+        t = int(entry.get('t', t))
+        d = int(entry.get('d'))
+        r = int(entry.get('r', 0))
+        if r < 0:
+            # Repeat until the next entry, the period end, or (live) forever
+            if i + 1 < len(entries) and entries[i + 1].get('t') is not None:
+                end = int(entries[i + 1].get('t'))
+            elif period_duration:
+                end = period_duration * timescale
+            else:
+                end = None
+                open_ended = True
+            r = 0 if end is None else max(math.ceil((end - t) / d) - 1, 0)
+        for _ in range(r + 1):
+            times.append(t)
+            durations.append(d)
+            t += d
+    return times, durations, open_ended
+
+def _segment_template(attributes_and_timeline, period_start, period_duration):
+    if attributes_and_timeline is None:
+        return None
+    attributes, timeline = attributes_and_timeline
+    timescale = _int(attributes.get('timescale')) or 1
+    if timeline is not None:
+        times, durations, open_ended = _expand_timeline(timeline, timescale, period_duration)
+    else:
+        times, durations, open_ended = (), (), False
+    return SegmentTemplate(
+        media=attributes.get('media', ''),
+        initialization=attributes.get('initialization', ''),
+        timescale=timescale,
+        duration=_int(attributes.get('duration')),
+        start_number=int(attributes.get('startNumber', 1)),
+        presentation_time_offset=_int(attributes.get('presentationTimeOffset')),
+        times=times,
+        durations=durations,
+        open_ended=open_ended,
+        period_start=period_start,
+        period_duration=period_duration,
+    )
+
+def _int(value):
+    return int(value) if value else 0
+
+def parse_mpd(content, url=''):
+    """Parse an MPD document into a Manifest, resolving URLs against `url`"""
+    root = ET.fromstring(content)
+    mpd_url = _base_url(root, url)
+
+    periods = []
+    ladder = []
+    presentation_duration = parse_iso_duration(root.get('mediaPresentationDuration'))
+    period_elements = root.findall('mpd:Period', NS)
+    next_start = 0.0
+    for i, period in enumerate(period_elements):
+        period_url = _base_url(period, mpd_url)
+        period_start = parse_iso_duration(period.get('start'))
+        if period_start is None:
+            period_start = next_start
+        period_duration = parse_iso_duration(period.get('duration'))
+        if period_duration is None and i + 1 < len(period_elements):
+            following = parse_iso_duration(period_elements[i + 1].get('start'))
+            if following is not None:
+                period_duration = following - period_start
+        if period_duration is None and presentation_duration and i + 1 == len(period_elements):
+            period_duration = presentation_duration - period_start
+        next_start = period_start + (period_duration or 0)
+        period_template = _template_attributes(period, None)
+        adaptation_sets = []
+        for adapt_set in period.findall('mpd:AdaptationSet', NS):
+            adapt_url = _base_url(adapt_set, period_url)
+            adapt_segment_base = _segment_base(adapt_set, None)
+            adapt_template = _template_attributes(adapt_set, period_template)
+            content_types = tuple(comp.get('contentType', '')
+                                  for comp in adapt_set.findall('mpd:ContentComponent', NS))
+            representations = []
+            for rep in adapt_set.findall('mpd:Representation', NS):
+                base = rep.find('mpd:BaseURL', NS)
+                representations.append(Representation(
+                    id=rep.get('id', ''),
+                    bandwidth=_int(rep.get('bandwidth')),
+                    mime_type=rep.get('mimeType', adapt_set.get('mimeType', '')),
+                    codecs=rep.get('codecs', adapt_set.get('codecs', '')),
+                    width=_int(rep.get('width')),
+                    height=_int(rep.get('height')),
+                    frame_rate=rep.get('frameRate', ''),
+                    sar=rep.get('sar', ''),
+                    base_url=base.text.strip() if base is not None and base.text else '',
+                    url=_base_url(rep, adapt_url),
+                    segment_base=_segment_base(rep, adapt_segment_base),
+                    segment_template=_segment_template(
+                        _template_attributes(rep, adapt_template), period_start, period_duration),
+                ))
+            adapt_info = AdaptationSet(
+                id=adapt_set.get('id', ''),
+                content_type=adapt_set.get('contentType') or (content_types[0] if content_types else ''),
+                content_types=content_types,
+                mime_type=adapt_set.get('mimeType', ''),
+                segment_alignment=adapt_set.get('segmentAlignment', ''),
+                max_width=adapt_set.get('maxWidth', ''),
+                max_height=adapt_set.get('maxHeight', ''),
+                max_frame_rate=adapt_set.get('maxFrameRate', ''),
+                par=adapt_set.get('par', ''),
+                lang=adapt_set.get('lang', ''),
+                representations=tuple(representations),
+            )
+            adaptation_sets.append(adapt_info)
+            if adapt_info.is_video:
+                ladder.extend(adapt_info.representations)
+        periods.append(Period(
+            id=period.get('id', '1'),
+            start=period_start,
+            duration=period_duration,
+            adaptation_sets=tuple(adaptation_sets),
+        ))
+
+    ladder.sort(key=lambda rep: rep.bandwidth)
+    return Manifest(
+        url=url,
+        type=root.get('type', 'static'),
+        profiles=root.get('profiles', ''),
+        duration=presentation_duration,
+        min_buffer_time=parse_iso_duration(root.get('minBufferTime')),
+        max_segment_duration=parse_iso_duration(
+            root.get('maxSegmentDuration') or root.get('maxSubsegmentDuration')),
+        minimum_update_period=parse_iso_duration(root.get('minimumUpdatePeriod')),
+        availability_start_time=parse_datetime(root.get('availabilityStartTime')),
+        time_shift_buffer_depth=parse_iso_duration(root.get('timeShiftBufferDepth')),
+        suggested_presentation_delay=parse_iso_duration(root.get('suggestedPresentationDelay')),
+        periods=tuple(periods),
+        ladder=tuple(ladder),
+        bitrates=tuple(max(rep.bandwidth, 1) for rep in ladder),
+    )
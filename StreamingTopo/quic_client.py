@@ -1,19 +1,51 @@
 import asyncio
+import os
 import time
 import json
+from contextlib import asynccontextmanager
+from dataclasses import replace
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from aioquic.asyncio import connect
 from aioquic.quic.configuration import QuicConfiguration
-from aioquic.quic.events import StreamDataReceived
+from aioquic.quic.events import (
+    StreamDataReceived, ConnectionTerminated, HandshakeCompleted, DatagramFrameReceived
+)
 from aioquic.asyncio.protocol import QuicConnectionProtocol
+from datagram_media import JitterBuffer, unpack_datagram
+
+def format_byte_range(byte_range):
+    """Normalise a (start, end) tuple or "start-end" string for a GET request"""
+    if byte_range is None:
+        return None
+    if isinstance(byte_range, (tuple, list)):
+        start, end = byte_range
+        return f"{'' if start is None else start}-{'' if end is None else end}"
+    return byte_range.decode() if isinstance(byte_range, bytes) else str(byte_range)
 
 class QLogger:
-    def __init__(self, log_dir="qlog"):
-        self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(exist_ok=True)
-        self.events = []
+    """Streams qlog events to disk as JSON-SEQ (qlog 0.3 style)
+
+    Events are kept in a small in-memory buffer and appended to the trace
+    file whenever buffer_size events are pending, so memory use does not
+    grow with the length of the transfer. With log_dir=None events are
+    discarded and no file is written.
+    """
+    RECORD_SEPARATOR = "\x1e"
+
+    def __init__(self, log_dir="qlog", buffer_size=256):
+        self.log_dir = Path(log_dir) if log_dir is not None else None
+        if self.log_dir is not None:
+            self.log_dir.mkdir(exist_ok=True)
+        self.buffer_size = buffer_size
+        self.pending = []
+        self.stream_bytes = {}  # stream_id -> bytes received so far
         self.start_time = time.time()
+        self._file = None
+        self._filename = None
+        self._prefix = None
+        self._timestamp = None
         
     def log_event(self, category, event_type, data=None, stream_id=None):
         """Log a QUIC event with timestamp"""
@@ -28,7 +60,9 @@ class QLogger:
         if stream_id is not None:
             event["data"]["stream_id"] = stream_id
             
-        self.events.append(event)
+        self.pending.append(event)
+        if len(self.pending) >= self.buffer_size:
+            self.flush()
         
     def log_connection_start(self, host, port):
         """Log connection initiation"""
@@ -37,44 +71,66 @@ class QLogger:
             "protocol": "QUIC"
         })
         
-    def log_connection_established(self):
+    def log_connection_established(self, session_resumed=False, early_data_accepted=False):
         """Log successful connection"""
         self.log_event("connection", "established", {
-            "time_to_connect": (time.time() - self.start_time) * 1000
+            "time_to_connect": (time.time() - self.start_time) * 1000,
+            "session_resumed": session_resumed,
+            "early_data_accepted": early_data_accepted
         })
         
-    def log_stream_request(self, stream_id, video_name):
+    def log_stream_request(self, stream_id, video_name, byte_range=None):
         """Log stream request"""
-        self.log_event("stream", "request", {
+        data = {
             "video_name": video_name.decode(),
             "method": "GET"
-        }, stream_id)
+        }
+        if byte_range is not None:
+            data["byte_range"] = byte_range
+        self.log_event("stream", "request", data, stream_id)
         
     def log_data_received(self, stream_id, data_length, is_first_chunk=False, is_last_chunk=False):
         """Log data reception"""
+        cumulative_bytes = self.stream_bytes.get(stream_id, 0) + data_length
+        self.stream_bytes[stream_id] = cumulative_bytes
         self.log_event("stream", "data_received", {
             "bytes_received": data_length,
-            "cumulative_bytes": sum(evt["data"].get("bytes_received", 0) for evt in self.events 
-                                  if evt["name"] == "stream:data_received" and evt["data"].get("stream_id") == stream_id) + data_length,
+            "cumulative_bytes": cumulative_bytes,
             "is_first_chunk": is_first_chunk,
             "is_last_chunk": is_last_chunk
         }, stream_id)
         
     def log_transfer_complete(self, stream_id, total_bytes, total_time, transfer_rate):
         """Log transfer completion"""
+        self.stream_bytes.pop(stream_id, None)
         self.log_event("stream", "transfer_complete", {
             "total_bytes": total_bytes,
             "total_time_ms": total_time * 1000,
             "transfer_rate_kbps": transfer_rate * 8 / 1024  # Convert to kbps
         }, stream_id)
-        
-    def save_qlog(self, filename_prefix="quic_client"):
-        """Save qlog events to file"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = self.log_dir / f"{filename_prefix}_{timestamp}.qlog"
-        
-        qlog_data = {
-            "qlog_version": "draft-01",
+
+    def _candidates(self, filename_prefix):
+        """Trace paths to try; loggers started in the same second get -2, -3, ..."""
+        yield self.log_dir / f"{filename_prefix}_{self._timestamp}.sqlog"
+        n = 2
+        while True:
+            yield self.log_dir / f"{filename_prefix}_{self._timestamp}-{n}.sqlog"
+            n += 1
+
+    def _open(self, filename_prefix):
+        self._timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for filename in self._candidates(filename_prefix):
+            try:
+                # Exclusive create: never truncate another logger's trace
+                self._file = open(filename, 'x')
+                break
+            except FileExistsError:
+                continue
+        self._filename = filename
+        self._prefix = filename_prefix
+        header = {
+            "qlog_version": "0.3",
+            "qlog_format": "JSON-SEQ",
             "title": "QUIC Client QLog",
             "description": "QUIC video streaming client events",
             "trace": {
@@ -84,67 +140,290 @@ class QLogger:
                 },
                 "common_fields": {
                     "reference_time": self.start_time * 1000,
-                    "time_units": "ms"
-                },
-                "events": self.events
+                    "time_format": "relative"
+                }
             }
         }
+        self._write_record(header)
+
+    def _write_record(self, record):
+        self._file.write(self.RECORD_SEPARATOR)
+        self._file.write(json.dumps(record, separators=(",", ":")))
+        self._file.write("\n")
+
+    def flush(self, filename_prefix="quic_client"):
+        """Append the pending events to the trace file"""
+        if not self.pending:
+            return
+        if self.log_dir is None:
+            self.pending.clear()
+            return
+        if self._file is None:
+            self._open(filename_prefix)
+        for event in self.pending:
+            self._write_record(event)
+        self.pending.clear()
+        self._file.flush()
         
-        with open(filename, 'w') as f:
-            json.dump(qlog_data, f, indent=2)
+    def save_qlog(self, filename_prefix="quic_client"):
+        """Flush and close the trace file, naming it after filename_prefix"""
+        self.flush(filename_prefix)
+        if self._file is None:
+            return None
+        self._file.close()
+        filename = self._filename
+        if filename_prefix != self._prefix:
+            # Streaming started before the request name was known; link()
+            # fails instead of replacing a trace that already has the name
+            for filename in self._candidates(filename_prefix):
+                try:
+                    os.link(self._filename, filename)
+                    break
+                except FileExistsError:
+                    continue
+            self._filename.unlink()
+        self._file = None
+        self._filename = None
             
         print(f"QLog saved to: {filename}")
         return filename
 
+class TransferError(RuntimeError):
+    """One or more transfers failed; transfers holds all of them, failed or not"""
+    def __init__(self, transfers):
+        self.transfers = transfers
+        failed = [t for t in transfers if t.error is not None]
+        super().__init__("; ".join(f"{t.label}: {t.error}" for t in failed))
+
+def raise_for_errors(transfers):
+    """Raise TransferError if any transfer failed, else return the transfers"""
+    if any(t.error is not None for t in transfers):
+        raise TransferError(transfers)
+    return transfers
+
+class StreamTransfer:
+    """Receive state for a single request stream
+
+    Every reply starts with a status line: `OK <size>` before the data, or
+    `<code> <reason>` (e.g. `404 Video Not Found`) instead of it. Data is
+    written to the sink as it arrives rather than accumulated in memory.
+    The sink is any object with a write() method (an open file,
+    io.BytesIO, ...) or a callable taking each chunk; by default the data is
+    streamed to received_<name> on disk, a file created only once the
+    reply turns out to have a body. error is set when the server refused
+    the request or the reply ended short.
+    """
+    def __init__(self, stream_id, video_name, byte_range=None, sink=None):
+        self.stream_id = stream_id
+        self.video_name = video_name
+        self.byte_range = byte_range
+        self.bytes_received = 0
+        self.start_time = time.time()
+        self.first_chunk_time = 0
+        self.complete = asyncio.Event()
+        self.status = None  # the reply's status line, once received
+        self.expected_size = None
+        self.error = None
+        self.filename = None
+        self._head = b''
+        self._owns_sink = sink is None
+        self._write = None
+        if sink is None:
+            self.filename = f"received_{video_name.decode().replace('/', '_')}"
+            if byte_range:
+                self.filename += f".{byte_range}"
+        else:
+            self._write = sink.write if hasattr(sink, 'write') else sink
+        self.sink = sink
+
+    def _open_file(self):
+        self.sink = open(self.filename, 'wb', buffering=1024 * 1024)
+        self._write = self.sink.write
+
+    @property
+    def label(self):
+        name = self.video_name.decode()
+        return f"{name} (bytes {self.byte_range})" if self.byte_range else name
+
+    def write(self, data):
+        if self._write is None:
+            self._open_file()
+        self._write(data)
+        self.bytes_received += len(data)
+
+    def receive(self, data):
+        """Handle raw stream data: the status line first, then the body"""
+        if self.status is None:
+            self._head += data
+            line, found, data = self._head.partition(b'\n')
+            if not found:
+                return
+            self._head = b''
+            self.status = line.decode(errors='replace')
+            if line.startswith(b'OK'):
+                fields = line.split()
+                try:
+                    self.expected_size = int(fields[1]) if len(fields) > 1 else None
+                except ValueError:
+                    self.error = f"malformed status line: {self.status}"
+            else:
+                self.error = self.status
+        if self.error is None and data:
+            self.write(data)
+
+    def finish(self):
+        """The stream ended: flag a missing status line or a short body"""
+        if self.error is not None:
+            return
+        if self.status is None:
+            self.error = "reply ended without a status line"
+        elif self.expected_size is not None and self.bytes_received != self.expected_size:
+            self.error = f"truncated reply: {self.bytes_received} of {self.expected_size} bytes"
+
+    def close(self):
+        """Close the sink if this transfer opened it"""
+        if self._owns_sink:
+            if self.sink is None and self.error is None:
+                self._open_file()  # an empty body still saves an empty file
+            if self.sink is not None:
+                self.sink.close()
+
+class DatagramTransfer(StreamTransfer):
+    """Receive state for a low-latency transfer carried in DATAGRAM frames
+
+    The request stream only carries control lines; media arrives as
+    datagrams, goes through a JitterBuffer and is written to the sink in
+    sequence order.
+    """
+    def __init__(self, stream_id, video_name, byte_range=None, sink=None,
+                 jitter_delay=0.05, retransmit=True):
+        super().__init__(stream_id, video_name, byte_range, sink)
+        self.jitter_delay = jitter_delay
+        self.retransmit = retransmit
+        self.buffer = None  # created once the OK header arrives
+        self.stats = None
+        self.timer = None
+        self._control = b''
+        self._early = []  # datagrams that overtook the OK header
+
+    def control_lines(self, data):
+        """Split reliable control data into complete lines"""
+        self._control += data
+        *lines, self._control = self._control.split(b'\n')
+        return lines
+
 class VideoStreamProtocol(QuicConnectionProtocol):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, qlogger=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.video_data = b''
         self.start_time = time.time()
-        self.first_chunk_time = 0
         self.connection_time = 0
-        self.current_stream_id = None
-        self.video_name = None
-        self.transfer_complete = asyncio.Event()
-        self.qlogger = QLogger()
+        self.transfers = {}  # stream_id -> StreamTransfer
+        self.qlogger = qlogger or QLogger()
         self.connection_established = False
 
     def get_next_stream_id(self) -> int:
         """Get the next available client-initiated stream ID"""
         return self._quic.get_next_available_stream_id()
 
-    async def request_video(self, video_name: bytes) -> None:
-        """Initiate video request on a new stream"""
-        self.video_name = video_name
-        self.current_stream_id = self.get_next_stream_id()
+    async def request_video(self, video_name: bytes, byte_range=None, sink=None) -> StreamTransfer:
+        """Initiate video request on a new stream and wait for it to finish
+
+        byte_range is an optional (start, end) tuple with an inclusive end,
+        or a "start-end" string such as the manifest's indexRange values.
+        sink receives the data as it arrives (see StreamTransfer).
+        """
+        byte_range = format_byte_range(byte_range)
+        stream_id = self.get_next_stream_id()
+        transfer = StreamTransfer(stream_id, video_name, byte_range, sink)
+        self.transfers[stream_id] = transfer
         
         # Log the stream request
-        self.qlogger.log_stream_request(self.current_stream_id, video_name)
+        self.qlogger.log_stream_request(stream_id, video_name, byte_range)
         
+        request = f"GET {video_name.decode()}"
+        if byte_range:
+            request += f" {byte_range}"
         self._quic.send_stream_data(
-            stream_id=self.current_stream_id,
-            data=f"GET {video_name.decode()}".encode(),
+            stream_id=stream_id,
+            data=request.encode(),
             end_stream=False
         )
+        self.transmit()
         
-        await self.transfer_complete.wait()
+        await transfer.complete.wait()
+        return transfer
+
+    async def request_datagram(self, video_name: bytes, byte_range=None, sink=None,
+                               fec_group=0, jitter_delay=0.05, retransmit=True) -> DatagramTransfer:
+        """Fetch a video in low-latency mode, as sequence-numbered DATAGRAM frames
+
+        fec_group asks the server for one XOR parity packet per fec_group data
+        packets (0 disables FEC). Packets still missing jitter_delay seconds
+        after they became overdue are NACKed once if retransmit is set, then
+        written as zero-filled gaps. Loss and delay statistics end up in
+        transfer.stats.
+        """
+        byte_range = format_byte_range(byte_range)
+        stream_id = self.get_next_stream_id()
+        transfer = DatagramTransfer(stream_id, video_name, byte_range, sink, jitter_delay, retransmit)
+        self.transfers[stream_id] = transfer
+        
+        self.qlogger.log_stream_request(stream_id, video_name, byte_range)
+        
+        request = f"DGRAM {video_name.decode()}"
+        if byte_range:
+            request += f" {byte_range}"
+        if fec_group:
+            request += f" fec={fec_group}"
+        self._quic.send_stream_data(stream_id, request.encode(), end_stream=False)
+        self.transmit()
+        
+        await transfer.complete.wait()
+        return transfer
+
+    async def fetch_many(self, names, max_concurrency=4, sink_factory=None):
+        """Fetch several videos in parallel, each on its own stream
+
+        Each item of names is either a video name or a (video_name, byte_range)
+        pair. At most max_concurrency streams are open at once. Transfers are
+        returned in the same order as names, failed ones with their error
+        set. sink_factory, if given, is called with (video_name, byte_range)
+        to create each transfer's sink.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(item):
+            video_name, byte_range = item if isinstance(item, tuple) else (item, None)
+            async with semaphore:
+                sink = sink_factory(video_name, byte_range) if sink_factory else None
+                return await self.request_video(video_name, byte_range, sink)
+
+        return await asyncio.gather(*(fetch(item) for item in names))
 
     def quic_event_received(self, event):
         """Handle incoming QUIC events"""
         # Log connection establishment
-        if not self.connection_established:
+        if isinstance(event, HandshakeCompleted) and not self.connection_established:
             self.connection_established = True
             self.connection_time = time.time() - self.start_time
-            self.qlogger.log_connection_established()
-            print(f"Connection established, time: {self.connection_time:.3f}s")
+            self.qlogger.log_connection_established(event.session_resumed, event.early_data_accepted)
+            resumed = " (resumed, 0-RTT accepted)" if event.early_data_accepted else (
+                " (resumed)" if event.session_resumed else "")
+            print(f"Connection established{resumed}, time: {self.connection_time:.3f}s")
         
-        if isinstance(event, StreamDataReceived) and event.stream_id == self.current_stream_id:
-            is_first_chunk = not self.video_data
+        if isinstance(event, StreamDataReceived):
+            transfer = self.transfers.get(event.stream_id)
+            if transfer is None:
+                return
+            if isinstance(transfer, DatagramTransfer):
+                self._datagram_control_received(transfer, event.data, event.end_stream)
+                return
+            is_first_chunk = not transfer.first_chunk_time
             is_last_chunk = event.end_stream
             
             if is_first_chunk:
-                self.first_chunk_time = time.time() - self.start_time
-                print(f"First packet received on stream {self.current_stream_id}")
+                transfer.first_chunk_time = time.time() - transfer.start_time
+                print(f"First packet received on stream {event.stream_id}")
             
             # Log data reception
             self.qlogger.log_data_received(
@@ -154,70 +433,349 @@ class VideoStreamProtocol(QuicConnectionProtocol):
                 is_last_chunk=is_last_chunk
             )
             
-            self.video_data += event.data
+            transfer.receive(event.data)
             
             if event.end_stream:
-                self._handle_transfer_complete()
+                transfer.finish()
+                self._handle_transfer_complete(transfer)
+        elif isinstance(event, DatagramFrameReceived):
+            self._datagram_received(event.data)
+        elif isinstance(event, ConnectionTerminated):
+            # Release anyone still waiting on a stream of this connection,
+            # marking their partial data as failed
+            for transfer in list(self.transfers.values()):
+                if isinstance(transfer, DatagramTransfer) and transfer.timer is not None:
+                    transfer.timer.cancel()
+                if transfer.error is None:
+                    transfer.error = f"connection closed: {event.reason_phrase or event.error_code}"
+                transfer.close()
+                transfer.complete.set()
+            self.transfers.clear()
+
+    def _datagram_control_received(self, transfer, data, end_stream):
+        for line in transfer.control_lines(data):
+            if line.startswith(b'OK '):
+                size, packets, payload_size, fec_group = map(int, line[3:].split())
+                transfer.buffer = JitterBuffer(
+                    packets, size, payload_size, fec_group, transfer.jitter_delay,
+                    transfer.write,
+                    partial(self._request_retransmit, transfer.stream_id) if transfer.retransmit else None
+                )
+                for early in transfer._early:
+                    self._datagram_received(early)
+                transfer._early = []
+            elif line == b'END':
+                transfer.buffer.end()
+            elif transfer.buffer is None:
+                transfer.error = line.decode(errors='replace')  # e.g. 404 Video Not Found
+        if transfer.buffer is None and end_stream:
+            # The server answered with an error instead of an OK header
+            transfer.error = transfer.error or "reply ended without a status line"
+            print(f"Datagram request for {transfer.label} failed: {transfer.error}")
+            del self.transfers[transfer.stream_id]
+            transfer.close()
+            transfer.complete.set()
+            return
+        if transfer.buffer is not None:
+            self._service_jitter_buffer(transfer)
+
+    def _datagram_received(self, data):
+        transfer_id, seq, flags, send_time_ms, payload = unpack_datagram(data)
+        transfer = self.transfers.get(transfer_id)
+        if not isinstance(transfer, DatagramTransfer):
+            return
+        if transfer.buffer is None:
+            transfer._early.append(data)
+            return
+        now = time.time()
+        if not transfer.first_chunk_time:
+            transfer.first_chunk_time = now - transfer.start_time
+            print(f"First datagram received for stream {transfer_id}")
+        transfer.buffer.add(seq, flags, payload, send_time_ms, now - transfer.start_time)
+        self._service_jitter_buffer(transfer)
 
-    def _handle_transfer_complete(self):
+    def _service_jitter_buffer(self, transfer):
+        """Release in-order data and re-arm the gap timer"""
+        if transfer.timer is not None:
+            transfer.timer.cancel()
+            transfer.timer = None
+        deadline = transfer.buffer.poll(time.time() - transfer.start_time)
+        if transfer.buffer.finished:
+            self._quic.send_stream_data(transfer.stream_id, b'DONE\n', end_stream=True)
+            self.transmit()
+            self._handle_transfer_complete(transfer)
+        elif deadline is not None:
+            delay = max(0, deadline - (time.time() - transfer.start_time))
+            transfer.timer = self._loop.call_later(delay, self._service_jitter_buffer, transfer)
+
+    def _request_retransmit(self, stream_id, seqs):
+        for i in range(0, len(seqs), 256):
+            line = "NACK " + ",".join(map(str, seqs[i:i + 256])) + "\n"
+            self._quic.send_stream_data(stream_id, line.encode())
+        self.transmit()
+
+    def _handle_transfer_complete(self, transfer):
         """Finalize transfer and print statistics"""
-        total_time = time.time() - self.start_time
-        transfer_time = total_time - self.first_chunk_time
-        transfer_rate = (len(self.video_data) / 1024) / transfer_time
+        del self.transfers[transfer.stream_id]
+        total_time = time.time() - transfer.start_time
+        transfer_time = total_time - transfer.first_chunk_time
+        transfer_rate = (transfer.bytes_received / 1024) / transfer_time if transfer_time else 0
         
-        print(f"\nTransfer complete for {self.video_name.decode()}")
+        if transfer.error is not None:
+            print(f"\nTransfer failed for {transfer.label}: {transfer.error}")
+        else:
+            print(f"\nTransfer complete for {transfer.label}")
         print(f"Total time: {total_time:.3f} seconds")
-        print(f"Video size: {len(self.video_data)/1024:.2f} KB")
+        print(f"Video size: {transfer.bytes_received/1024:.2f} KB")
         print(f"Transfer rate: {transfer_rate:.2f} KB/s")
         
         # Log transfer completion
         self.qlogger.log_transfer_complete(
-            self.current_stream_id,
-            len(self.video_data),
+            transfer.stream_id,
+            transfer.bytes_received,
             total_time,
             transfer_rate
         )
         
-        # Save qlog file
-        qlog_file = self.qlogger.save_qlog(f"video_{self.video_name.decode().replace('.', '_')}")
-        print(f"QLog file: {qlog_file}")
+        if isinstance(transfer, DatagramTransfer):
+            transfer.stats = transfer.buffer.stats.summary(transfer.buffer.packets)
+            print(f"Datagrams: {transfer.stats['received']}/{transfer.stats['packets']} received, "
+                  f"{transfer.stats['recovered_fec']} recovered by FEC, "
+                  f"{transfer.stats['recovered_retransmit']} retransmitted, "
+                  f"{transfer.stats['lost']} lost ({transfer.stats['loss_rate']:.2%})")
+            print(f"Delay: mean {transfer.stats['delay_mean_ms']:.2f} ms, "
+                  f"p95 {transfer.stats['delay_p95_ms']:.2f} ms, "
+                  f"jitter {transfer.stats['jitter_ms']:.2f} ms")
+            self.qlogger.log_event("datagram", "transfer_stats", dict(transfer.stats), transfer.stream_id)
+        
+        # Save qlog file once no other stream is still running
+        if not self.transfers:
+            qlog_file = self.qlogger.save_qlog(f"video_{transfer.video_name.decode().replace('.', '_').replace('/', '_')}")
+            print(f"QLog file: {qlog_file}")
         
-        self._save_video()
-        self.transfer_complete.set()
+        transfer.close()
+        if transfer.filename and transfer.sink is not None:
+            print(f"Video saved as {transfer.filename}")
+        transfer.complete.set()
 
-    def _save_video(self):
-        """Save video data to file"""
-        filename = f"received_{self.video_name.decode()}"
-        with open(filename, 'wb') as f:
-            f.write(self.video_data)
-        print(f"Video saved as {filename}")
+class SessionTicketCache:
+    """Client-side cache of TLS session tickets, keyed by (host, port)
 
-class VideoStreamClient:
+    A cached ticket lets the next connection to the same server resume the
+    session and carry its GET request in 0-RTT early data. The newest ticket
+    received from a server replaces the previous one.
+    """
     def __init__(self):
+        self.tickets = {}
+
+    def add(self, host, port, ticket):
+        self.tickets[(host, port)] = ticket
+
+    def get(self, host, port):
+        ticket = self.tickets.get((host, port))
+        if ticket is not None and not ticket.is_valid:
+            del self.tickets[(host, port)]
+            return None
+        return ticket
+
+class PooledConnection:
+    """A QUIC connection held open by QuicConnectionPool"""
+    def __init__(self, key, context, protocol):
+        self.key = key
+        self.context = context  # the connect() context manager, exited on close
+        self.protocol = protocol
+        self.active_streams = 0
+        self.last_used = time.monotonic()
+        self.keepalive = None
+
+    @property
+    def is_closed(self):
+        # _close_event is set as soon as either side starts closing, before
+        # the draining period ends and _closed is set
+        return self.protocol._closed.is_set() or self.protocol._quic._close_event is not None
+
+class QuicConnectionPool:
+    """Reusable QUIC connections keyed by (host, port, ALPN)
+
+    Requests lease a stream on an existing connection while it has fewer than
+    max_streams_per_connection active streams; otherwise another connection is
+    opened. Idle connections are kept alive with PINGs and closed once they
+    have been unused for idle_timeout seconds; a connection the server
+    closes is dropped from the pool as soon as it terminates.
+    """
+    def __init__(self, connect, max_streams_per_connection=8,
+                 keepalive_interval=15.0, idle_timeout=120.0):
+        self._connect = connect
+        self.max_streams_per_connection = max_streams_per_connection
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.connections = {}  # key -> [PooledConnection]
+        self._locks = {}
+
+    @asynccontextmanager
+    async def stream(self, host, port, alpn):
+        """Lease a connection for one request stream"""
+        conn = await self._acquire((host, port, alpn))
+        try:
+            yield conn.protocol
+        finally:
+            conn.active_streams -= 1
+            conn.last_used = time.monotonic()
+
+    async def _acquire(self, key):
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            conns = self.connections.setdefault(key, [])
+            conns[:] = [c for c in conns if not c.is_closed]
+            for conn in conns:
+                if conn.active_streams < self.max_streams_per_connection:
+                    break
+            else:
+                conn = await self._open(key)
+                conns.append(conn)
+            conn.active_streams += 1
+            return conn
+
+    async def _open(self, key):
+        host, port, _ = key
+        print(f"Connecting to {host}:{port}...")
+        qlogger = QLogger()
+        qlogger.log_connection_start(host, port)
+        context = self._connect(host, port, qlogger)
+        protocol = await context.__aenter__()
+        conn = PooledConnection(key, context, protocol)
+        conn.keepalive = asyncio.ensure_future(self._keepalive(conn))
+        return conn
+
+    async def _keepalive(self, conn):
+        while not conn.is_closed:
+            try:
+                await asyncio.wait_for(conn.protocol.wait_closed(), self.keepalive_interval)
+                break  # terminated by the server or the idle timer
+            except asyncio.TimeoutError:
+                pass
+            if conn.active_streams:
+                continue
+            if time.monotonic() - conn.last_used > self.idle_timeout:
+                break
+            try:
+                await asyncio.wait_for(conn.protocol.ping(), self.keepalive_interval)
+            except (asyncio.TimeoutError, ConnectionError):
+                break
+        await self._close(conn)
+
+    async def _close(self, conn):
+        conns = self.connections.get(conn.key, [])
+        if conn in conns:
+            conns.remove(conn)
+            await conn.context.__aexit__(None, None, None)
+
+    async def close(self):
+        """Close every pooled connection"""
+        for conns in list(self.connections.values()):
+            for conn in list(conns):
+                conn.keepalive.cancel()
+                await self._close(conn)
+
+class VideoStreamClient:
+    def __init__(self, persistent=False, max_streams_per_connection=8, keepalive_interval=15.0,
+                 idle_timeout=120.0):
         self.configuration = QuicConfiguration(
             is_client=True,
             alpn_protocols=["video-stream"],
             max_datagram_frame_size=65536,
             verify_mode=False
         )
+        self.session_tickets = SessionTicketCache()
+        # With persistent=True connections outlive run()/fetch_many() calls;
+        # call close() when done
+        self.pool = QuicConnectionPool(
+            self._connect, max_streams_per_connection, keepalive_interval, idle_timeout
+        ) if persistent else None
 
-    async def run(self, host: str, port: int, video_name: bytes):
+    def _connect(self, host, port, qlogger):
+        """Open a connection, resuming with 0-RTT when a ticket is cached"""
+        ticket = self.session_tickets.get(host, port)
+        # Per-connection copy: connect() fills in server_name, and the ticket
+        # must not leak into connections to other servers
+        configuration = replace(self.configuration, session_ticket=ticket)
+        return connect(
+            host=host,
+            port=port,
+            configuration=configuration,
+            create_protocol=partial(VideoStreamProtocol, qlogger=qlogger),
+            session_ticket_handler=partial(self.session_tickets.add, host, port),
+            # With a ticket the request goes out in the first flight
+            wait_connected=ticket is None
+        )
+
+    def _pooled_stream(self, host, port):
+        return self.pool.stream(host, port, tuple(self.configuration.alpn_protocols))
+
+    @asynccontextmanager
+    async def _session(self, host, port):
+        """Yield a protocol from the pool, or from a one-off connection"""
+        if self.pool is not None:
+            async with self._pooled_stream(host, port) as protocol:
+                yield protocol
+            return
+        
         print(f"Connecting to {host}:{port}...")
         
         # Create qlogger instance for connection logging
         qlogger = QLogger()
         qlogger.log_connection_start(host, port)
         
-        async with connect(
-            host=host,
-            port=port,
-            configuration=self.configuration,
-            create_protocol=VideoStreamProtocol
-        ) as protocol:
-            # Pass the qlogger to the protocol instance
-            protocol.qlogger = qlogger
+        async with self._connect(host, port, qlogger) as protocol:
             print("Connected, requesting video...")
-            await protocol.request_video(video_name)
+            yield protocol
+
+    async def _request(self, host, port, video_name, byte_range, sink):
+        async with self._session(host, port) as protocol:
+            return await protocol.request_video(video_name, byte_range, sink)
+
+    async def run(self, host: str, port: int, video_name: bytes, byte_range=None, sink=None):
+        """Fetch one video; raises TransferError if it fails or arrives incomplete"""
+        transfer = await self._request(host, port, video_name, byte_range, sink)
+        return raise_for_errors([transfer])[0]
+
+    async def run_low_latency(self, host: str, port: int, video_name: bytes, byte_range=None,
+                              sink=None, **options):
+        """Like run(), but over DATAGRAM frames (see request_datagram for options)"""
+        async with self._session(host, port) as protocol:
+            transfer = await protocol.request_datagram(video_name, byte_range, sink, **options)
+        return raise_for_errors([transfer])[0]
+
+    async def fetch_many(self, host: str, port: int, names, max_concurrency=4, sink_factory=None):
+        """Fetch several videos in parallel over one connection
+
+        Every transfer runs to the end; if any failed, TransferError is
+        raised afterwards with all of them in its transfers attribute.
+        """
+        if self.pool is not None:
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def fetch(item):
+                video_name, byte_range = item if isinstance(item, tuple) else (item, None)
+                async with semaphore:
+                    sink = sink_factory(video_name, byte_range) if sink_factory else None
+                    return await self._request(host, port, video_name, byte_range, sink)
+
+            return raise_for_errors(await asyncio.gather(*(fetch(item) for item in names)))
+        
+        print(f"Connecting to {host}:{port}...")
+        
+        qlogger = QLogger()
+        qlogger.log_connection_start(host, port)
+        
+        async with self._connect(host, port, qlogger) as protocol:
+            print(f"Connected, requesting {len(names)} videos...")
+            transfers = await protocol.fetch_many(names, max_concurrency, sink_factory)
+        return raise_for_errors(transfers)
+
+    async def close(self):
+        """Close pooled connections, if any"""
+        if self.pool is not None:
+            await self.pool.close()
 
 async def main():
     client = VideoStreamClient()
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter, namedtuple
+from quic_client import QLogger, VideoStreamClient
+
+# One request of the mix: video name, optional "start-end" byte range, weight
+MixEntry = namedtuple('MixEntry', 'name byte_range weight')
+
+def parse_mix(specs):
+    """Parse 'name[@start-end][:weight]' items, e.g. sample_high.mp4:3 sample_low.mp4@0-65535"""
+    mix = []
+    for spec in specs:
+        spec, _, weight = spec.partition(':')
+        name, _, byte_range = spec.partition('@')
+        mix.append(MixEntry(name, byte_range or None, float(weight or 1)))
+    return mix
+
+def discard(data):
+    """Reply sink for load runs: the transfer counts the bytes, nothing is kept"""
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+async def client_session(client, host, port, items, arrived, qlog_dir, timeout):
+    """One simulated viewer: connect, fetch `items` in turn, close; one record per request
+
+    queue_wait is the time from the session's arrival until it got a
+    concurrency slot; completion runs from each request's own start.
+    Only the session's first request carries the handshake time.
+    """
+    records = []
+    opened = time.time()
+
+    async def session():
+        qlogger = QLogger(qlog_dir)
+        async with client._connect(host, port, qlogger) as protocol:
+            for entry in items:
+                started = time.time()
+                transfer = await protocol.request_video(entry.name.encode(), entry.byte_range, discard)
+                finished = time.time()
+                records.append({
+                    'name': entry.name,
+                    'handshake': None if records else protocol.connection_time or None,
+                    'queue_wait': opened - arrived,
+                    'ttfb': transfer.first_chunk_time if transfer.bytes_received else None,
+                    'completion': finished - started,
+                    'bytes': transfer.bytes_received,
+                    'started': started,
+                    'finished': finished,
+                    # e.g. "404 Video Not Found" or "truncated reply"
+                    'error': transfer.error and transfer.error.split(':', 1)[0],
+                })
+
+    try:
+        await asyncio.wait_for(session(), timeout)
+    except Exception as e:
+        kind = 'timeout' if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+        records += [{'name': entry.name, 'started': opened, 'finished': time.time(), 'bytes': 0,
+                     'queue_wait': opened - arrived, 'error': kind} for entry in items[len(records):]]
+    return records
+
+async def generate_load(host, port, mix, rate, clients, concurrency, requests_per_client,
+                        resumption, qlog_dir, timeout, seed):
+    """Open-loop load: Poisson arrivals at `rate` sessions/s (closed loop if rate is 0)
+
+    At most `concurrency` sessions run at once; later arrivals queue for a
+    slot, and that wait is recorded as queue_wait, apart from completion. With
+    resumption all sessions share one TLS ticket cache, so all but the
+    first resume with 0-RTT.
+    """
+    rng = random.Random(seed)
+    weights = [entry.weight for entry in mix]
+    slots = asyncio.Semaphore(concurrency)
+    shared = VideoStreamClient() if resumption else None
+
+    async def viewer(items, arrived):
+        async with slots:
+            return await client_session(shared or VideoStreamClient(), host, port, items, arrived,
+                                        qlog_dir, timeout)
+
+    tasks = []
+    for _ in range(clients):
+        items = rng.choices(mix, weights, k=requests_per_client)
+        tasks.append(asyncio.ensure_future(viewer(items, time.time())))
+        if rate:
+            await asyncio.sleep(rng.expovariate(rate))
+    results = await asyncio.gather(*tasks)
+    return [record for records in results for record in records]
+
+def worker(args):
+    """Run one process's share of the load with client output silenced"""
+    (host, port, mix, rate, clients, concurrency, requests_per_client,
+     resumption, qlog_dir, timeout, seed) = args
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return asyncio.run(generate_load(host, port, mix, rate, clients, concurrency, requests_per_client,
+                                         resumption, qlog_dir, timeout, seed))
+
+def run_load(host='10.0.0.1', port=4433, mix=None, rate=50.0, clients=1000, concurrency=256,
+             requests_per_client=1, processes=1, resumption=False, qlog_dir=None, timeout=60.0, seed=0):
+    """Spread the load over `processes` event loops and return all request records
+
+    Rate, client count and concurrency are divided evenly between the
+    processes; each gets its own seed, so a run is reproducible.
+    """
+    mix = mix or [MixEntry('sample_high.mp4', None, 1.0)]
+    if clients <= 0:
+        return []
+    processes = max(1, min(processes, clients))
+    shares = [clients // processes + (i < clients % processes) for i in range(processes)]
+    jobs = [(host, port, mix, rate / processes, share, max(1, concurrency // processes), requests_per_client,
+             resumption, qlog_dir, timeout, seed + i) for i, share in enumerate(shares) if share]
+    if len(jobs) == 1:
+        return worker(jobs[0])
+    with multiprocessing.get_context('fork').Pool(len(jobs)) as pool:
+        return [record for records in pool.map(worker, jobs) for record in records]
+
+def summarize(records):
+    """Latency percentiles (ms), goodput and error counts over a set of request records"""
+    ok = [r for r in records if r['error'] is None]
+    summary = {
+        'requests': len(records),
+        'succeeded': len(ok),
+        'errors': dict(Counter(r['error'] for r in records if r['error'] is not None)),
+    }
+    for metric in ('handshake', 'queue_wait', 'ttfb', 'completion'):
+        values = sorted(r[metric] * 1000 for r in ok if r.get(metric) is not None)
+        summary[metric] = {f'p{p}': percentile(values, p) for p in (50, 90, 99)}
+        summary[metric]['max'] = values[-1] if values else None
+    if records:
+        wall = max(r['finished'] for r in records) - min(r['started'] for r in records)
+        summary['duration'] = wall
+        summary['goodput_mbps'] = sum(r['bytes'] for r in ok) * 8 / wall / 1e6 if wall else 0.0
+        summary['throughput_rps'] = len(ok) / wall if wall else 0.0
+    return summary
+
+def format_ms(value):
+    return '-' if value is None else f'{value:.1f}'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the QUIC video server")
+    parser.add_argument('--host', default='10.0.0.1')
+    parser.add_argument('--port', type=int, default=4433)
+    parser.add_argument('--mix', nargs='+', default=['sample_high.mp4'],
+                        help="requests as name[@start-end][:weight]")
+    parser.add_argument('--rate', type=float, nargs='+', default=[50.0],
+                        help="session arrival rates per second; several values step through them "
+                             "to find the saturation point (0 = closed loop)")
+    parser.add_argument('--clients', type=int, default=1000, help="sessions per step")
+    parser.add_argument('--concurrency', type=int, default=256, help="maximum sessions open at once")
+    parser.add_argument('--requests-per-client', type=int, default=1)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--resumption', action='store_true', help="reuse TLS tickets (0-RTT)")
+    parser.add_argument('--qlog', help="write per-connection qlogs to this directory")
+    parser.add_argument('--timeout', type=float, default=60.0, help="per-session timeout, seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the summaries to this file")
+    options = parser.parse_args(argv)
+
+    mix = parse_mix(options.mix)
+    steps = []
+    print(f"{'rate':>8} {'ok':>6} {'err':>5} {'hs p50':>8} {'hs p99':>8} {'wait p99':>9} {'ttfb p50':>9} {'ttfb p99':>9} "
+          f"{'done p50':>9} {'done p99':>9} {'goodput':>9}")
+    for rate in options.rate:
+        records = run_load(options.host, options.port, mix, rate, options.clients, options.concurrency,
+                           options.requests_per_client, options.processes, options.resumption,
+                           options.qlog, options.timeout, options.seed)
+        summary = summarize(records)
+        summary['rate'] = rate
+        steps.append(summary)
+        print(f"{rate:>8g} {summary['succeeded']:>6} {summary['requests'] - summary['succeeded']:>5} "
+              f"{format_ms(summary['handshake']['p50']):>8} {format_ms(summary['handshake']['p99']):>8} "
+              f"{format_ms(summary['queue_wait']['p99']):>9} {format_ms(summary['ttfb']['p50']):>9} {format_ms(summary['ttfb']['p99']):>9} "
+              f"{format_ms(summary['completion']['p50']):>9} {format_ms(summary['completion']['p99']):>9} "
+              f"{summary.get('goodput_mbps', 0):>8.1f}M")
+        if summary['errors']:
+            print(f"{'':>8} errors: {summary['errors']}")
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(steps, f, indent=2)
+    return steps
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,454 @@
 import os
+import json
+import time
+import signal
+import socket
+import struct
+import sys
 import asyncio
+import multiprocessing
+from functools import partial
 from aioquic.asyncio import serve
 from aioquic.quic.configuration import QuicConfiguration
-from aioquic.quic.events import StreamDataReceived
+from aioquic.quic.events import (
+    StreamDataReceived, ConnectionTerminated, StopSendingReceived, StreamReset
+)
 from aioquic.asyncio.protocol import QuicConnectionProtocol
 from aioquic.asyncio.server import QuicServer
+from media_store import media_store, MediaCatalog, SegmentCache, parse_byte_range
+from datagram_media import (
+    PAYLOAD_SIZE, FLAG_DATA, FLAG_PARITY, FLAG_RETRANSMIT, pack_datagram, xor_payloads
+)
 
-class VideoStreamHandler(QuicConnectionProtocol):
-    def __init__(self, *args, **kwargs):
+class SessionTicketStore:
+    """In-memory store of issued TLS session tickets
+
+    Tickets let returning clients resume without a full handshake and send
+    their first request as 0-RTT early data. A ticket stays redeemable until
+    it expires: a client doing short fetches often closes before the new
+    ticket of a resumed connection arrives, so single-use tickets would only
+    resume every other connection. Early data here is only ever an idempotent
+    GET, so replaying it is harmless.
+    """
+    def __init__(self, lifetime=3600, tickets=None, sweep_interval=60.0):
+        self.lifetime = lifetime
+        # ticket bytes -> (expires_at, SessionTicket); a multiprocessing
+        # Manager dict lets worker processes resume each other's sessions
+        self.tickets = tickets if tickets is not None else {}
+        # get() drops expired tickets it is asked for; the rest are swept at
+        # most every sweep_interval seconds, since with a Manager dict every
+        # access is a round trip to the manager process
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def add(self, ticket):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.sweep(now)
+        self.tickets[ticket.ticket] = (now + self.lifetime, ticket)
+
+    def sweep(self, now=None):
+        """Remove every expired ticket"""
+        now = time.monotonic() if now is None else now
+        expired = [label for label, (expires_at, _) in self.tickets.items() if expires_at <= now]
+        for label in expired:
+            self.tickets.pop(label, None)
+
+    def get(self, label):
+        entry = self.tickets.get(label)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic() or not entry[1].is_valid:
+            self.tickets.pop(label, None)
+            return None
+        return entry[1]
+
+class WorkerStats:
+    """Per-worker server counters in shared memory
+
+    Each worker only increments its own row, so no locking is needed, and
+    any worker can read the totals of all of them.
+    """
+    fields = ('connections', 'requests', 'bytes_sent', 'packets_forwarded', 'packets_adopted')
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.worker = 0  # row written by this process
+        self._values = multiprocessing.Array('Q', workers * len(self.fields), lock=False)
+
+    def add(self, field, n=1):
+        self._values[self.worker * len(self.fields) + self.fields.index(field)] += n
+
+    def per_worker(self):
+        width = len(self.fields)
+        return [dict(zip(self.fields, self._values[w * width:(w + 1) * width]))
+                for w in range(self.workers)]
+
+    def totals(self):
+        rows = self.per_worker()
+        return {field: sum(row[field] for row in rows) for field in self.fields}
+
+class PacedStreamProtocol(QuicConnectionProtocol):
+    """QUIC protocol that queues stream data only as fast as the send window opens"""
+    chunk_size = 1024 * 16  # upper bound for a single send_stream_data call
+
+    def __init__(self, *args, chunk_size=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.video_files = {
-            b'sample.mp4': open('../sample.mp4', 'rb')
-        }
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+        self._send_window_open = asyncio.Event()
+        self._cancelled_streams = set()  # peer sent STOP_SENDING or RESET_STREAM
+
+    def cancel_stream(self, stream_id):
+        """The peer no longer wants this stream's data; stop any send in progress"""
+        self._cancelled_streams.add(stream_id)
+        self._send_window_open.set()
+
+    def is_cancelled(self, stream_id):
+        return stream_id in self._cancelled_streams
+
+    def transmit(self):
+        super().transmit()
+        # ACKs, MAX_DATA/MAX_STREAM_DATA updates and loss/pacing timers are
+        # all processed just before transmit(), so wake any blocked sender
+        self._send_window_open.set()
+
+    def available_send_window(self, stream_id):
+        """Bytes that can be queued on a stream without exceeding QUIC credit"""
+        quic = self._quic
+        stream = quic._streams.get(stream_id)
+        if stream is None:
+            return 0
+        sender = stream.sender
+        # Data already queued but not yet put on the wire
+        unsent = sender._buffer_stop - sender.highest_offset
+        stream_credit = stream.max_stream_data_remote - sender._buffer_stop
+        connection_credit = quic._remote_max_data - quic._remote_max_data_used - unsent
+        # Keep at most one congestion window queued ahead of the wire so an
+        # ACK-triggered transmit() always has data ready to send
+        congestion_credit = quic._loss.congestion_window - unsent
+        return min(stream_credit, connection_credit, congestion_credit)
+
+    async def send_paced(self, stream_id, data, end_stream=True, send=None):
+        """Send a buffer, queueing only as much as the send window allows
+
+        send(stream_id, data, end_stream) defaults to the raw QUIC stream;
+        an HTTP/3 server passes its H3Connection.send_data instead.
+        Returns False if the connection closed or the peer cancelled the
+        stream before everything was sent.
+        """
+        send = send or self._quic.send_stream_data
+        offset = 0
+        while offset < len(data):
+            if self._closed.is_set():
+                return False
+            if stream_id in self._cancelled_streams:
+                self._cancelled_streams.discard(stream_id)
+                return False
+            window = self.available_send_window(stream_id)
+            if window <= 0:
+                self._send_window_open.clear()
+                await self._send_window_open.wait()
+                continue
+            size = min(self.chunk_size, window, len(data) - offset)
+            send(stream_id, data[offset:offset + size], end_stream=False)
+            offset += size
+            self.transmit()
+        if end_stream:
+            send(stream_id, b'', end_stream=True)
+            self.transmit()
+        return True
+
+class DatagramSend:
+    """Server side of one datagram transfer: its media and the client's control lines"""
+    __slots__ = ('view', 'start', 'packets', 'control', 'lock', 'done')
+
+    def __init__(self, view, start, packets):
+        self.view = view
+        self.start = start
+        self.packets = packets
+        self.control = b''  # partial control line carried over to the next frame
+        self.lock = asyncio.Lock()  # control lines are served one at a time, in order
+        self.done = False
+
+class VideoStreamHandler(PacedStreamProtocol):
+    # Shared by all connections; set by run_quic_server before serving.
+    # Files are mapped once per process by media_store, not opened per connection
+    catalog = None
+    cache = None  # SegmentCache for hot ranges, or None to serve straight from the mappings
+    stats = None  # WorkerStats shared by every worker process
+    datagram_queue_limit = 32  # DATAGRAM frames queued ahead of the wire
+    default_fec_group = 0  # data packets per XOR parity packet, 0 disables FEC
+    max_fec_group = 64  # largest group a client may ask for with fec=<k>
+
+    def __init__(self, *args, fec_group=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fec_group is not None:
+            self.default_fec_group = fec_group
+        self._datagram_sends = {}  # stream_id -> DatagramSend, kept for retransmits
+
+    async def send_datagram(self, data):
+        """Queue one DATAGRAM frame, waiting while the datagram queue is full"""
+        while len(self._quic._datagrams_pending) >= self.datagram_queue_limit:
+            if self._closed.is_set():
+                return False
+            self._send_window_open.clear()
+            await self._send_window_open.wait()
+        self._quic.send_datagram_frame(data)
+        self.transmit()
+        return True
+
+    async def send_datagrams(self, stream_id, view, fec_group):
+        """Send a buffer as sequence-numbered DATAGRAM frames
+
+        The request stream carries the reliable control messages: an
+        `OK <size> <packets> <payload size> <fec group>` header before the
+        media, `END` after it, and NACK/DONE lines from the client.
+        """
+        packets = -(-len(view) // PAYLOAD_SIZE)
+        start = time.monotonic()
+        self._datagram_sends[stream_id] = DatagramSend(view, start, packets)
+        self.send_status(stream_id, f"OK {len(view)} {packets} {PAYLOAD_SIZE} {fec_group}".encode())
+        group = []
+        for seq in range(packets):
+            payload = view[seq * PAYLOAD_SIZE:(seq + 1) * PAYLOAD_SIZE]
+            send_time_ms = int((time.monotonic() - start) * 1000)
+            if not await self.send_datagram(pack_datagram(stream_id, seq, FLAG_DATA, send_time_ms, payload)):
+                return False
+            if fec_group:
+                group.append(payload)
+                if len(group) == fec_group or seq == packets - 1:
+                    parity = xor_payloads(group, PAYLOAD_SIZE)
+                    group = []
+                    if not await self.send_datagram(
+                            pack_datagram(stream_id, seq // fec_group, FLAG_PARITY, send_time_ms, parity)):
+                        return False
+        if stream_id in self._datagram_sends:  # the client may already have sent DONE
+            self._quic.send_stream_data(stream_id, b'END\n')
+            self.transmit()
+        return True
+
+    async def handle_datagram_control(self, stream_id, send, data):
+        """Serve NACK retransmission requests and DONE on a datagram transfer
+
+        A line may be split across stream frames, so only complete lines are
+        handled. Each frame gets its own task; the lock keeps their lines in
+        arrival order, so DONE never overtakes an earlier NACK.
+        """
+        send.control += data
+        *lines, send.control = send.control.split(b'\n')
+        async with send.lock:
+            for line in lines:
+                if send.done:
+                    return
+                if line.startswith(b'NACK '):
+                    try:
+                        seqs = [int(seq) for seq in line[5:].split(b',')]
+                    except ValueError:
+                        continue  # malformed; those packets end up as gaps on the client
+                    for seq in seqs:
+                        if not 0 <= seq < send.packets:
+                            continue
+                        payload = send.view[seq * PAYLOAD_SIZE:(seq + 1) * PAYLOAD_SIZE]
+                        send_time_ms = int((time.monotonic() - send.start) * 1000)
+                        if not await self.send_datagram(
+                                pack_datagram(stream_id, seq, FLAG_RETRANSMIT, send_time_ms, payload)):
+                            return
+                elif line == b'DONE':
+                    send.done = True
+                    del self._datagram_sends[stream_id]
+                    self._quic.send_stream_data(stream_id, b'', end_stream=True)
+                    self.transmit()
+                    return
+
+    def send_status(self, stream_id, status, end_stream=False):
+        """Send the status line that starts every reply: `OK ...` or `<code> <reason>`"""
+        self._quic.send_stream_data(stream_id, status + b'\n', end_stream=end_stream)
+        self.transmit()
+
+    def send_error(self, stream_id, message):
+        self.send_status(stream_id, message, end_stream=True)
+
+    def resolve_request(self, stream_id, parts):
+        """Look up `<name> [<start>-<end>]`; return (name, view) or reply with an error"""
+        filename = parts[0] if parts else b''
+        entry = self.catalog.get(filename)
+        if entry is None:
+            self.send_error(stream_id, b'404 Video Not Found')
+            return None
+        view = media_store.view(entry.path)
+        if len(parts) > 1:
+            try:
+                byte_range = parse_byte_range(parts[1], len(view))
+            except ValueError:
+                self.send_error(stream_id, b'400 Bad Range')
+                return None
+            if byte_range is None:
+                self.send_error(stream_id, b'416 Range Not Satisfiable')
+                return None
+            start, stop = byte_range
+            print(f"Sending {filename.decode()} bytes {start}-{stop - 1} to client...")
+        else:
+            start, stop = 0, len(view)
+            print(f"Sending {filename.decode()} ({entry.size} bytes, {entry.content_type}) to client...")
+        if self.cache is not None and stop - start <= self.cache.max_item_bytes:
+            mapped = view
+            view = memoryview(self.cache.get(entry.path, entry.mtime, start, stop,
+                                             lambda a, b: bytes(mapped[a:b])))
+        else:
+            view = view[start:stop]
+        return filename, view
 
     async def handle_stream_data(self, stream_id, data):
         print(stream_id)
+        send = self._datagram_sends.get(stream_id)
+        if send is not None:
+            await self.handle_datagram_control(stream_id, send, data)
+            return
         # دریافت درخواست ویدیو از کلاینت
+        # Request line: GET <name> [<start>-<end>]; reply: `OK <size>` line, then the bytes
         if data.startswith(b'GET '):
-            filename = data[4:].strip()
-            if filename in self.video_files:
-                print(f"Sending {filename.decode()} to client...")
-                video_file = self.video_files[filename]
-                chunk_size = 1024 * 16  # 16KB chunks
+            self.stats.add('requests')
+            request = self.resolve_request(stream_id, data[4:].split())
+            if request is not None:
+                filename, view = request
+                self.send_status(stream_id, f"OK {len(view)}".encode())
                 
                 # ارسال ویدیو به صورت chunked
-                video_file.seek(0)
-                while True:
-                    chunk = video_file.read(chunk_size)
-                    if not chunk:
-                        break
-                    self._quic.send_stream_data(stream_id, chunk, end_stream=False)
-                    await asyncio.sleep(0.001)  # کنترل سرعت ارسال
-                
-                self._quic.send_stream_data(stream_id, b'', end_stream=True)
-                print(f"Sending {filename.decode()} is completed.")
-            else:
-                self._quic.send_stream_data(stream_id, b'404 Video Not Found', end_stream=True)
+                if await self.send_paced(stream_id, view):
+                    self.stats.add('bytes_sent', len(view))
+                    print(f"Sending {filename.decode()} is completed.")
+        # STATS: catalog and segment cache counters as JSON
+        elif data.startswith(b'STATS'):
+            stats = {"media_files": len(self.catalog), "totals": self.stats.totals(),
+                     "workers": self.stats.per_worker()}
+            if self.cache is not None:
+                stats["cache"] = self.cache.stats()
+            body = json.dumps(stats).encode()
+            self.send_status(stream_id, f"OK {len(body)}".encode())
+            self._quic.send_stream_data(stream_id, body, end_stream=True)
+            self.transmit()
+        # Low-latency mode: DGRAM <name> [<start>-<end>] [fec=<k>]
+        elif data.startswith(b'DGRAM '):
+            parts = data[6:].split()
+            fec_group = self.default_fec_group
+            self.stats.add('requests')
+            if parts and parts[-1].startswith(b'fec='):
+                value = parts.pop()[4:]
+                fec_group = int(value) if value.isdigit() else 0
+                if not 1 <= fec_group <= self.max_fec_group:
+                    self.send_error(stream_id, f"400 Bad FEC Group (1-{self.max_fec_group})".encode())
+                    return
+            request = self.resolve_request(stream_id, parts)
+            if request is not None:
+                filename, view = request
+                if await self.send_datagrams(stream_id, view, fec_group):
+                    self.stats.add('bytes_sent', len(view))
+                    print(f"Sending {filename.decode()} as datagrams is completed.")
 
     def quic_event_received(self, event):
         if isinstance(event, StreamDataReceived):
             asyncio.ensure_future(self.handle_stream_data(event.stream_id, event.data))
+        elif isinstance(event, (StopSendingReceived, StreamReset)):
+            self.cancel_stream(event.stream_id)
+        elif isinstance(event, ConnectionTerminated):
+            self._send_window_open.set()
+
+def tag_connection_ids(quic, worker):
+    """Make every connection ID this server issues start with the worker index
+
+    aioquic draws host CIDs from os.urandom; the first one is rewritten
+    before the handshake starts and later ones as soon as they are
+    generated, before any NEW_CONNECTION_ID frame carries them.
+    """
+    def tag(cid):
+        return bytes([worker]) + cid[1:]
+
+    first = quic._host_cids[0]
+    first.cid = tag(first.cid)
+    quic.host_cid = quic._local_initial_source_connection_id = first.cid
+    replenish = quic._replenish_connection_ids
+
+    def replenish_tagged():
+        start = len(quic._host_cids)
+        replenish()
+        for connection_id in quic._host_cids[start:]:
+            connection_id.cid = tag(connection_id.cid)
+
+    quic._replenish_connection_ids = replenish_tagged
+
+# Forwarded packet: client host length, client host, client port, then the QUIC datagram
+FORWARD_HEADER = struct.Struct('!HH')
+
+class WorkerQuicServer(QuicServer):
+    """QuicServer for one SO_REUSEPORT worker process
+
+    The kernel spreads client 4-tuples over the workers, which breaks when a
+    client migrates to a new address: its packets may reach a worker that
+    does not own the connection. Connection IDs carry the owning worker's
+    index (see tag_connection_ids), so a packet for an unknown short-header
+    or Handshake connection ID is forwarded to its owner over a Unix socket
+    and the owner answers from its own socket on the same port.
+    """
+
+    def __init__(self, *, worker, channels, stats, create_protocol, **kwargs):
+        super().__init__(create_protocol=partial(self._create_tagged_protocol, create_protocol), **kwargs)
+        self.worker = worker
+        self.channels = channels  # one socketpair per worker: (receive end, send end)
+        self.stats = stats
+        self._cid_length = self._configuration.connection_id_length
 
-async def run_quic_server():
+    def _create_tagged_protocol(self, create_protocol, connection, **kwargs):
+        tag_connection_ids(connection, self.worker)
+        self.stats.add('connections')
+        return create_protocol(connection, **kwargs)
+
+    def owner(self, data):
+        """Worker that issued the packet's destination CID, or None to handle it here"""
+        if not data:
+            return None
+        first = data[0]
+        if first & 0x80:
+            # Long header: only Handshake packets are addressed to a server-chosen
+            # CID; Initial and 0-RTT use the client's, and the kernel keeps
+            # those on one worker for as long as the client address is stable
+            if (first & 0x30) >> 4 != 2 or len(data) < 7:
+                return None
+            cid = data[6:6 + data[5]]
+        else:
+            cid = data[1:1 + self._cid_length]
+        if not cid or cid in self._protocols or cid[0] >= len(self.channels) or cid[0] == self.worker:
+            return None
+        return cid[0]
+
+    def datagram_received(self, data, addr):
+        owner = self.owner(data)
+        if owner is None:
+            super().datagram_received(data, addr)
+            return
+        host = addr[0].encode()
+        try:
+            self.channels[owner][1].send(FORWARD_HEADER.pack(len(host), addr[1]) + host + data)
+            self.stats.add('packets_forwarded')
+        except (BlockingIOError, OSError):
+            pass  # dropped like any other lost packet
+
+    def forwarded_received(self):
+        """Read packets other workers forwarded to this one"""
+        channel = self.channels[self.worker][0]
+        while True:
+            try:
+                message = channel.recv(65536)
+            except BlockingIOError:
+                return
+            host_length, port = FORWARD_HEADER.unpack_from(message)
+            start = FORWARD_HEADER.size
+            host = message[start:start + host_length].decode()
+            self.stats.add('packets_adopted')
+            super().datagram_received(message[start + host_length:], (host, port))
+
+def create_server_configuration():
     configuration = QuicConfiguration(
         is_client=False,
         alpn_protocols=["video-stream"],
@@ -50,21 +457,117 @@ async def run_quic_server():
     
     # تولید گواهی خودامضا (برای تست)
     configuration.load_cert_chain("../cert.pem", "../key.pem")
+    return configuration
+
+def setup_handler(media_root, cache_bytes, stats):
+    """Build the shared media index, cache and counters used by every connection"""
+    VideoStreamHandler.catalog = MediaCatalog(media_root)
+    VideoStreamHandler.cache = SegmentCache(cache_bytes) if cache_bytes else None
+    VideoStreamHandler.stats = stats
+    print(f"Indexed {len(VideoStreamHandler.catalog)} media files under {VideoStreamHandler.catalog.root}")
+
+async def run_quic_server(chunk_size=None, media_root='..', reload_interval=5.0, ticket_lifetime=3600,
+                          fec_group=None, cache_bytes=64 * 1024 * 1024, host='10.0.0.1', port=4433):
+    setup_handler(media_root, cache_bytes, WorkerStats())
+    configuration = create_server_configuration()
+    
+    # Session tickets for resumption / 0-RTT
+    ticket_store = SessionTicketStore(ticket_lifetime)
     
     server = await serve(
-        host='10.0.0.1',
-        port=4433,
+        host=host,
+        port=port,
         configuration=configuration,
-        create_protocol=VideoStreamHandler,
+        create_protocol=partial(VideoStreamHandler, chunk_size=chunk_size, fec_group=fec_group),
+        session_ticket_fetcher=ticket_store.get,
+        session_ticket_handler=ticket_store.add,
     )
     
-    print("Server running on 4433...")
+    print(f"Server running on {port}...")
+    if reload_interval:
+        asyncio.ensure_future(VideoStreamHandler.catalog.watch(reload_interval))
     await asyncio.Future()  # اجرای بی‌نهایت
 
+async def serve_worker(worker, channels, ticket_store, host, port, chunk_size=None, fec_group=None,
+                       reload_interval=5.0):
+    """Serve on a SO_REUSEPORT socket in this worker process until cancelled"""
+    VideoStreamHandler.stats.worker = worker
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    _, server = await loop.create_datagram_endpoint(
+        lambda: WorkerQuicServer(
+            worker=worker,
+            channels=channels,
+            stats=VideoStreamHandler.stats,
+            configuration=create_server_configuration(),
+            create_protocol=partial(VideoStreamHandler, chunk_size=chunk_size, fec_group=fec_group),
+            session_ticket_fetcher=ticket_store.get,
+            session_ticket_handler=ticket_store.add,
+        ),
+        sock=sock,
+    )
+    loop.add_reader(channels[worker][0].fileno(), server.forwarded_received)
+    print(f"Worker {worker} (pid {os.getpid()}) serving on {port}")
+    if reload_interval:
+        asyncio.ensure_future(VideoStreamHandler.catalog.watch(reload_interval))
+    await asyncio.Future()
+
+def _worker_main(worker, channels, ticket_store, host, port, options):
+    try:
+        asyncio.run(serve_worker(worker, channels, ticket_store, host, port, **options))
+    except KeyboardInterrupt:
+        pass
+
+def run_quic_workers(workers=None, media_root='..', ticket_lifetime=3600, cache_bytes=64 * 1024 * 1024,
+                     host='10.0.0.1', port=4433, **options):
+    """Run one server process per core, all bound to the same port with SO_REUSEPORT
+
+    The media index is built once before forking and inherited by every
+    worker; counters and session tickets are shared across them. Each
+    worker keeps its own segment cache. Extra options (chunk_size,
+    fec_group, reload_interval) are passed to serve_worker.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers > 256:
+        raise ValueError("At most 256 workers: the worker index is one connection ID byte")
+    context = multiprocessing.get_context('fork')
+    setup_handler(media_root, cache_bytes, WorkerStats(workers))
+    channels = []
+    for _ in range(workers):
+        receive, send = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receive.setblocking(False)
+        send.setblocking(False)
+        channels.append((receive, send))
+    
+    with context.Manager() as manager:
+        ticket_store = SessionTicketStore(ticket_lifetime, manager.dict())
+        processes = [
+            context.Process(target=_worker_main, args=(worker, channels, ticket_store, host, port, options),
+                            daemon=True)
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        # Stop the workers too when the parent is terminated
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in processes:
+                process.terminate()
+            print(f"Served: {VideoStreamHandler.stats.totals()}")
+
 if __name__ == "__main__":
     # ایجاد گواهی خودامضا اگر وجود ندارد
     # if not os.path.exists("../cert.pem") or not os.path.exists("../key.pem"):
     #     print("ایجاد گواهی خودامضا...")
     #     os.system("openssl req -x509 -newkey rsa:4096 -keyout private.key -out certificate.pem -days 365 -nodes -subj '/CN=localhost'")
     
+    # Multi-core mode: one SO_REUSEPORT worker process per CPU
+    # run_quic_workers()
     asyncio.run(run_quic_server())
\ No newline at end of file
@@ -8,7 +8,10 @@ from mininet.term import makeTerm
 
 class StreamingTopo(Topo):
 
-	def build(self):
+	def build(self, bw=10, delay=None, jitter=None, loss=None, max_queue_size=None):
+		"""bw applies to every link; delay (per direction, e.g. '20ms'),
+		jitter, loss (percent) and max_queue_size shape the client's access
+		link, which is the bottleneck"""
 		
 		# Servers
 		s1 = self.addHost('s1', ip='10.0.0.1/24')  # QUIC Server
@@ -21,9 +24,14 @@ class StreamingTopo(Topo):
 		router = self.addSwitch('r1')
 
 		# Links
-		self.addLink(s1, router, bw=10)
-		self.addLink(s2, router, bw=10)
-		self.addLink(c1, router, bw=10)
+		self.addLink(s1, router, bw=bw)
+		self.addLink(s2, router, bw=bw)
+		self.addLink(c1, router, **client_link_params(bw, delay, jitter, loss, max_queue_size))
+
+def client_link_params(bw, delay=None, jitter=None, loss=None, max_queue_size=None):
+	"""TCLink parameters for the client link, leaving out unset impairments"""
+	params = dict(bw=bw, delay=delay, jitter=jitter, loss=loss, max_queue_size=max_queue_size)
+	return {name: value for name, value in params.items() if value is not None}
 
 def run():
 	topology = StreamingTopo()
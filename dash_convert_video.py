@@ -1,26 +1,160 @@
-import subprocess
-
-def prepare_video(input_file, output_prefix):
-    # Convert video to multiple bitrates
-    bitrates = [
-        ('low', '640x360', '600k'),
-        ('medium', '854x480', '1200k'),
-        ('high', '1280x720', '2400k')
-    ]
-    
-    for name, resolution, bitrate in bitrates:
-        cmd = [
-            'ffmpeg', '-i', input_file,
-            '-c:v', 'libx264', '-crf', '22',
-            '-vf', f'scale={resolution}',
-            '-b:v', bitrate,
-            '-c:a', 'aac', '-b:a', '128k',
-            '-f', 'mp4',
-            f'{output_prefix}_{name}.mp4'
-        ]
-        subprocess.run(cmd)
-    
-    return [f'{output_prefix}_{name}.mp4' for name, _, _ in bitrates]
-
-# Example usage:
-prepare_video('sample.mp4', 'sample')
\ No newline at end of file
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dash_manifest_generator import create_dash_package, run_tool
+
+Rung = namedtuple('Rung', ['name', 'resolution', 'bitrate'])
+
+# Default encoding ladder; any list of (name, resolution, bitrate) works
+LADDER = (
+    Rung('low', '640x360', '600k'),
+    Rung('medium', '854x480', '1200k'),
+    Rung('high', '1280x720', '2400k'),
+)
+VIDEO_OPTIONS = ('-c:v', 'libx264', '-crf', '22')
+AUDIO_OPTIONS = ('-c:a', 'aac', '-b:a', '128k')
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def rung_key(source_digest, rung):
+    """Identifies an output: same source content and same encoder settings"""
+    settings = [source_digest, *rung, *VIDEO_OPTIONS, *AUDIO_OPTIONS]
+    return hashlib.sha256('\0'.join(settings).encode()).hexdigest()
+
+def encode_command(input_file, outputs):
+    """One ffmpeg run: decode once, split and scale per rung, encode every output
+
+    outputs is a list of (rung, path) pairs.
+    """
+    labels = [f'v{i}' for i in range(len(outputs))]
+    split = f"[0:v]split={len(outputs)}" + ''.join(f'[{label}in]' for label in labels)
+    scales = [f"[{label}in]scale={rung.resolution}[{label}]" for label, (rung, _) in zip(labels, outputs)]
+    cmd = ['ffmpeg', '-hide_banner', '-y', '-i', input_file,
+           '-filter_complex', ';'.join([split] + scales)]
+    for label, (rung, path) in zip(labels, outputs):
+        cmd += ['-map', f'[{label}]', '-map', '0:a?',
+                *VIDEO_OPTIONS, '-b:v', rung.bitrate,
+                *AUDIO_OPTIONS,
+                '-f', 'mp4', path]
+    return cmd
+
+def save_state(state_path, state):
+    with open(f'{state_path}.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(f'{state_path}.tmp', state_path)
+
+def prepare_video(input_file, output_prefix, ladder=LADDER):
+    """Encode input_file to every rung of the ladder, skipping up-to-date outputs
+
+    Outputs are recorded in <output_prefix>.ladder.json with the hash of the
+    source and encoder settings that produced them; a rung is re-encoded
+    only when that key changes or the output file was altered or removed.
+    Stale rungs are encoded together in a single ffmpeg pass, so the source
+    is decoded once. Returns (output_files, changed) where changed says
+    whether any output was re-encoded.
+    """
+    ladder = [Rung(*rung) for rung in ladder]
+    state_path = f'{output_prefix}.ladder.json'
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+
+    source_digest = file_digest(input_file)
+    outputs, stale = [], []
+    for rung in ladder:
+        path = f'{output_prefix}_{rung.name}.mp4'
+        outputs.append(path)
+        recorded = state.get(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if (recorded is None or st is None
+                or recorded['key'] != rung_key(source_digest, rung)
+                or recorded['size'] != st.st_size or recorded['mtime_ns'] != st.st_mtime_ns):
+            stale.append((rung, path))
+
+    # Rungs dropped from the ladder change the package even if nothing is encoded
+    dropped = [path for path in state if path not in outputs]
+    for path in dropped:
+        del state[path]
+    if not stale:
+        if dropped:
+            save_state(state_path, state)
+        print(f"{input_file}: all {len(ladder)} renditions up to date")
+        return outputs, bool(dropped)
+
+    os.makedirs(os.path.dirname(output_prefix) or '.', exist_ok=True)
+    print(f"{input_file}: encoding {', '.join(rung.name for rung, _ in stale)} in one pass")
+    # Encode to temporary names so an interrupted run never leaves a
+    # partial file that looks finished
+    partial = [(rung, f'{path}.partial') for rung, path in stale]
+    try:
+        run_tool(encode_command(input_file, partial))
+    except BaseException:
+        for _, tmp in partial:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+    for (rung, path), (_, tmp) in zip(stale, partial):
+        os.replace(tmp, path)
+        st = os.stat(path)
+        state[path] = {'key': rung_key(source_digest, rung), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    save_state(state_path, state)
+    return outputs, True
+
+def package_video(input_file, output_prefix, output_dir, ladder=LADDER, **packaging):
+    """Encode the ladder (incrementally) and package it as DASH into output_dir
+
+    Extra keyword arguments (mode, segment_duration, chunk_duration) go to
+    create_dash_package. Packaging is skipped when no rendition changed and
+    the previous run used the same inputs and options.
+    """
+    outputs, changed = prepare_video(input_file, output_prefix, ladder)
+    manifest = os.path.join(output_dir, 'manifest.mpd')
+    stamp_path = os.path.join(output_dir, '.package.json')
+    settings = {'inputs': outputs, **packaging}
+    try:
+        with open(stamp_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    if not changed and previous == settings and os.path.exists(manifest):
+        print(f"{manifest} up to date")
+        return manifest
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = create_dash_package(outputs, output_dir, **packaging)
+    save_state(stamp_path, settings)
+    return manifest
+
+def package_catalog(input_files, output_root, ladder=LADDER, jobs=None, **packaging):
+    """Package several sources concurrently, one DASH directory per source
+
+    Each source gets its own ffmpeg process, so `jobs` (default: CPU
+    count / 4, since each x264 encode is itself multi-threaded) bounds
+    how many run at once. Returns {input_file: manifest path}.
+    """
+    jobs = jobs or max(1, (os.cpu_count() or 1) // 4)
+
+    def package(input_file):
+        stem = os.path.splitext(os.path.basename(input_file))[0]
+        output_dir = os.path.join(output_root, stem)
+        return package_video(input_file, os.path.join(output_dir, stem), output_dir, ladder, **packaging)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return dict(zip(input_files, pool.map(package, input_files)))
+
+if __name__ == "__main__":
+    # Example usage:
+    package_video('sample.mp4', 'sample', 'dash_content')
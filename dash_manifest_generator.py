@@ -1,18 +1,213 @@
+import json
+import os
+import struct
 import subprocess
+import sys
+from pathlib import Path
+from urllib.parse import urljoin
 
-def create_dash_package(input_files, output_dir):
+# The MPD and MP4 box parsers are shared with the streaming clients
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'StreamingTopo'))
+from mp4_index import child_box, iter_boxes
+from mpd import fill_template, local_path, parse_mpd
+
+def run_tool(cmd):
+    """Run an external tool, raising RuntimeError with its stderr on failure"""
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        tail = '\n'.join(result.stderr.strip().splitlines()[-10:])
+        raise RuntimeError(f"{cmd[0]} exited with status {result.returncode}:\n{tail}")
+
+def create_dash_package(input_files, output_dir, mode='ondemand', segment_duration=4.0, chunk_duration=None):
+    """Package renditions as DASH into output_dir and return the MPD path
+
+    mode 'ondemand' (the default) writes one file per rendition addressed
+    with SegmentBase. mode 'cmaf' writes CMAF segments addressed with a
+    SegmentTemplate; each segment is split into moof/mdat chunks of
+    chunk_duration seconds (whole segments if None) for low-latency
+    delivery, and a segment_index.json sidecar is written next to the MPD.
+    """
+    if mode not in ('ondemand', 'cmaf'):
+        raise ValueError(f"Unknown packaging mode {mode!r}; choose 'ondemand' or 'cmaf'")
     # Create MP4Box command to generate DASH content
-    cmd = ['MP4Box', '-dash', '4000', 
-           '-profile', 'dashavc264:onDemand',
-           '-segment-name', 'segment_$RepresentationID$_',
-           '-out', f'{output_dir}/manifest.mpd']
-    
+    cmd = ['MP4Box', '-dash', str(round(segment_duration * 1000))]
+    if mode == 'ondemand':
+        cmd += ['-profile', 'dashavc264:onDemand',
+                '-segment-name', 'segment_$RepresentationID$_']
+    else:
+        if chunk_duration is not None:
+            cmd += ['-frag', str(round(chunk_duration * 1000))]
+        cmd += ['-rap', '-cmaf', 'cmf2',
+                '-profile', 'live',
+                '-segment-name', 'segment_$RepresentationID$_$Number$']
+    cmd += ['-out', f'{output_dir}/manifest.mpd']
+
     cmd.extend(input_files)
-    
-    subprocess.run(cmd)
-    
+
+    run_tool(cmd)
+
+    if mode == 'cmaf':
+        write_segment_index(f'{output_dir}/manifest.mpd')
     return f'{output_dir}/manifest.mpd'
 
-# Example usage:
-input_files = ['sample_low.mp4', 'sample_medium.mp4', 'sample_high.mp4']
-mpd_path = create_dash_package(input_files, 'dash_content')
\ No newline at end of file
+def track_info(init):
+    """Per-track [timescale, default sample duration, handler type] from an init segment's moov"""
+    moov = child_box(init, 0, len(init), b'moov')
+    if moov is None:
+        raise ValueError("Initialization segment has no moov box")
+    tracks = {}
+    for kind, _, payload, box_end in iter_boxes(init, *moov):
+        if kind == b'trak':
+            tkhd = child_box(init, payload, box_end, b'tkhd')
+            mdia = child_box(init, payload, box_end, b'mdia')
+            mdhd = child_box(init, *mdia, b'mdhd')
+            hdlr = child_box(init, *mdia, b'hdlr')
+            # Full box: version(1) flags(3), then v0 32-bit / v1 64-bit times
+            tkhd_v1 = init[tkhd[0]] == 1
+            track_id = struct.unpack_from('>I', init, tkhd[0] + (20 if tkhd_v1 else 12))[0]
+            mdhd_v1 = init[mdhd[0]] == 1
+            timescale = struct.unpack_from('>I', init, mdhd[0] + (20 if mdhd_v1 else 12))[0]
+            handler = bytes(init[hdlr[0] + 8:hdlr[0] + 12]) if hdlr else b''
+            track = tracks.setdefault(track_id, [0, 0, b''])
+            track[0], track[2] = timescale, handler
+        elif kind == b'mvex':
+            for child, _, trex, _ in iter_boxes(init, payload, box_end):
+                if child == b'trex':
+                    track_id, _, duration = struct.unpack_from('>III', init, trex + 4)
+                    tracks.setdefault(track_id, [0, 0, b''])[1] = duration
+    return tracks
+
+def traf_duration(data, traf, tracks):
+    """(track ID, duration in seconds) of one track fragment"""
+    tfhd = child_box(data, *traf, b'tfhd')
+    flags = int.from_bytes(data[tfhd[0] + 1:tfhd[0] + 4], 'big')
+    track_id = struct.unpack_from('>I', data, tfhd[0] + 4)[0]
+    timescale, default_duration, _ = tracks[track_id]
+    pos = tfhd[0] + 8
+    if flags & 0x01:  # base-data-offset
+        pos += 8
+    if flags & 0x02:  # sample-description-index
+        pos += 4
+    if flags & 0x08:
+        default_duration = struct.unpack_from('>I', data, pos)[0]
+
+    total = 0
+    for kind, _, payload, _ in iter_boxes(data, *traf):
+        if kind != b'trun':
+            continue
+        flags = int.from_bytes(data[payload + 1:payload + 4], 'big')
+        count = struct.unpack_from('>I', data, payload + 4)[0]
+        pos = payload + 8
+        if flags & 0x001:  # data-offset
+            pos += 4
+        if flags & 0x004:  # first-sample-flags
+            pos += 4
+        if not flags & 0x100:
+            total += count * default_duration
+            continue
+        # Per-sample fields, in order: duration, size, flags, composition offset
+        stride = 4 * sum(bool(flags & bit) for bit in (0x100, 0x200, 0x400, 0x800))
+        total += sum(struct.unpack_from('>I', data, pos + i * stride)[0] for i in range(count))
+    return track_id, total / timescale
+
+def fragment_duration(data, moof, tracks):
+    """Duration in seconds of one moof
+
+    A muxed fragment has one traf per track, and their durations differ
+    slightly (audio frames do not line up with video frames). The video
+    track's duration is used when the fragment has one, since segments are
+    cut on video keyframes; otherwise the longest track fragment's.
+    """
+    durations = [traf_duration(data, (payload, box_end), tracks)
+                 for kind, _, payload, box_end in iter_boxes(data, *moof) if kind == b'traf']
+    if not durations:
+        raise ValueError("Movie fragment has no traf box")
+    video = [duration for track_id, duration in durations if tracks[track_id][2] == b'vide']
+    return max(video or [duration for _, duration in durations])
+
+def fragment_index(data, tracks):
+    """[[offset, size, duration], ...] for each moof (plus its mdat) in a segment
+
+    A chunk starts at its moof, or at any styp/prft/emsg boxes just before
+    it, and ends where the next chunk starts.
+    """
+    chunks = []
+    chunk_start = None
+    for kind, start, payload, end in iter_boxes(data):
+        if end > len(data):
+            raise ValueError(f"Truncated {kind!r} box at offset {start}")
+        if chunk_start is None:
+            chunk_start = start
+        if kind == b'moof':
+            duration = fragment_duration(data, (payload, end), tracks)
+            chunks.append([chunk_start, 0, duration])
+        elif kind == b'mdat' and chunks:
+            chunks[-1][1] = end - chunks[-1][0]
+            chunk_start = None
+    return chunks
+
+def write_segment_index(mpd_path):
+    """Write segment_index.json next to a SegmentTemplate MPD
+
+    For every representation: the init segment, and every media segment's
+    URL, number, start time, duration, size and chunk byte offsets, so the
+    origins and clients never have to parse MP4 boxes at runtime. Segment
+    names come from the manifest's own template and timeline (mpd.py);
+    a segment the manifest lists but the packager did not write is an
+    error.
+    """
+    output_dir = os.path.dirname(mpd_path)
+    with open(mpd_path, 'rb') as f:
+        manifest = parse_mpd(f.read(), Path(mpd_path).resolve().as_uri())
+    representations = {}
+    for period in manifest.periods:
+        for adaptation_set in period.adaptation_sets:
+            for representation in adaptation_set.representations:
+                template = representation.segment_template
+                if template is None or not template.media:
+                    continue
+                init_name = fill_template(template.initialization, representation.id,
+                                          bandwidth=representation.bandwidth)
+                with open(local_path(urljoin(representation.url, init_name)), 'rb') as f:
+                    init = f.read()
+                tracks = track_info(init)
+
+                segments = []
+                count = template.count()
+                start = 0.0
+                k = 0
+                while count is None or k < count:
+                    number = template.start_number + k
+                    segment = template.segment(k)
+                    name = fill_template(template.media, representation.id, number=number,
+                                         bandwidth=representation.bandwidth,
+                                         time=segment[0] if segment else None)
+                    try:
+                        with open(local_path(urljoin(representation.url, name)), 'rb') as f:
+                            data = f.read()
+                    except FileNotFoundError:
+                        if count is not None:
+                            raise
+                        break  # no duration in the MPD: the last file written ends the list
+                    chunks = fragment_index(data, tracks)
+                    duration = sum(chunk[2] for chunk in chunks)
+                    segments.append({'url': name, 'number': number, 'start': round(start, 6),
+                                     'duration': round(duration, 6), 'size': len(data),
+                                     'chunks': [[offset, size, round(d, 6)] for offset, size, d in chunks]})
+                    start += duration
+                    k += 1
+                representations[representation.id] = {
+                    'bandwidth': representation.bandwidth,
+                    'init': {'url': init_name, 'size': len(init)},
+                    'segments': segments,
+                }
+
+    index_path = os.path.join(output_dir, 'segment_index.json')
+    with open(index_path, 'w') as f:
+        json.dump({'manifest': os.path.basename(mpd_path), 'representations': representations}, f, indent=1)
+    return index_path
+
+if __name__ == "__main__":
+    # Example usage:
+    input_files = ['sample_low.mp4', 'sample_medium.mp4', 'sample_high.mp4']
+    mpd_path = create_dash_package(input_files, 'dash_content')
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules under StreamingTopo/ are flat scripts that import each other by name
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'StreamingTopo'))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,74 @@
+import pytest
+from abr import (BolaRule, HybridRule, PlaybackBuffer, ThroughputEstimator, ThroughputRule,
+                 create_abr_rule)
+
+BITRATES = [1e6, 2e6, 4e6]
+
+def buffer_at(level):
+    buffer = PlaybackBuffer()
+    buffer.level = level
+    return buffer
+
+def estimator(*samples):
+    throughput = ThroughputEstimator()
+    for bitrate in samples:
+        throughput.add_sample(bitrate, 1.0)
+    return throughput
+
+def test_playback_buffer_startup_drain_and_rebuffer():
+    buffer = PlaybackBuffer(max_level=30.0, startup_level=2.0)
+    buffer.on_download(1.0, 4.0)
+    assert buffer.playing and buffer.startup_delay == 1.0 and buffer.level == 4.0
+    buffer.on_download(2.0, 4.0)
+    assert buffer.level == 6.0 and buffer.played_time == 2.0
+    buffer.on_download(10.0, 4.0)  # ran dry 4s before this segment arrived
+    assert buffer.rebuffer_time == 4.0 and buffer.rebuffer_count == 1
+    assert buffer.level == 4.0 and buffer.playing
+
+def test_playback_buffer_waits_for_room():
+    buffer = PlaybackBuffer(max_level=10.0)
+    buffer.on_download(0.5, 8.0)
+    assert buffer.wait_for_room(4.0) == 2.0
+    assert buffer.level == 6.0
+    assert buffer.wait_for_room(4.0) == 0.0
+
+def test_throughput_estimates():
+    throughput = estimator(1e6, 4e6)
+    assert throughput.harmonic_mean() == pytest.approx(1.6e6)
+    assert estimator(3e6).ewma() == pytest.approx(3e6)  # bias-corrected from the first sample
+    assert ThroughputEstimator().ewma() == 0.0
+    many = estimator(*[1e6] * 10, 8e6)
+    assert len(many.samples) == many.window
+
+def test_throughput_rule():
+    rule = ThroughputRule(safety=0.9, start_index=1)
+    assert rule.select(BITRATES, buffer_at(0), ThroughputEstimator(), 4.0) == 1
+    assert rule.select(BITRATES, buffer_at(0), estimator(2.1e6), 4.0) == 0  # 2e6 > 0.9 * 2.1e6
+    assert rule.select(BITRATES, buffer_at(0), estimator(2.3e6), 4.0) == 1
+    assert rule.select(BITRATES, buffer_at(0), estimator(50e6), 4.0) == 2
+
+def test_bola_follows_buffer_level():
+    rule = BolaRule(min_buffer=10.0, buffer_target=30.0)
+    choices = [rule.select(BITRATES, buffer_at(level), ThroughputEstimator(), 4.0)
+               for level in (0, 10, 20, 30)]
+    assert choices[0] == 0 and choices[-1] == 2
+    assert choices == sorted(choices)
+    assert rule.select([1e6], buffer_at(30), ThroughputEstimator(), 4.0) == 0
+
+def test_hybrid_switches_with_hysteresis():
+    rule = HybridRule(bola_threshold=10.0, throughput_threshold=6.0)
+    slow = estimator(1.2e6)
+    assert rule.select(BITRATES, buffer_at(8), slow, 4.0) == 0
+    assert not rule.using_bola
+    # Full buffer: BOLA mode, but at most one step above the throughput choice
+    assert rule.select(BITRATES, buffer_at(30), slow, 4.0) == 1
+    assert rule.using_bola
+    rule.select(BITRATES, buffer_at(8), slow, 4.0)
+    assert rule.using_bola
+    rule.select(BITRATES, buffer_at(5), slow, 4.0)
+    assert not rule.using_bola
+
+def test_create_abr_rule():
+    assert isinstance(create_abr_rule('bola', min_buffer=5.0), BolaRule)
+    with pytest.raises(ValueError):
+        create_abr_rule('fastest')
@@ -0,0 +1,107 @@
+import json
+import os
+import pytest
+from abr_sim import AbrSimulator, main, SimulatedLink, ThroughputTrace, load_trace, representation_media
+from mpd import parse_mpd
+
+CONTENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dash_content')
+
+TEMPLATE_MPD = '''<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT6S">
+  <Period>
+    <AdaptationSet mimeType="video/mp4">
+      <SegmentTemplate media="$RepresentationID$/$Number$.m4s" initialization="$RepresentationID$/init.mp4"
+                       timescale="1000" duration="2000"/>
+      <Representation id="low" bandwidth="1000000"/>
+      <Representation id="high" bandwidth="4000000"/>
+    </AdaptationSet>
+  </Period>
+</MPD>'''
+
+def constant(mbps):
+    return ThroughputTrace([(0, mbps), (1, mbps)])
+
+@pytest.fixture
+def template_content(tmp_path):
+    for rep, scale in (('low', 1), ('high', 4)):
+        os.mkdir(tmp_path / rep)
+        (tmp_path / rep / 'init.mp4').write_bytes(bytes(100))
+        for number in (1, 2, 3):
+            (tmp_path / rep / f'{number}.m4s').write_bytes(bytes(250000 * scale))
+    (tmp_path / 'manifest.mpd').write_text(TEMPLATE_MPD)
+    return tmp_path
+
+def test_load_trace_formats(tmp_path):
+    cooked = tmp_path / 'cooked.txt'
+    cooked.write_text('time,mbps\n0,1.5\n# outage\n2,0\n1,3\n')
+    assert load_trace(cooked) == [(0, 1.5), (1, 3), (2, 0)]
+    raw = tmp_path / 'raw.log'
+    raw.write_text('1 2 3 4 125000 1000\n1 2 3 4 250000 500\n')
+    assert load_trace(raw) == [(0.0, 1.0), (1.0, 4.0)]
+    empty = tmp_path / 'empty.txt'
+    empty.write_text('header only\n')
+    with pytest.raises(ValueError):
+        load_trace(empty)
+
+def test_throughput_trace_loops():
+    trace = ThroughputTrace([(10, 8), (12, 16)])
+    assert trace.period == 4
+    assert trace.rate(1) == (1e6, 2)
+    assert trace.rate(3) == (2e6, 4)
+    assert trace.rate(5) == (1e6, 6)
+    with pytest.raises(ValueError):
+        ThroughputTrace([(0, 0), (1, 0)])
+
+def test_link_shares_capacity_after_one_rtt():
+    completed = []
+    link = SimulatedLink(constant(8), rtt=0.1, on_complete=lambda *args: completed.append(args))
+    assert link.wait(link.start(1e6)) == pytest.approx(1.1)
+    first, second = link.start(1e6), link.start(1e6)
+    assert link.wait(second) == pytest.approx(2.1)
+    assert [key for key, *_ in completed] == [1, first, second]
+    assert link.bytes_delivered == 3e6
+
+def test_cancelled_transfer_frees_capacity():
+    link = SimulatedLink(constant(8), rtt=0.0)
+    dropped, kept = link.start(1e6), link.start(1e6)
+    link.advance(0.5)
+    link.cancel(dropped)
+    assert link.wait(kept) == pytest.approx(1.25)  # 0.25 MB at half rate, then 0.75 MB at full
+    assert not link.done(dropped)
+
+def test_representation_media_from_segment_files(template_content):
+    manifest = parse_mpd((template_content / 'manifest.mpd').read_bytes(),
+                         (template_content / 'manifest.mpd').as_uri())
+    low = representation_media(manifest.ladder[0], str(template_content))
+    assert low.startup_bytes == 100
+    assert low.sizes == [250000] * 3 and low.durations == [2.0] * 3
+    # A packager-written index takes precedence over the file sizes
+    (template_content / 'segment_index.json').write_text(json.dumps({'representations': {'low': {
+        'init': {'size': 50}, 'segments': [{'size': 10, 'duration': 1.5}]}}}))
+    assert representation_media(manifest.ladder[0], str(template_content)) == (50, [10], [1.5])
+
+def test_simulator_on_template_content(template_content):
+    simulator = AbrSimulator(template_content / 'manifest.mpd')
+    fast = simulator.run(constant(100), 'throughput', prefetch=1)
+    assert fast['rebuffer_time'] == 0
+    assert fast['bytes'] >= 100 + 3 * 250000
+    slow = simulator.run(constant(0.5), 'throughput', prefetch=1)
+    assert slow['average_bitrate'] == 1000000
+    assert slow['rebuffer_time'] > 0
+
+@pytest.mark.parametrize('abr', ['throughput', 'bola', 'hybrid'])
+def test_simulator_on_sample_content(abr):
+    simulator = AbrSimulator(os.path.join(CONTENT, 'manifest.mpd'))
+    assert simulator.segment_count == 4
+    stats = simulator.run(constant(50), abr)
+    assert stats['rebuffer_time'] == 0
+    assert stats['simulated_time'] > 0
+    assert min(simulator.manifest.bitrates) <= stats['average_bitrate'] <= max(simulator.manifest.bitrates)
+
+def test_main_takes_options_per_rule(tmp_path):
+    trace = tmp_path / 'trace.txt'
+    trace.write_text('0 2\n1 0.5\n')
+    manifest = os.path.join(CONTENT, 'manifest.mpd')
+    rows = main([str(trace), '--manifest', manifest, '--abr-options', '{"bola": {"min_buffer": 5}}'])
+    assert [row['abr'] for row in rows] == ['throughput', 'bola', 'hybrid']
+    with pytest.raises(SystemExit):
+        main([str(trace), '--manifest', manifest, '--abr-options', '{"min_buffer": 5}'])
@@ -0,0 +1,42 @@
+import pytest
+from dash_server import requested_range
+from media_store import parse_byte_range
+from quic_client import format_byte_range
+
+@pytest.mark.parametrize('spec, expected', [
+    ('0-99', (0, 100)),
+    ('100-199', (100, 200)),
+    ('900-5000', (900, 1000)),   # end clamped to the file
+    ('990-', (990, 1000)),
+    ('-10', (990, 1000)),
+    ('-5000', (0, 1000)),
+    (b'0-0', (0, 1)),
+    (' 5-9 ', (5, 10)),
+])
+def test_parse_byte_range(spec, expected):
+    assert parse_byte_range(spec, 1000) == expected
+
+@pytest.mark.parametrize('spec', ['1000-', '1000-1200', '50-10', '-0'])
+def test_parse_byte_range_unsatisfiable(spec):
+    assert parse_byte_range(spec, 1000) is None
+
+@pytest.mark.parametrize('spec', ['', '-', '10', 'a-b', '1-x'])
+def test_parse_byte_range_malformed(spec):
+    with pytest.raises(ValueError):
+        parse_byte_range(spec, 1000)
+
+def test_requested_range():
+    assert requested_range('bytes=0-499', 1000) == (0, 500)
+    assert requested_range('bytes=-100', 1000) == (900, 1000)
+    assert requested_range('bytes=2000-', 1000) is False
+
+@pytest.mark.parametrize('header', ['items=0-10', 'bytes=0-10,20-30', 'bytes=x-y'])
+def test_requested_range_ignored(header):
+    assert requested_range(header, 1000) is None
+
+def test_format_byte_range():
+    assert format_byte_range(None) is None
+    assert format_byte_range((0, 99)) == '0-99'
+    assert format_byte_range((100, None)) == '100-'
+    assert format_byte_range((None, 50)) == '-50'
+    assert format_byte_range(b'1576-1655') == '1576-1655'
@@ -0,0 +1,55 @@
+import os
+import threading
+import pytest
+import requests
+from abr import ThroughputRule
+from dash_client import DashVideoDownloader
+from dash_server import DashOriginServer
+
+CONTENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dash_content')
+
+@pytest.fixture
+def origin():
+    server = DashOriginServer(('127.0.0.1', 0), CONTENT, reload_interval=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/manifest.mpd'
+    server.shutdown()
+    server.server_close()
+
+def failing_index_requests(downloader, name, failures=1):
+    """Make the first `failures` sidx/init requests for `name` fail like a dropped connection"""
+    real_get = downloader.session.get
+    failed = []
+
+    def get(url, headers=None, **kwargs):
+        if name in url and (headers or {}).get('Range', '').startswith('bytes=0-') and len(failed) < failures:
+            failed.append(url)
+            raise requests.ConnectionError("connection reset")
+        return real_get(url, headers=headers, **kwargs)
+
+    downloader.session.get = get
+    return failed
+
+def test_download_video(origin, tmp_path):
+    downloader = DashVideoDownloader(origin, abr='throughput')
+    assert downloader.download_video(str(tmp_path / 'out.mp4'))
+    assert len(downloader.played_bitrates) == 4
+    assert downloader.buffer.rebuffer_count == 0
+    assert os.path.getsize(tmp_path / 'out.mp4') > 0
+
+def test_index_fetch_failure_retries_at_lower_quality(origin, tmp_path):
+    downloader = DashVideoDownloader(origin, abr=ThroughputRule(start_index=2), retry_backoff=0.01)
+    failed = failing_index_requests(downloader, 'segment_3_')
+    assert downloader.download_video(str(tmp_path / 'out.mp4'))
+    assert failed
+    bitrates = downloader.manifest.bitrates
+    assert downloader.played_bitrates[0] == bitrates[1]
+    assert len(downloader.played_bitrates) == 4
+
+def test_index_fetch_failures_give_up_after_max_retries(origin, tmp_path):
+    downloader = DashVideoDownloader(origin, abr=ThroughputRule(start_index=0), retry_backoff=0.01,
+                                     max_retries=2)
+    failing_index_requests(downloader, 'segment_1_', failures=10)
+    assert downloader.download_video(str(tmp_path / 'out.mp4'))
+    assert downloader.played_bitrates == []
@@ -0,0 +1,132 @@
+import json
+import struct
+import pytest
+from dash_manifest_generator import (fragment_duration, fragment_index, track_info, traf_duration,
+                                     write_segment_index)
+from mp4_index import child_box
+
+def box(kind, payload):
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+def full_box(kind, version, flags, payload):
+    return box(kind, bytes([version]) + flags.to_bytes(3, 'big') + payload)
+
+def trak(track_id, timescale, handler, version=0):
+    width = 8 if version else 4  # creation/modification time and duration fields
+    tkhd = full_box(b'tkhd', version, 3, bytes(2 * width) + struct.pack('>I', track_id) + bytes(4 + width))
+    mdhd = full_box(b'mdhd', version, 0, bytes(2 * width) + struct.pack('>I', timescale) + bytes(width + 4))
+    hdlr = full_box(b'hdlr', 0, 0, bytes(4) + handler + bytes(12) + b'\0')
+    return box(b'trak', tkhd + box(b'mdia', mdhd + hdlr))
+
+def trex(track_id, default_duration):
+    return full_box(b'trex', 0, 0, struct.pack('>IIIII', track_id, 1, default_duration, 0, 0))
+
+def init_segment():
+    """Video (v0 mdhd, 90 kHz, 3000 per sample) and audio (v1 mdhd, 48 kHz, 1024 per sample)"""
+    moov = box(b'moov', full_box(b'mvhd', 0, 0, bytes(96)) + trak(1, 90000, b'vide')
+               + trak(2, 48000, b'soun', version=1)
+               + box(b'mvex', trex(1, 3000) + trex(2, 1024)))
+    return box(b'ftyp', b'iso6' + bytes(4)) + moov
+
+def tfhd(track_id, default_duration=None, base_offset=False, description_index=False):
+    flags, fields = 0x020000, b''
+    if base_offset:
+        flags |= 0x01
+        fields += struct.pack('>Q', 0)
+    if description_index:
+        flags |= 0x02
+        fields += struct.pack('>I', 1)
+    if default_duration is not None:
+        flags |= 0x08
+        fields += struct.pack('>I', default_duration)
+    return full_box(b'tfhd', 0, flags, struct.pack('>I', track_id) + fields)
+
+def trun(count, durations=None, sizes=True):
+    """A trun with data offset and first-sample flags; per-sample durations if given"""
+    flags = 0x001 | 0x004 | (0x200 if sizes else 0)
+    if durations is not None:
+        flags |= 0x100
+    samples = b''
+    for i in range(count):
+        if durations is not None:
+            samples += struct.pack('>I', durations[i])
+        if sizes:
+            samples += struct.pack('>I', 100)
+    return full_box(b'trun', 0, flags, struct.pack('>IiI', count, 0, 0) + samples)
+
+def traf(*children):
+    return box(b'traf', b''.join(children))
+
+def moof(*trafs):
+    return box(b'moof', full_box(b'mfhd', 0, 0, struct.pack('>I', 1)) + b''.join(trafs))
+
+def payload_range(data, kind):
+    return child_box(data, 0, len(data), kind)
+
+@pytest.fixture
+def tracks():
+    return track_info(init_segment())
+
+def test_track_info_reads_v0_and_v1_mdhd(tracks):
+    assert tracks == {1: [90000, 3000, b'vide'], 2: [48000, 1024, b'soun']}
+
+def test_track_info_requires_moov():
+    with pytest.raises(ValueError):
+        track_info(box(b'ftyp', b'iso6'))
+
+def test_traf_duration_falls_back_to_trex(tracks):
+    data = traf(tfhd(1), trun(30))
+    assert traf_duration(data, payload_range(data, b'traf'), tracks) == (1, 1.0)
+
+def test_traf_duration_uses_tfhd_default(tracks):
+    data = traf(tfhd(1, default_duration=1500, base_offset=True, description_index=True), trun(30), trun(30))
+    assert traf_duration(data, payload_range(data, b'traf'), tracks) == (1, 1.0)
+
+def test_traf_duration_sums_per_sample_durations(tracks):
+    data = traf(tfhd(2, default_duration=1), trun(3, durations=[1024, 2048, 1024]),
+                trun(2, durations=[24000, 24000], sizes=False))
+    assert traf_duration(data, payload_range(data, b'traf'), tracks) == (2, 1.0 + 4096 / 48000)
+
+def test_fragment_duration_prefers_video(tracks):
+    muxed = moof(traf(tfhd(1), trun(60)), traf(tfhd(2), trun(100)))  # 2.0s video, ~2.13s audio
+    assert fragment_duration(muxed, payload_range(muxed, b'moof'), tracks) == 2.0
+    audio = moof(traf(tfhd(2), trun(47)), traf(tfhd(2), trun(94)))
+    assert fragment_duration(audio, payload_range(audio, b'moof'), tracks) == pytest.approx(94 * 1024 / 48000)
+
+def test_fragment_index_groups_chunks(tracks):
+    first = box(b'styp', b'msdh') + moof(traf(tfhd(1), trun(30))) + box(b'mdat', bytes(50))
+    second = moof(traf(tfhd(1), trun(15))) + box(b'mdat', bytes(20))
+    chunks = fragment_index(first + second, tracks)
+    assert chunks == [[0, len(first), 1.0], [len(first), len(second), 0.5]]
+    with pytest.raises(ValueError):
+        fragment_index(first + second[:-5], tracks)
+
+def test_write_segment_index(tmp_path):
+    (tmp_path / 'v1').mkdir()
+    (tmp_path / 'v1' / 'init.mp4').write_bytes(init_segment())
+    segments = []
+    for number, samples in ((1, 60), (2, 30)):
+        data = moof(traf(tfhd(1), trun(samples))) + box(b'mdat', bytes(samples))
+        (tmp_path / 'v1' / f'seg_{number:03d}.m4s').write_bytes(data)
+        segments.append(data)
+    (tmp_path / 'manifest.mpd').write_text('''<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" mediaPresentationDuration="PT3S">
+  <Period>
+    <AdaptationSet mimeType="video/mp4">
+      <SegmentTemplate media="$RepresentationID$/seg_$Number%03d$.m4s" initialization="$RepresentationID$/init.mp4"
+                       timescale="1000" duration="2000"/>
+      <Representation id="v1" bandwidth="500000"/>
+    </AdaptationSet>
+  </Period>
+</MPD>''')
+    index_path = write_segment_index(str(tmp_path / 'manifest.mpd'))
+    with open(index_path) as f:
+        index = json.load(f)
+    entry = index['representations']['v1']
+    assert entry['init'] == {'url': 'v1/init.mp4', 'size': len(init_segment())}
+    assert [(s['url'], s['start'], s['duration'], s['size']) for s in entry['segments']] == [
+        ('v1/seg_001.m4s', 0.0, 2.0, len(segments[0])), ('v1/seg_002.m4s', 2.0, 1.0, len(segments[1]))]
+    assert entry['segments'][1]['chunks'] == [[0, len(segments[1]), 1.0]]
+    # A segment the manifest lists but that is missing on disk is an error
+    (tmp_path / 'v1' / 'seg_002.m4s').unlink()
+    with pytest.raises(FileNotFoundError):
+        write_segment_index(str(tmp_path / 'manifest.mpd'))
@@ -0,0 +1,116 @@
+import asyncio
+import os
+from datagram_media import (FLAG_DATA, FLAG_PARITY, FLAG_RETRANSMIT, JitterBuffer, pack_datagram,
+                            unpack_datagram, xor_payloads)
+from quic_server import PAYLOAD_SIZE, DatagramSend, VideoStreamHandler
+
+PAYLOAD = 16
+
+def make_buffer(data, fec_group=0, delay=0.05, retransmit=False):
+    delivered, nacks = [], []
+    packets = -(-len(data) // PAYLOAD)
+    buffer = JitterBuffer(packets, len(data), PAYLOAD, fec_group, delay, delivered.append,
+                          nacks.append if retransmit else None)
+    return buffer, delivered, nacks
+
+def chunks(data):
+    return [data[i:i + PAYLOAD] for i in range(0, len(data), PAYLOAD)]
+
+def test_pack_round_trip():
+    packet = pack_datagram(4, 7, FLAG_PARITY, 2 ** 33 + 5, b'payload')
+    assert unpack_datagram(packet) == (4, 7, FLAG_PARITY, 5, b'payload')
+
+def test_xor_payloads_pads_short_members():
+    parity = xor_payloads([b'\x01\x02\x03', b'\x10'], 4)
+    assert parity == b'\x11\x02\x03\x00'
+    # XOR of the parity with the other members gives back the missing one
+    assert xor_payloads([parity, b'\x10'], 4)[:3] == b'\x01\x02\x03'
+
+def test_reordered_packets_are_released_in_sequence():
+    data = os.urandom(40)
+    buffer, delivered, _ = make_buffer(data)
+    parts = chunks(data)
+    buffer.add(2, FLAG_DATA, parts[2], 0, 0.0)
+    buffer.add(1, FLAG_DATA, parts[1], 0, 0.0)
+    assert buffer.poll(0.0) == 0.05  # packet 0 is overdue, wait for it
+    buffer.add(0, FLAG_DATA, parts[0], 0, 0.01)
+    assert buffer.poll(0.01) is None
+    assert b''.join(delivered) == data
+    assert buffer.finished
+    buffer.add(1, FLAG_DATA, parts[1], 0, 0.02)
+    assert buffer.stats.duplicates == 1
+
+def test_fec_recovers_one_loss_per_group():
+    data = os.urandom(60)  # 4 packets, the last one 12 bytes
+    buffer, delivered, _ = make_buffer(data, fec_group=4)
+    parts = chunks(data)
+    for seq in (0, 1, 2):
+        buffer.add(seq, FLAG_DATA, parts[seq], 0, 0.0)
+    buffer.add(0, FLAG_PARITY, xor_payloads(parts, PAYLOAD), 0, 0.0)
+    buffer.end()
+    assert buffer.poll(0.0) is None
+    assert b''.join(delivered) == data
+    assert buffer.stats.recovered_fec == 1
+    assert buffer.stats.lost == 0
+
+def test_missing_packet_is_nacked_once_then_recovered():
+    data = os.urandom(48)
+    buffer, delivered, nacks = make_buffer(data, retransmit=True)
+    parts = chunks(data)
+    buffer.add(0, FLAG_DATA, parts[0], 0, 0.0)
+    buffer.add(2, FLAG_DATA, parts[2], 0, 0.0)
+    assert buffer.poll(0.0) == 0.05
+    assert nacks == []
+    assert buffer.poll(0.05) == 0.1
+    assert nacks == [[1]]
+    buffer.add(1, FLAG_RETRANSMIT, parts[1], 0, 0.07)
+    assert buffer.poll(0.07) is None
+    assert b''.join(delivered) == data
+    assert buffer.stats.retransmit_requested == 1
+    assert buffer.stats.recovered_retransmit == 1
+
+def test_unrecovered_loss_becomes_zero_filled_gap():
+    data = os.urandom(40)
+    buffer, delivered, nacks = make_buffer(data, retransmit=True)
+    parts = chunks(data)
+    buffer.add(0, FLAG_DATA, parts[0], 0, 0.0)
+    buffer.add(1, FLAG_DATA, parts[1], 0, 0.0)
+    buffer.end()  # the 8-byte tail packet never arrives
+    assert buffer.poll(0.0) == 0.05
+    assert buffer.poll(0.05) == 0.1
+    assert nacks == [[2]]
+    assert buffer.poll(0.1) is None
+    assert b''.join(delivered) == data[:32] + bytes(8)
+    assert buffer.stats.lost == 1
+    assert buffer.finished
+
+class FakeConnection:
+    """Just enough of VideoStreamHandler for handle_datagram_control"""
+    def __init__(self, stream_id, send):
+        self.sent = []
+        self.ended = []
+        self._datagram_sends = {stream_id: send}
+        self._quic = self
+
+    async def send_datagram(self, packet):
+        self.sent.append(unpack_datagram(packet)[1:3])
+        return True
+
+    def send_stream_data(self, stream_id, data, end_stream=False):
+        self.ended.append((stream_id, data, end_stream))
+
+    def transmit(self):
+        pass
+
+def test_control_lines_split_across_frames():
+    async def scenario():
+        send = DatagramSend(memoryview(bytes(3 * PAYLOAD_SIZE)), 0.0, 3)
+        connection = FakeConnection(8, send)
+        for frame in (b'NACK 0,', b'2\nNACK x\nNACK 1,9\nDO', b'NE\nNACK 1\n'):
+            await VideoStreamHandler.handle_datagram_control(connection, 8, send, frame)
+        return connection, send
+
+    connection, send = asyncio.run(scenario())
+    assert connection.sent == [(0, FLAG_RETRANSMIT), (2, FLAG_RETRANSMIT), (1, FLAG_RETRANSMIT)]
+    assert connection.ended == [(8, b'', True)]
+    assert send.done and connection._datagram_sends == {}
@@ -0,0 +1,72 @@
+import os
+import struct
+import pytest
+from mp4_index import child_box, find_box, iter_boxes, parse_sidx
+from mpd import parse_mpd
+
+CONTENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dash_content')
+
+def box(kind, payload):
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+def sidx(references, version=0, timescale=1000, earliest=0, first_offset=0):
+    """references: (size, duration) of each media subsegment"""
+    body = struct.pack('>B3xII', version, 1, timescale)
+    body += struct.pack('>II' if version == 0 else '>QQ', earliest, first_offset)
+    body += struct.pack('>HH', 0, len(references))
+    for size, duration in references:
+        body += struct.pack('>III', size, duration, 0x90000000)
+    return box(b'sidx', body)
+
+def test_iter_boxes_and_child_box():
+    moof = box(b'moof', box(b'mfhd', bytes(8)) + box(b'traf', bytes(4)))
+    data = box(b'ftyp', b'isom') + moof + box(b'mdat', bytes(20))
+    assert [kind for kind, *_ in iter_boxes(data)] == [b'ftyp', b'moof', b'mdat']
+    assert find_box(data, b'mdat') == len(data) - 28
+    assert find_box(data, b'sidx') == -1
+    _, start, payload, end = list(iter_boxes(data))[1]
+    assert child_box(data, payload, end, b'traf') == (end - 4, end)
+    assert child_box(data, payload, end, b'tfdt') is None
+
+def test_iter_boxes_large_size_and_truncated_tail():
+    large = struct.pack('>I4sQ', 1, b'mdat', 20) + bytes(4)
+    kinds = list(iter_boxes(large + box(b'free', b'')))
+    assert kinds[0] == (b'mdat', 0, 16, 20) and kinds[1][0] == b'free'
+    # Only the head of the file: the last box overruns, and iteration stops there
+    head = box(b'ftyp', b'isom') + struct.pack('>I4s', 1000, b'moov')
+    assert [kind for kind, *_ in iter_boxes(head)] == [b'ftyp', b'moov']
+    with pytest.raises(ValueError):
+        list(iter_boxes(struct.pack('>I4s', 4, b'bad!')))
+
+@pytest.mark.parametrize('version', [0, 1])
+def test_parse_sidx(version):
+    data = sidx([(1000, 3000), (500, 2500)], version=version, earliest=600, first_offset=10)
+    index = parse_sidx(data, file_offset=200)
+    assert len(index) == 2
+    first = 200 + len(data) + 10
+    assert index.byte_range(0) == (first, first + 999)
+    assert index.byte_range(1) == (first + 1000, first + 1499)
+    assert index.duration(1) == 2.5
+    assert index.start_time(1) == 3.6
+
+def test_parse_sidx_rejects_bad_input():
+    with pytest.raises(ValueError):
+        parse_sidx(box(b'moof', bytes(32)))
+    with pytest.raises(ValueError):
+        parse_sidx(sidx([(1000, 3000)])[:-4])
+    with pytest.raises(ValueError):
+        parse_sidx(sidx([(0x80000000 | 100, 3000)]))
+
+def test_sidx_of_sample_content():
+    with open(os.path.join(CONTENT, 'manifest.mpd'), 'rb') as f:
+        manifest = parse_mpd(f.read())
+    rep = manifest.ladder[0]
+    first, last = rep.segment_base.index_range
+    with open(os.path.join(CONTENT, rep.base_url), 'rb') as f:
+        head = f.read(last + 1)
+    offset = find_box(head, b'sidx', first)
+    index = parse_sidx(memoryview(head)[offset:], offset)
+    assert len(index)
+    assert index.byte_range(len(index) - 1)[1] + 1 == os.path.getsize(os.path.join(CONTENT, rep.base_url))
+    total = sum(index.duration(n) for n in range(len(index)))
+    assert total == pytest.approx(manifest.duration, abs=1.0)  # audio runs a little longer
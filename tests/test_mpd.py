@@ -0,0 +1,76 @@
+import os
+import pytest
+from mpd import parse_datetime, parse_iso_duration, parse_mpd, parse_range_attribute
+
+CONTENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dash_content')
+
+MULTI_PERIOD = b'''<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT1M"
+     minBufferTime="PT2S" maxSegmentDuration="PT4S">
+  <BaseURL>http://cdn.example/vod/</BaseURL>
+  <Period id="intro" duration="PT10S">
+    <AdaptationSet mimeType="video/mp4" codecs="avc1.64001F">
+      <BaseURL>intro/</BaseURL>
+      <Representation id="hi" bandwidth="3000000" width="1280" height="720">
+        <BaseURL>hi.mp4</BaseURL>
+        <SegmentBase indexRange="800-899"><Initialization range="0-799"/></SegmentBase>
+      </Representation>
+      <Representation id="lo" bandwidth="500000" width="640" height="360">
+        <BaseURL>lo.mp4</BaseURL>
+      </Representation>
+    </AdaptationSet>
+    <AdaptationSet mimeType="audio/mp4" lang="en">
+      <Representation id="aac" bandwidth="128000"><BaseURL>aac.mp4</BaseURL></Representation>
+    </AdaptationSet>
+  </Period>
+  <Period id="main">
+    <AdaptationSet contentType="video">
+      <Representation id="mid" mimeType="video/mp4" bandwidth="1000000"><BaseURL>main/mid.mp4</BaseURL></Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>'''
+
+def test_parse_iso_duration():
+    assert parse_iso_duration('PT0H0M30.528S') == pytest.approx(30.528)
+    assert parse_iso_duration('P1DT1H') == 90000
+    assert parse_iso_duration('PT1.5M') == 90
+    assert parse_iso_duration('30s') is None
+    assert parse_iso_duration(None) is None
+
+def test_parse_datetime_and_range():
+    assert parse_datetime('1970-01-01T00:01:00Z') == 60
+    assert parse_datetime('1970-01-01T00:01:00') == 60  # UTC when no zone is given
+    assert parse_range_attribute('1576-1655') == (1576, 1655)
+    assert parse_range_attribute('1576-') is None
+
+def test_sample_manifest():
+    with open(os.path.join(CONTENT, 'manifest.mpd'), 'rb') as f:
+        manifest = parse_mpd(f.read(), 'http://10.0.0.1:8080/manifest.mpd')
+    assert manifest.type == 'static'
+    assert manifest.duration == pytest.approx(30.528)
+    assert manifest.max_segment_duration == pytest.approx(8.334)
+    assert [rep.id for rep in manifest.ladder] == ['1', '2', '3']
+    assert list(manifest.bitrates) == sorted(manifest.bitrates)
+    rep = manifest.ladder[0]
+    assert rep.url == 'http://10.0.0.1:8080/segment_1_.mp4'
+    assert rep.segment_base.index_range == (1576, 1655)
+    assert rep.segment_base.index_range_exact
+    assert rep.segment_base.initialization == (0, 1499)
+    adaptation_set = manifest.periods[0].adaptation_sets[0]
+    assert adaptation_set.is_video and adaptation_set.content_type == 'video'
+
+def test_base_urls_inheritance_and_periods():
+    manifest = parse_mpd(MULTI_PERIOD, 'http://origin/manifest.mpd')
+    intro, main = manifest.periods
+    assert (intro.start, intro.duration) == (0.0, 10.0)
+    assert (main.start, main.duration) == (10.0, 50.0)
+    video, audio = intro.adaptation_sets
+    assert video.is_video and not audio.is_video
+    hi = video.representations[0]
+    assert hi.url == 'http://cdn.example/vod/intro/hi.mp4'
+    assert hi.mime_type == 'video/mp4' and hi.codecs == 'avc1.64001F'
+    assert video.representations[1].segment_base is None
+    # The ladder spans every period's video, lowest bandwidth first; audio is left out
+    assert [rep.id for rep in manifest.ladder] == ['lo', 'mid', 'hi']
+    assert manifest.ladder[1].url == 'http://cdn.example/vod/main/mid.mp4'
+    assert manifest.bitrates == (500000, 1000000, 3000000)
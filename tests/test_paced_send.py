@@ -0,0 +1,39 @@
+import asyncio
+from quic_server import PacedStreamProtocol
+
+class FakeProtocol:
+    """Just enough of PacedStreamProtocol for send_paced"""
+    chunk_size = 10
+
+    def __init__(self, cancel_after=None):
+        self.sent = []
+        self.cancel_after = cancel_after
+        self._closed = asyncio.Event()
+        self._send_window_open = asyncio.Event()
+        self._cancelled_streams = set()
+
+    def available_send_window(self, stream_id):
+        return 100
+
+    def send(self, stream_id, data, end_stream=False):
+        self.sent.append((bytes(data), end_stream))
+        if len(self.sent) == self.cancel_after:
+            self._cancelled_streams.add(stream_id)
+
+    def transmit(self):
+        pass
+
+def send_paced(protocol, data):
+    return asyncio.run(PacedStreamProtocol.send_paced(protocol, 0, memoryview(data), send=protocol.send))
+
+def test_send_paced_sends_in_chunks():
+    protocol = FakeProtocol()
+    assert send_paced(protocol, bytes(25)) is True
+    assert [len(data) for data, _ in protocol.sent] == [10, 10, 5, 0]
+    assert protocol.sent[-1] == (b'', True)
+
+def test_send_paced_stops_on_cancelled_stream():
+    protocol = FakeProtocol(cancel_after=1)
+    assert send_paced(protocol, bytes(25)) is False
+    assert protocol.sent == [(bytes(10), False)]
+    assert protocol._cancelled_streams == set()
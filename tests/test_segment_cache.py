@@ -0,0 +1,54 @@
+from media_store import SegmentCache
+
+class Loader:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, start, stop):
+        self.calls.append((start, stop))
+        return bytes(stop - start)
+
+def test_hit_after_miss():
+    cache, load = SegmentCache(max_bytes=1000), Loader()
+    assert cache.get('a.mp4', 1, 0, 100, load) == bytes(100)
+    assert cache.get('a.mp4', 1, 0, 100, load) == bytes(100)
+    assert load.calls == [(0, 100)]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+    assert stats['bytes'] == 100
+
+def test_new_version_misses():
+    cache, load = SegmentCache(max_bytes=1000), Loader()
+    cache.get('a.mp4', 1, 0, 100, load)
+    cache.get('a.mp4', 2, 0, 100, load)
+    assert len(load.calls) == 2
+
+def test_least_recently_used_is_evicted_first():
+    cache, load = SegmentCache(max_bytes=300, max_item_bytes=100), Loader()
+    for start in (0, 100, 200):
+        cache.get('a.mp4', 1, start, start + 100, load)
+    cache.get('a.mp4', 1, 0, 100, load)  # touch the oldest
+    cache.get('a.mp4', 1, 300, 400, load)  # evicts 100-200
+    assert cache.evictions == 1 and cache.size == 300
+    load.calls.clear()
+    cache.get('a.mp4', 1, 0, 100, load)
+    cache.get('a.mp4', 1, 200, 300, load)
+    assert load.calls == []
+    cache.get('a.mp4', 1, 100, 200, load)
+    assert load.calls == [(100, 200)]
+
+def test_large_ranges_bypass_the_cache():
+    cache, load = SegmentCache(max_bytes=800), Loader()
+    assert cache.max_item_bytes == 100
+    cache.get('a.mp4', 1, 0, 101, load)
+    cache.get('a.mp4', 1, 0, 101, load)
+    assert len(load.calls) == 2
+    assert cache.size == 0 and cache.stats()['items'] == 0
+
+def test_clear():
+    cache, load = SegmentCache(max_bytes=1000), Loader()
+    cache.get('a.mp4', 1, 0, 100, load)
+    cache.clear()
+    assert cache.size == 0
+    cache.get('a.mp4', 1, 0, 100, load)
+    assert len(load.calls) == 2
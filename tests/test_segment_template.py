@@ -0,0 +1,82 @@
+import pytest
+from mpd import fill_template, parse_mpd
+
+def manifest(template, period='duration="PT20S"', root='type="static"'):
+    return parse_mpd(f'''<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" {root}>
+  <Period {period}>
+    <AdaptationSet mimeType="video/mp4">
+      {template}
+      <Representation id="v1" bandwidth="800000"/>
+    </AdaptationSet>
+  </Period>
+</MPD>'''.encode(), 'http://origin/live/manifest.mpd')
+
+def template_of(parsed):
+    return parsed.ladder[0].segment_template
+
+def test_fill_template():
+    assert fill_template('$RepresentationID$/seg-$Number%05d$.m4s', 'v1', number=42) == 'v1/seg-00042.m4s'
+    assert fill_template('$Bandwidth$_$Time$.m4s', 'v1', bandwidth=800000, time=96000) == '800000_96000.m4s'
+    assert fill_template('cost$$.mp4', 'v1') == 'cost$.mp4'
+    with pytest.raises(ValueError):
+        fill_template('$Number$.m4s', 'v1')
+
+def test_number_template():
+    template = template_of(manifest(
+        '<SegmentTemplate media="$RepresentationID$_$Number$.m4s" initialization="$RepresentationID$_init.mp4" '
+        'timescale="1000" duration="4000" startNumber="5"/>', period='duration="PT18S"'))
+    assert template.count() == 5  # the last segment is partial
+    assert template.start_number == 5
+    assert template.segment(1) == (4000, 4000)
+    assert template.segment(5) is None
+    assert template.index_at(9.5) == 2
+    assert template.end_time(*template.segment(1)) == 8.0
+
+def test_timeline_repeats():
+    template = template_of(manifest(
+        '<SegmentTemplate media="$Time$.m4s" timescale="90000"><SegmentTimeline>'
+        '<S t="0" d="180000" r="2"/><S d="90000"/><S t="900000" d="180000" r="-1"/>'
+        '</SegmentTimeline></SegmentTemplate>', period='duration="PT16S"'))
+    assert list(template.times) == [0, 180000, 360000, 540000, 900000, 1080000, 1260000]
+    assert list(template.durations) == [180000] * 3 + [90000] + [180000] * 3
+    assert template.count() == 7
+    assert template.index_at(6.5) == 3
+    assert template.index_at(8.0) == 3  # in the gap before t=900000, still the previous entry
+    assert template.index_at(10.5) == 4
+    assert template.segment(7) is None
+
+def test_timeline_repeat_until_next_entry():
+    template = template_of(manifest(
+        '<SegmentTemplate media="$Number$.m4s" timescale="10"><SegmentTimeline>'
+        '<S t="0" d="20" r="-1"/><S t="100" d="50"/></SegmentTimeline></SegmentTemplate>'))
+    assert list(template.times) == [0, 20, 40, 60, 80, 100]
+
+def test_live_open_ended_timeline():
+    parsed = manifest(
+        '<SegmentTemplate media="$Time$.m4s" timescale="1000" presentationTimeOffset="1000"><SegmentTimeline>'
+        '<S t="1000" d="2000" r="-1"/></SegmentTimeline></SegmentTemplate>', period='start="PT0S"',
+        root='type="dynamic" availabilityStartTime="1970-01-01T00:00:10Z" minimumUpdatePeriod="PT2S" '
+             'timeShiftBufferDepth="PT30S"')
+    assert parsed.type == 'dynamic'
+    assert parsed.availability_start_time == 10
+    assert parsed.minimum_update_period == 2
+    template = template_of(parsed)
+    assert template.open_ended and template.count() is None
+    assert template.segment(10) == (21000, 2000)
+    assert template.index_at(7.0) == 3
+    assert template.end_time(*template.segment(3)) == 8.0
+
+def test_template_inherited_from_period():
+    parsed = parse_mpd(b'''<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" mediaPresentationDuration="PT8S">
+  <Period>
+    <SegmentTemplate timescale="1000" duration="2000" media="$RepresentationID$/$Number$.m4s"/>
+    <AdaptationSet contentType="video">
+      <SegmentTemplate startNumber="0"/>
+      <Representation id="a" bandwidth="1" mimeType="video/mp4"/>
+    </AdaptationSet>
+  </Period>
+</MPD>''')
+    template = template_of(parsed)
+    assert template.media == '$RepresentationID$/$Number$.m4s'
+    assert (template.timescale, template.duration, template.start_number) == (1000, 2000, 0)
+    assert template.count() == 4
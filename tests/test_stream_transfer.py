@@ -0,0 +1,60 @@
+from quic_client import StreamTransfer
+
+def transfer():
+    chunks = []
+    return StreamTransfer(0, b'sample_low.mp4', None, chunks.append), chunks
+
+def test_status_line_split_across_chunks():
+    t, chunks = transfer()
+    t.receive(b'OK 1')
+    t.receive(b'0\nhello')
+    t.receive(b'world')
+    t.finish()
+    assert t.expected_size == 10
+    assert b''.join(chunks) == b'helloworld'
+    assert t.bytes_received == 10
+    assert t.error is None
+
+def test_error_status():
+    t, chunks = transfer()
+    t.receive(b'404 Video Not Found\n')
+    t.finish()
+    assert t.error == '404 Video Not Found'
+    assert chunks == []
+
+def test_truncated_body():
+    t, _ = transfer()
+    t.receive(b'OK 100\n' + bytes(40))
+    t.finish()
+    assert t.error == 'truncated reply: 40 of 100 bytes'
+
+def test_missing_status_line():
+    t, _ = transfer()
+    t.receive(b'no newline')
+    t.finish()
+    assert t.error == 'reply ended without a status line'
+
+def test_malformed_ok_line():
+    t, chunks = transfer()
+    t.receive(b'OK lots\nbody')
+    t.finish()
+    assert t.error == 'malformed status line: OK lots'
+    assert chunks == []
+
+def test_default_file_only_created_for_a_body(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    refused = StreamTransfer(0, b'nope.mp4')
+    refused.receive(b'404 Video Not Found\n')
+    refused.finish()
+    refused.close()
+    assert not (tmp_path / 'received_nope.mp4').exists()
+    saved = StreamTransfer(4, b'clips/a.mp4', '0-3')
+    saved.receive(b'OK 4\nabcd')
+    saved.finish()
+    saved.close()
+    assert (tmp_path / 'received_clips_a.mp4.0-3').read_bytes() == b'abcd'
+    empty = StreamTransfer(8, b'empty.mp4')
+    empty.receive(b'OK 0\n')
+    empty.finish()
+    empty.close()
+    assert (tmp_path / 'received_empty.mp4').read_bytes() == b''